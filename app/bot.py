@@ -1,14 +1,123 @@
+import os
+import sys
+import asyncio
+import logging
+from functools import lru_cache
+
+from aiolimiter import AsyncLimiter
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
 from telegram import Update
 
+logger = logging.getLogger(__name__)
+
+# uvloop is optional; fall back to the default asyncio loop where it is
+# unavailable (Windows, or not installed).
+if sys.platform != "win32":
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+
+_GREETINGS = {
+    "ar": "👋 أهلاً %s!\nمرحباً بك في البوت!",
+    "en": "👋 Hello %s!\nWelcome to the bot!",
+}
+
+# Replies are queued and flushed in small batches by a background task so
+# handlers return immediately; the limiter keeps us under Telegram's
+# ~30 msg/s bot cap while sends to different chats run concurrently.
+REPLY_FLUSH_INTERVAL = 0.05
+REPLY_DRAIN_TIMEOUT = 10
+_REPLY_LIMITER = AsyncLimiter(30, 1)
+
+async def _send_chat_replies(bot, chat_id, pending, queue: asyncio.Queue):
+    # one sender per chat drains that chat's list, so later batches for the
+    # same chat are appended here and keep their queue order
+    texts = pending[chat_id]
+    try:
+        while texts:
+            text = texts.pop(0)
+            try:
+                async with _REPLY_LIMITER:
+                    await bot.send_message(chat_id=chat_id, text=text)
+            except Exception:
+                logger.exception("Failed to send queued reply to %s", chat_id)
+            finally:
+                queue.task_done()
+    finally:
+        del pending[chat_id]
+
+async def _reply_flusher(bot, queue: asyncio.Queue, senders: set):
+    pending = {}
+    while True:
+        batch = [await queue.get()]
+        await asyncio.sleep(REPLY_FLUSH_INTERVAL)
+        while not queue.empty():
+            batch.append(queue.get_nowait())
+
+        # sends run as their own tasks so a slow chat never holds up the
+        # next batch
+        for chat_id, text in batch:
+            if chat_id in pending:
+                pending[chat_id].append(text)
+                continue
+            pending[chat_id] = [text]
+            task = asyncio.create_task(_send_chat_replies(bot, chat_id, pending, queue))
+            senders.add(task)
+            task.add_done_callback(senders.discard)
+
+def _reply_queue(application) -> asyncio.Queue:
+    """Return the reply queue, starting its flusher on first use."""
+    queue = application.bot_data.get("reply_queue")
+    if queue is None:
+        queue = application.bot_data["reply_queue"] = asyncio.Queue()
+    task = application.bot_data.get("reply_flusher")
+    if task is None or task.done():
+        senders = application.bot_data.setdefault("reply_senders", set())
+        application.bot_data["reply_flusher"] = asyncio.create_task(_reply_flusher(application.bot, queue, senders))
+    return queue
+
+async def _start_reply_flusher(application):
+    _reply_queue(application)
+
+async def _stop_reply_flusher(application):
+    # runs before the bot is shut down, so queued replies can still go out
+    queue = application.bot_data.get("reply_queue")
+    if queue is not None:
+        try:
+            await asyncio.wait_for(queue.join(), REPLY_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Reply queue not drained within %ss; dropping the rest", REPLY_DRAIN_TIMEOUT)
+    task = application.bot_data.pop("reply_flusher", None)
+    if task:
+        task.cancel()
+    for sender in list(application.bot_data.get("reply_senders", ())):
+        sender.cancel()
+
+@lru_cache(maxsize=64)
+def _resolve_lang(code):
+    return "ar" if code and code[:2] == "ar" else "en"
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user = update.effective_user
-    lang = user.language_code or "en"
-    if lang.startswith("ar"):
-        text = f"👋 أهلاً {user.first_name}!\nمرحباً بك في البوت!"
-    else:
-        text = f"👋 Hello {user.first_name}!\nWelcome to the bot!"
-    await update.message.reply_text(text)
-
-application = ApplicationBuilder().token("dummy").build()
-application.add_handler(CommandHandler("start", start))
+    name = user.first_name
+    text = _GREETINGS[_resolve_lang(user.language_code)] % name
+    _reply_queue(context.application).put_nowait((update.effective_chat.id, text))
+
+HANDLERS = (
+    CommandHandler("start", start),
+)
+
+@lru_cache(maxsize=1)
+def get_application(token=None):
+    """Build the bot application on first use instead of at import time."""
+    application = (
+        ApplicationBuilder()
+        .token(token or os.getenv("TELEGRAM_TOKEN", "dummy"))
+        .post_init(_start_reply_flusher)
+        .post_stop(_stop_reply_flusher)
+        .build()
+    )
+    application.add_handlers(HANDLERS)
+    return application
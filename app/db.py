@@ -4,9 +4,18 @@ from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./dev.db")
 
+_IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+    connect_args={"check_same_thread": False} if _IS_SQLITE else {},
+    # pool sizing only applies to networked databases
+    **({} if _IS_SQLITE else {
+        "pool_size": 20,
+        "max_overflow": 40,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True,
+    }),
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
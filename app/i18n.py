@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 MESSAGES = {
     "start_en": "Welcome! Send me anything and I'll save it.",
     "start_ar": "مرحبًا! أرسل أي شيء وسأقوم بحفظه.",
@@ -7,7 +9,20 @@ MESSAGES = {
     "ask_lang_ar": "اختر اللغة: /setlang en أو /setlang ar",
 }
 
+# MESSAGES regrouped once at import: {"en": {"start": ...}, "ar": {...}}
+_BY_LANG = {"en": {}, "ar": {}}
+for _full_key, _text in MESSAGES.items():
+    _key, _, _lang = _full_key.rpartition("_")
+    _BY_LANG.setdefault(_lang, {})[_key] = _text
+del _full_key, _text, _key, _lang
+
+_EN = _BY_LANG["en"]
+
+# Arabic falls back to English for keys that have no translation yet
+for _key, _text in _EN.items():
+    _BY_LANG["ar"].setdefault(_key, _text)
+del _key, _text
+
+@lru_cache(maxsize=64)
 def t(key, lang="en"):
-    if lang == "ar":
-        return MESSAGES.get(f"{key}_ar", MESSAGES.get(f"{key}_en", ""))
-    return MESSAGES.get(f"{key}_en", "")
+    return _BY_LANG.get(lang, _EN).get(key, "")
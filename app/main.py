@@ -1,14 +1,21 @@
 import os
 import re
 import json
+import html
+import hashlib
+import itertools
 import logging
+import time
+import threading
 import unicodedata
-from typing import List, Optional, Tuple, Dict, Any
+from functools import lru_cache
+from typing import List, Optional, Tuple, Dict, Any, Set
 from urllib.parse import urlencode, quote_plus
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from fastapi import FastAPI, Request, Body, HTTPException
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, Response
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
+from telegram.error import Forbidden, RetryAfter
 from telegram.ext import (
     ApplicationBuilder,
     CommandHandler,
@@ -18,14 +25,35 @@ from telegram.ext import (
     filters,
 )
 from app.db import Base, engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import Column, Integer, String, ForeignKey, BigInteger
+from sqlalchemy.orm import sessionmaker, joinedload, selectinload
+from sqlalchemy import Column, Integer, String, ForeignKey, BigInteger, Index
 from sqlalchemy.orm import relationship
 import asyncio
-from sqlalchemy import text, inspect
-
-ADMIN_TELEGRAM_IDS = [int(x.strip()) for x in os.getenv("ADMIN_TELEGRAM_ID", "").split(",") if x.strip()]
+from collections import defaultdict
+from aiolimiter import AsyncLimiter
+from cachetools import LRUCache, TTLCache
+from sqlalchemy import text, select, func, case, distinct
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+ADMIN_TELEGRAM_IDS = frozenset(int(x.strip()) for x in os.getenv("ADMIN_TELEGRAM_ID", "").split(",") if x.strip())
 AGENTS_LIST = os.getenv("AGENTS_LIST", "ملك الدهب").split(",")
+# خيارات القوائم المنسدلة في صفحات WebApp ثابتة، فتُبنى مرة واحدة عند الاستيراد
+_AGENTS_OPTIONS_HTML = "".join(f'<option value="{agent}">{agent}</option>' for agent in AGENTS_LIST)
+_RETURN_OPTIONS_AR = """
+            <option value="">اختر العائد المتوقع</option>
+            <option value="X1 = 10% - 15%">X1 = 10% - 15%</option>
+            <option value="X2 = 20% - 30%">X2 = 20% - 30%</option>
+            <option value="X3 = 30% - 45%">X3 = 30% - 45%</option>
+            <option value="X4 = 40% - 60%">X4 = 40% - 60%</option>
+        """
+_RETURN_OPTIONS_EN = """
+            <option value="">Select Expected Return</option>
+            <option value="X1 = 10% - 15%">X1 = 10% - 15%</option>
+            <option value="X2 = 20% - 30%">X2 = 20% - 30%</option>
+            <option value="X3 = 30% - 45%">X3 = 30% - 45%</option>
+            <option value="X4 = 40% - 60%">X4 = 40% - 60%</option>
+        """
 # -------------------------------
 # logging
 # -------------------------------
@@ -35,7 +63,8 @@ logger = logging.getLogger(__name__)
 # -------------------------------
 # DB model
 # -------------------------------
-SessionLocal = sessionmaker(bind=engine)
+# expire_on_commit=False keeps loaded attributes usable after the session closes
+SessionLocal = sessionmaker(bind=engine, expire_on_commit=False)
 
 class Subscriber(Base):
     __tablename__ = "subscribers"
@@ -50,6 +79,11 @@ class Subscriber(Base):
 
 class TradingAccount(Base):
     __tablename__ = "trading_accounts"
+    __table_args__ = (
+        Index("ix_trading_accounts_status_subscriber_id", "status", "subscriber_id"),
+        # يخدم الربط subscriber → accounts مع تصفية الحالة لكل مشترك
+        Index("ix_trading_accounts_subscriber_id_status", "subscriber_id", "status"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     subscriber_id = Column(Integer, ForeignKey('subscribers.id', ondelete='CASCADE'), nullable=False)
     broker_name = Column(String(100), nullable=False)
@@ -71,7 +105,7 @@ class TradingAccount(Base):
 class AccountPerformance(Base):
     __tablename__ = "account_performances"
     id = Column(Integer, primary_key=True, index=True)
-    trading_account_id = Column(Integer, ForeignKey('trading_accounts.id', ondelete='CASCADE'), nullable=False)
+    trading_account_id = Column(Integer, ForeignKey('trading_accounts.id', ondelete='CASCADE'), nullable=False, unique=True, index=True)
     name = Column(String(200), nullable=False)  # من Subscriber
     email = Column(String(200), nullable=False)  # من Subscriber
     phone = Column(String(50), nullable=False)  # من Subscriber
@@ -83,126 +117,177 @@ class AccountPerformance(Base):
     # علاقة مع جدول TradingAccount
     trading_account = relationship("TradingAccount")
 
-Base.metadata.create_all(bind=engine)
+def ensure_indexes():
+    # create_all لا يضيف الفهارس الجديدة إلى الجداول الموجودة مسبقاً
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except Exception as e:
+                logger.exception(f"Failed to create index {index.name}: {e}")
+
+# إنشاء الجداول والفهارس عند التحميل؛ اضبط INIT_DB=0 في العمال الإضافيين
+# لتجنب استعلامات فحص المخطط عند كل تشغيل
+if os.getenv("INIT_DB", "1") == "1":
+    Base.metadata.create_all(bind=engine)
+    ensure_indexes()
 
 # -------------------------------
 # دالة جديدة لملء جدول AccountPerformance
 # -------------------------------
+_UPSERT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+PERFORMANCE_CHUNK_SIZE = 1000
+
+def _chunks(rows: List[Dict[str, Any]], size: int = PERFORMANCE_CHUNK_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def _upsert_performances(db, rows: List[Dict[str, Any]]):
+    # INSERT ... ON CONFLICT (trading_account_id) DO UPDATE في جملة واحدة
+    stmt = _UPSERT_INSERTS[engine.dialect.name](AccountPerformance)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AccountPerformance.trading_account_id],
+        set_={key: stmt.excluded[key] for key in rows[0] if key != "trading_account_id"},
+    )
+    for chunk in _chunks(rows):
+        db.execute(stmt, chunk)
+
+def _save_performances_bulk(db, rows: List[Dict[str, Any]]):
+    # جلب السجلات الموجودة مرة واحدة بدلاً من استعلام لكل حساب
+    existing_ids = {}
+    for perf_id, trading_account_id in (
+        db.query(AccountPerformance.id, AccountPerformance.trading_account_id)
+        .order_by(AccountPerformance.id)
+    ):
+        existing_ids.setdefault(trading_account_id, perf_id)
+
+    to_insert = []
+    to_update = []
+    for row in rows:
+        perf_id = existing_ids.get(row["trading_account_id"])
+        if perf_id is not None:
+            # تحديث السجل الموجود
+            to_update.append(dict(row, id=perf_id))
+        else:
+            # إنشاء سجل جديد
+            to_insert.append(row)
+
+    # دفعات محدودة الحجم ضمن نفس المعاملة، مع commit واحد في النهاية
+    for chunk in _chunks(to_insert):
+        db.bulk_insert_mappings(AccountPerformance, chunk)
+    for chunk in _chunks(to_update):
+        db.bulk_update_mappings(AccountPerformance, chunk)
+
 def populate_account_performances():
-    db = SessionLocal()
-    try:
-        # جلب جميع الحسابات النشطة
-        accounts = db.query(TradingAccount).filter(TradingAccount.status == 'active').all()
-        
-        for account in accounts:
-            subscriber = account.subscriber
+    with SessionLocal() as db:
+        try:
+            # جلب جميع الحسابات النشطة مع المشتركين في استعلام واحد
+            accounts = (
+                db.query(TradingAccount)
+                .options(joinedload(TradingAccount.subscriber))
+                .filter(TradingAccount.status == 'active')
+                .all()
+            )
+
+            rows = []
+            today = date.today()
+            for account in accounts:
+                subscriber = account.subscriber
             
-            # التحقق من وجود البيانات اللازمة
-            if not (account.initial_balance and account.current_balance and 
-                    account.withdrawals and account.copy_start_date):
-                continue
+                # التحقق من وجود البيانات اللازمة
+                if not (account.initial_balance and account.current_balance and 
+                        account.withdrawals and account.copy_start_date):
+                    continue
             
-            try:
-                initial = float(account.initial_balance)
-                current = float(account.current_balance)
-                withdrawals = float(account.withdrawals)
-                
-                # حساب العائد المحقق
-                if initial > 0:
-                    total_value = current + withdrawals
-                    profit = total_value - initial
-                    achieved_return = f"{(profit / initial * 100):.0f}%"
-                else:
-                    achieved_return = "0%"
+                try:
+                    initial = float(account.initial_balance)
+                    current = float(account.current_balance)
+                    withdrawals = float(account.withdrawals)
                 
-                # حساب المدة
-                start_date = datetime.strptime(account.copy_start_date, '%Y-%m-%d')
-                today = datetime.now()
-                delta = today - start_date
-                total_days = delta.days
+                    # حساب العائد المحقق
+                    if initial > 0:
+                        total_value = current + withdrawals
+                        profit = total_value - initial
+                        achieved_return = f"{(profit / initial * 100):.0f}%"
+                    else:
+                        achieved_return = "0%"
                 
-                months = total_days // 30
-                remaining_days = total_days % 30
+                    # حساب المدة
+                    start_date = date.fromisoformat(account.copy_start_date)
+                    delta = today - start_date
+                    total_days = delta.days
                 
-                if months > 0:
-                    copy_duration = f"{months} شهر"
-                    if remaining_days > 0:
-                        copy_duration += f" و{remaining_days} يوم"
-                else:
-                    copy_duration = f"{total_days} يوم"
+                    months = total_days // 30
+                    remaining_days = total_days % 30
                 
-                # التحقق مما إذا كان السجل موجودًا بالفعل
-                existing_perf = db.query(AccountPerformance).filter(
-                    AccountPerformance.trading_account_id == account.id
-                ).first()
+                    if months > 0:
+                        copy_duration = f"{months} شهر"
+                        if remaining_days > 0:
+                            copy_duration += f" و{remaining_days} يوم"
+                    else:
+                        copy_duration = f"{total_days} يوم"
                 
-                if existing_perf:
-                    # تحديث السجل الموجود
-                    existing_perf.name = subscriber.name
-                    existing_perf.email = subscriber.email
-                    existing_perf.phone = subscriber.phone
-                    existing_perf.telegram_username = subscriber.telegram_username
-                    existing_perf.initial_balance = account.initial_balance
-                    existing_perf.achieved_return = achieved_return
-                    existing_perf.copy_duration = copy_duration
+                except ValueError as ve:
+                    logger.error(f"خطأ في تحويل القيم للحساب {account.id}: {ve}")
+                    continue
+
+                rows.append({
+                    "trading_account_id": account.id,
+                    "name": subscriber.name,
+                    "email": subscriber.email,
+                    "phone": subscriber.phone,
+                    "telegram_username": subscriber.telegram_username,
+                    "initial_balance": account.initial_balance,
+                    "achieved_return": achieved_return,
+                    "copy_duration": copy_duration,
+                })
+
+            if rows:
+                if engine.dialect.name in _UPSERT_INSERTS:
+                    try:
+                        _upsert_performances(db, rows)
+                    except Exception as e:
+                        # الجداول القديمة قد لا تحتوي على القيد الفريد بعد
+                        db.rollback()
+                        logger.warning(f"Upsert failed, falling back to bulk save: {e}")
+                        _save_performances_bulk(db, rows)
                 else:
-                    # إنشاء سجل جديد
-                    performance = AccountPerformance(
-                        trading_account_id=account.id,
-                        name=subscriber.name,
-                        email=subscriber.email,
-                        phone=subscriber.phone,
-                        telegram_username=subscriber.telegram_username,
-                        initial_balance=account.initial_balance,
-                        achieved_return=achieved_return,
-                        copy_duration=copy_duration
-                    )
-                    db.add(performance)
-                
-                db.commit()
-                
-            except ValueError as ve:
-                logger.error(f"خطأ في تحويل القيم للحساب {account.id}: {ve}")
-                continue
-            
-        logger.info("تم ملء جدول الأداء بنجاح!")
+                    _save_performances_bulk(db, rows)
+            db.commit()
+
+            logger.info("تم ملء جدول الأداء بنجاح!")
         
-    except Exception as e:
-        logger.exception(f"خطأ في ملء جدول الأداء: {e}")
-    finally:
-        db.close()
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"خطأ في ملء جدول الأداء: {e}")
 
 def reset_sequences():
-    inspector = inspect(engine)
     tables = ['subscribers', 'trading_accounts', 'account_performances']  # أضف الجداول الأخرى إذا لزم
     
     if engine.dialect.name == 'sqlite':
-        with engine.connect() as conn:
-            for table in tables:
-                # جلب أعلى ID
-                max_id_result = conn.execute(text(f"SELECT MAX(id) FROM {table}")).scalar()
-                max_id = max_id_result if max_id_result is not None else 0
-                
-                # تحديث sqlite_sequence
-                conn.execute(text(f"INSERT OR REPLACE INTO sqlite_sequence (name, seq) VALUES ('{table}', {max_id})"))
-            conn.commit()
+        # تحديث sqlite_sequence لكل الجداول في جملة واحدة
+        values = ", ".join(
+            f"('{table}', (SELECT COALESCE(MAX(id), 0) FROM {table}))" for table in tables
+        )
+        with engine.begin() as conn:
+            conn.execute(text(f"INSERT OR REPLACE INTO sqlite_sequence (name, seq) VALUES {values}"))
         logger.info("✅ تم إعادة تعيين التسلسل في SQLite بنجاح!")
         
     elif engine.dialect.name == 'postgresql':
-        with engine.connect() as conn:
-            for table in tables:
-                seq_name = f"{table}_id_seq"
-                conn.execute(text(f"SELECT setval('{seq_name}', COALESCE((SELECT MAX(id) + 1 FROM {table}), 1), false)"))
-            conn.commit()
+        setvals = ", ".join(
+            f"setval('{table}_id_seq', COALESCE((SELECT MAX(id) + 1 FROM {table}), 1), false)" for table in tables
+        )
+        with engine.begin() as conn:
+            conn.execute(text(f"SELECT {setvals}"))
         logger.info("✅ تم إعادة تعيين التسلسل في PostgreSQL بنجاح!")
         
     elif engine.dialect.name == 'mysql':
-        with engine.connect() as conn:
-            for table in tables:
-                max_id_result = conn.execute(text(f"SELECT MAX(id) FROM {table}")).scalar()
-                max_id = (max_id_result or 0) + 1
-                conn.execute(text(f"ALTER TABLE {table} AUTO_INCREMENT = {max_id}"))
-            conn.commit()
+        # AUTO_INCREMENT يقبل قيمة ثابتة فقط، لذا نجلب كل القيم العليا في استعلام واحد
+        max_ids = ", ".join(f"(SELECT COALESCE(MAX(id), 0) FROM {table})" for table in tables)
+        with engine.begin() as conn:
+            row = conn.execute(text(f"SELECT {max_ids}")).one()
+            for table, max_id in zip(tables, row):
+                conn.execute(text(f"ALTER TABLE {table} AUTO_INCREMENT = {max_id + 1}"))
         logger.info("✅ تم إعادة تعيين التسلسل في MySQL بنجاح!")
         
     else:
@@ -221,16 +306,50 @@ if not TOKEN:
 if not WEBAPP_URL:
     logger.warning("⚠️ WEBAPP_URL not set — WebApp button may not work without a public URL.")
 
-application = ApplicationBuilder().token(TOKEN).build()
+# webhook-only: updates arrive through FastAPI and are handed to
+# process_update directly, so no Updater/polling machinery is needed.
+# Broadcasts keep at most BROADCAST_CONCURRENCY (25) sends in flight, so the
+# pool never runs dry; the timeouts give slow sends room under load.
+application = (
+    ApplicationBuilder()
+    .token(TOKEN)
+    .updater(None)
+    .connection_pool_size(256)
+    .pool_timeout(30)
+    .connect_timeout(10)
+    .read_timeout(30)
+    .build()
+)
 app = FastAPI()
 
 HEADER_EMOJI = "✨"
 NBSP = "\u00A0"
-FORM_MESSAGES: Dict[int, Dict[str, Any]] = {}
+
+class _EvictionLogMixin:
+    """Logs capacity evictions so an undersized cache shows up in the logs."""
+    def popitem(self):
+        key, value = super().popitem()
+        logger.info(f"{type(self).__name__} full ({self.maxsize}), evicted key {key}")
+        return key, value
+
+class _FormMessagesCache(_EvictionLogMixin, TTLCache):
+    pass
+
+class _NotificationMessagesCache(_EvictionLogMixin, LRUCache):
+    pass
+
+# مخازن محدودة الحجم حتى لا تنمو بلا نهاية في عملية البوت طويلة التشغيل
+FORM_MESSAGES: Dict[int, Dict[str, Any]] = _FormMessagesCache(maxsize=10_000, ttl=3600)
 # -------------------------------
 # helpers: emoji removal / display width
 # -------------------------------
-NOTIFICATION_MESSAGES: Dict[int, List[Dict[str, Any]]] = {}
+NOTIFICATION_MESSAGES: Dict[int, List[Dict[str, Any]]] = _NotificationMessagesCache(maxsize=5000)
+
+def register_notification(account_id: int, entry: Dict[str, Any]):
+    NOTIFICATION_MESSAGES.setdefault(account_id, []).append(entry)
+
+def pop_notifications(account_id: int) -> List[Dict[str, Any]]:
+    return NOTIFICATION_MESSAGES.pop(account_id, None) or []
 ADMIN_LANGUAGE: Dict[int, str] = {}
 
 SECRET_KEY = os.getenv("SECRET_KEY", "my_secret_key")  # استخدام متغير بيئة للسيكريت كي
@@ -243,14 +362,23 @@ def get_admin_language(admin_id: int) -> str:
     
     return ADMIN_LANGUAGE.get(admin_id, "ar")
 
-async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    user_id = update.effective_user.id
-    if user_id not in ADMIN_TELEGRAM_IDS:
-        await update.message.reply_text("❌ غير مصرح لك بالوصول إلى هذه الصفحة")
-        return
-    
-    admin_lang = get_admin_language(user_id)
-    
+# label → callback_data for the admin menu buttons (both languages)
+BTN_CB: Dict[str, str] = {
+    "📢 ارسل رسالة": "admin_broadcast_menu", "📢 Send Message": "admin_broadcast_menu",
+    "📊 التقارير": "admin_stats", "📊 Reports": "admin_stats",
+    "🏦 إدارة الحسابات": "admin_accounts_menu", "🛠 Management": "admin_accounts_menu",
+    "⚙️ الإعدادات": "admin_settings", "⚙️ Settings": "admin_settings",
+    "📢 للجميع": "admin_broadcast_all", "📢 To All": "admin_broadcast_all",
+    "👥 للمسجلين فقط": "admin_broadcast_registered", "👥 To Registered": "admin_broadcast_registered",
+    "✅ للمقبولين فقط": "admin_broadcast_approved", "✅ To Approved": "admin_broadcast_approved",
+    "🔍 لشخص واحد": "admin_individual_message", "🔍 Individual": "admin_individual_message",
+    "⏳ قيد المراجعة": "admin_accounts_under_review", "⏳ Under Review": "admin_accounts_under_review",
+    "✅ المقبولة": "admin_accounts_approved", "✅ Approved": "admin_accounts_approved",
+    "❌ المرفوضة": "admin_accounts_rejected", "❌ Rejected": "admin_accounts_rejected",
+    "🔍 بحث": "admin_accounts_search", "🔍 Search Account": "admin_accounts_search",
+}
+
+def _build_admin_panel(admin_lang: str) -> Tuple[str, InlineKeyboardMarkup]:
     if admin_lang == "ar":
         title = "لوحة التحكم الإدارية"
         buttons = [
@@ -274,33 +402,26 @@ async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     header = build_header_html(title, buttons, header_emoji=HEADER_EMOJI, arabic_indent=1 if admin_lang == "ar" else 0)
     
-    keyboard = []
-    for i in range(0, len(buttons) - 1, 2):
-        row = buttons[i:i+2]
-        keyboard_row = []
-        for btn in row:
-            if btn == "📢 ارسل رسالة" or btn == "📢 Send Message":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_broadcast_menu"))
-            elif btn == "📊 التقارير" or btn == "📊 Reports":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_stats"))
-            elif btn == "🏦 إدارة الحسابات" or btn == "🛠 Management":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_accounts_menu"))
-            elif btn == "⚙️ الإعدادات" or btn == "⚙️ Settings":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_settings"))
-        keyboard.append(keyboard_row)
+    keyboard = [
+        [InlineKeyboardButton(btn, callback_data=BTN_CB[btn]) for btn in buttons[i:i+2]]
+        for i in range(0, len(buttons) - 1, 2)
+    ]
     
     keyboard.append([InlineKeyboardButton(buttons[-1], callback_data="admin_exit")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(header + description, reply_markup=reply_markup, parse_mode="HTML")
+    return header + description, InlineKeyboardMarkup(keyboard)
 
-async def admin_broadcast_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    q = update.callback_query
-    await q.answer()
+async def admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user_id = update.effective_user.id
+    if user_id not in ADMIN_TELEGRAM_IDS:
+        await update.message.reply_text("❌ غير مصرح لك بالوصول إلى هذه الصفحة")
+        return
     
-    user_id = q.from_user.id
     admin_lang = get_admin_language(user_id)
+    text, reply_markup = _ADMIN_MENUS["admin_panel"][admin_lang]
     
+    await update.message.reply_text(text, reply_markup=reply_markup, parse_mode="HTML")
+
+def _build_admin_broadcast_menu(admin_lang: str) -> Tuple[str, InlineKeyboardMarkup]:
     if admin_lang == "ar":
         title = "ارسل رسالة"
         buttons = [
@@ -324,33 +445,26 @@ async def admin_broadcast_menu(update: Update, context: ContextTypes.DEFAULT_TYP
     
     header = build_header_html(title, buttons, header_emoji=HEADER_EMOJI, arabic_indent=1 if admin_lang == "ar" else 0)
     
-    keyboard = []
-    for i in range(0, len(buttons) - 1, 2):
-        row = buttons[i:i+2]
-        keyboard_row = []
-        for btn in row:
-            if btn == "📢 للجميع" or btn == "📢 To All":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_broadcast_all"))
-            elif btn == "👥 للمسجلين فقط" or btn == "👥 To Registered":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_broadcast_registered"))
-            elif btn == "✅ للمقبولين فقط" or btn == "✅ To Approved":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_broadcast_approved"))
-            elif btn == "🔍 لشخص واحد" or btn == "🔍 Individual":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_individual_message"))
-        keyboard.append(keyboard_row)
+    keyboard = [
+        [InlineKeyboardButton(btn, callback_data=BTN_CB[btn]) for btn in buttons[i:i+2]]
+        for i in range(0, len(buttons) - 1, 2)
+    ]
     
     keyboard.append([InlineKeyboardButton(buttons[-1], callback_data="admin_main")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await q.edit_message_text(header + description, reply_markup=reply_markup, parse_mode="HTML")
+    return header + description, InlineKeyboardMarkup(keyboard)
 
-async def admin_accounts_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def admin_broadcast_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
     await q.answer()
     
     user_id = q.from_user.id
     admin_lang = get_admin_language(user_id)
     
+    text, reply_markup = _ADMIN_MENUS["admin_broadcast_menu"][admin_lang]
+    
+    await q.edit_message_text(text, reply_markup=reply_markup, parse_mode="HTML")
+
+def _build_admin_accounts_menu(admin_lang: str) -> Tuple[str, InlineKeyboardMarkup]:
     if admin_lang == "ar":
         title = "إدارة الحسابات"
         buttons = [
@@ -374,33 +488,26 @@ async def admin_accounts_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     header = build_header_html(title, buttons, header_emoji=HEADER_EMOJI, arabic_indent=1 if admin_lang == "ar" else 0)
     
-    keyboard = []
-    for i in range(0, len(buttons) - 1, 2):
-        row = buttons[i:i+2]
-        keyboard_row = []
-        for btn in row:
-            if btn == "⏳ قيد المراجعة" or btn == "⏳ Under Review":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_accounts_under_review"))
-            elif btn == "✅ المقبولة" or btn == "✅ Approved":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_accounts_approved"))
-            elif btn == "❌ المرفوضة" or btn == "❌ Rejected":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_accounts_rejected"))
-            elif btn == "🔍 بحث" or btn == "🔍 Search Account":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_accounts_search"))
-        keyboard.append(keyboard_row)
+    keyboard = [
+        [InlineKeyboardButton(btn, callback_data=BTN_CB[btn]) for btn in buttons[i:i+2]]
+        for i in range(0, len(buttons) - 1, 2)
+    ]
     
     keyboard.append([InlineKeyboardButton(buttons[-1], callback_data="admin_main")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await q.edit_message_text(header + description, reply_markup=reply_markup, parse_mode="HTML")
+    return header + description, InlineKeyboardMarkup(keyboard)
 
-async def admin_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def admin_accounts_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
     await q.answer()
     
     user_id = q.from_user.id
     admin_lang = get_admin_language(user_id)
     
+    text, reply_markup = _ADMIN_MENUS["admin_accounts_menu"][admin_lang]
+    
+    await q.edit_message_text(text, reply_markup=reply_markup, parse_mode="HTML")
+
+def _build_admin_settings(admin_lang: str) -> Tuple[str, InlineKeyboardMarkup]:
     if admin_lang == "ar":
         title = "الإعدادات"
         buttons = [
@@ -428,9 +535,18 @@ async def admin_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
         [InlineKeyboardButton(buttons[2], callback_data="admin_reset_sequences")],
         [InlineKeyboardButton(buttons[3], callback_data="admin_main")]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return header + description, InlineKeyboardMarkup(keyboard)
+
+async def admin_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    
+    user_id = q.from_user.id
+    admin_lang = get_admin_language(user_id)
     
-    await q.edit_message_text(header + description, reply_markup=reply_markup, parse_mode="HTML")
+    text, reply_markup = _ADMIN_MENUS["admin_settings"][admin_lang]
+    
+    await q.edit_message_text(text, reply_markup=reply_markup, parse_mode="HTML")
 
 async def admin_update_performances(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
@@ -476,13 +592,7 @@ async def admin_reset_sequences(update: Update, context: ContextTypes.DEFAULT_TY
     await asyncio.sleep(2)
     await admin_settings(update, context)
 
-async def admin_change_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    q = update.callback_query
-    await q.answer()
-    
-    user_id = q.from_user.id
-    admin_lang = get_admin_language(user_id)
-    
+def _build_admin_change_language(admin_lang: str) -> Tuple[str, InlineKeyboardMarkup]:
     if admin_lang == "ar":
         title = "تغيير اللغة"
         buttons = [
@@ -509,9 +619,18 @@ async def admin_change_language(update: Update, context: ContextTypes.DEFAULT_TY
         ],
         [InlineKeyboardButton(buttons[-1], callback_data="admin_settings")]
     ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return header + description, InlineKeyboardMarkup(keyboard)
+
+async def admin_change_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    q = update.callback_query
+    await q.answer()
+    
+    user_id = q.from_user.id
+    admin_lang = get_admin_language(user_id)
+    
+    text, reply_markup = _ADMIN_MENUS["admin_change_language"][admin_lang]
     
-    await q.edit_message_text(header + description, reply_markup=reply_markup, parse_mode="HTML")
+    await q.edit_message_text(text, reply_markup=reply_markup, parse_mode="HTML")
 
 async def admin_set_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
@@ -534,12 +653,13 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = q.from_user.id
     admin_lang = get_admin_language(user_id)
-    total_subscribers = len(get_all_subscribers())
-    registered_users = len(get_registered_users())
-    approved_users = len(get_approved_accounts_users())
-    under_review = len(get_accounts_by_status("under_review"))
-    active_accounts = len(get_accounts_by_status("active"))
-    rejected_accounts = len(get_accounts_by_status("rejected"))
+    stats = await asyncio.to_thread(get_admin_stats)
+    total_subscribers = stats["total_subscribers"]
+    registered_users = stats["registered_users"]
+    approved_users = stats["approved_users"]
+    under_review = stats["under_review"]
+    active_accounts = stats["active_accounts"]
+    rejected_accounts = stats["rejected_accounts"]
 
     if admin_lang == "ar":
         title = "التقارير"
@@ -575,12 +695,71 @@ async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await q.edit_message_text(header + description + stats_text, reply_markup=reply_markup, parse_mode="HTML")
 
+def count_accounts_by_status(status: str):
+    return func.count(case((TradingAccount.status == status, 1)))
+
+# التقارير تتكرر عند الضغط المتتالي على الأزرار، لذا تُخزن مؤقتاً لثوانٍ
+_ADMIN_STATS_CACHE = TTLCache(maxsize=1, ttl=30)
+_ADMIN_STATS_CACHE_LOCK = threading.Lock()
+
+def get_admin_stats() -> Dict[str, int]:
+    """Compute all admin report counters in a single round-trip."""
+    with _ADMIN_STATS_CACHE_LOCK:
+        cached = _ADMIN_STATS_CACHE.get("stats")
+    if cached is not None:
+        return cached
+
+    subscribers_count = select(func.count(Subscriber.id)).scalar_subquery()
+    approved_count = (
+        select(func.count(distinct(Subscriber.telegram_id)))
+        .join(TradingAccount, TradingAccount.subscriber_id == Subscriber.id)
+        .where(TradingAccount.status == "active")
+        .scalar_subquery()
+    )
+    status_counts = select(
+        count_accounts_by_status("under_review"),
+        count_accounts_by_status("active"),
+        count_accounts_by_status("rejected"),
+    ).subquery()
+    stmt = select(subscribers_count, approved_count, *status_counts.c)
+
+    try:
+        with SessionLocal() as db:
+            total, approved, under_review, active, rejected = db.execute(stmt).one()
+    except Exception as e:
+        logger.exception(f"Failed to get admin stats: {e}")
+        return dict.fromkeys(
+            ("total_subscribers", "registered_users", "approved_users",
+             "under_review", "active_accounts", "rejected_accounts"),
+            0,
+        )
+
+    stats = {
+        "total_subscribers": total,
+        # كل المشتركين مسجلون، لذا العددان متطابقان
+        "registered_users": total,
+        "approved_users": approved,
+        "under_review": under_review or 0,
+        "active_accounts": active or 0,
+        "rejected_accounts": rejected or 0,
+    }
+    with _ADMIN_STATS_CACHE_LOCK:
+        _ADMIN_STATS_CACHE["stats"] = stats
+    return stats
+
+def invalidate_admin_stats():
+    with _ADMIN_STATS_CACHE_LOCK:
+        _ADMIN_STATS_CACHE.clear()
+
 def get_accounts_by_status(status: str) -> List[TradingAccount]:
     try:
-        db = SessionLocal()
-        accounts = db.query(TradingAccount).filter(TradingAccount.status == status).all()
-        db.close()
-        return accounts
+        with SessionLocal() as db:
+            return (
+                db.query(TradingAccount)
+                .options(joinedload(TradingAccount.subscriber))
+                .filter(TradingAccount.status == status)
+                .all()
+            )
     except Exception as e:
         logger.exception(f"Failed to get accounts by status: {e}")
         return []
@@ -668,12 +847,12 @@ async def handle_rejection_reason(update: Update, context: ContextTypes.DEFAULT_
         context.user_data.pop('target_users', None)
         context.user_data.pop('target_name', None)
         
-        success = update_account_status(account_id, "rejected", reason=reason)
+        success = await aupdate_account_status(account_id, "rejected", reason=reason)
         admin_lang = get_admin_language(user_id)
         
         if success:
             
-            user_lang = get_user_current_language(account_id)
+            user_lang = await aget_user_current_language(account_id)
             await notify_user_about_account_status(account_id, "rejected", reason=reason, user_lang=user_lang)
             
             messages_to_delete = []
@@ -682,11 +861,13 @@ async def handle_rejection_reason(update: Update, context: ContextTypes.DEFAULT_
             if 'rejection_prompt_message_id' in context.user_data:
                 messages_to_delete.append(context.user_data.pop('rejection_prompt_message_id'))
             
-            for message_id in messages_to_delete:
-                try:
-                    await context.bot.delete_message(chat_id=user_id, message_id=message_id)
-                except Exception as e:
-                    logger.exception(f"Failed to delete message {message_id}: {e}")
+            results = await asyncio.gather(
+                *(context.bot.delete_message(chat_id=user_id, message_id=message_id) for message_id in messages_to_delete),
+                return_exceptions=True,
+            )
+            for message_id, result in zip(messages_to_delete, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to delete message {message_id}: {result}")
             
             context.user_data.pop('awaiting_rejection_reason', None)
             
@@ -707,7 +888,7 @@ async def handle_rejection_reason(update: Update, context: ContextTypes.DEFAULT_
                 except Exception:
                     pass
             
-            asyncio.create_task(delete_success_msg())
+            spawn(delete_success_msg())
             
         else:
             
@@ -724,69 +905,180 @@ async def handle_rejection_reason(update: Update, context: ContextTypes.DEFAULT_
     
             
     
-def get_all_subscribers() -> List[Dict[str, Any]]:
-    
-    try:
-        db = SessionLocal()
-        subscribers = db.query(Subscriber).all()
-        result = []
-        for sub in subscribers:
-            result.append({
-                "telegram_id": sub.telegram_id,
-                "name": sub.name,
-                "lang": sub.lang
-            })
-        db.close()
-        return result
-    except Exception as e:
-        logger.exception(f"Failed to get all subscribers: {e}")
-        return []
+# البث يحتاج معرفات تيليجرام فقط، لذا لا داعي لبناء قواميس لكل صف
+SUBSCRIBER_IDS_BATCH = 1000
 
-def get_registered_users() -> List[Dict[str, Any]]:
-   
+def iter_subscriber_ids():
+    """Stream subscriber telegram ids in batches without building ORM objects."""
+    with SessionLocal() as db:
+        stmt = (
+            select(Subscriber.telegram_id)
+            .where(Subscriber.telegram_id.isnot(None))
+            .execution_options(yield_per=SUBSCRIBER_IDS_BATCH)
+        )
+        yield from db.scalars(stmt)
+
+def get_all_subscriber_ids() -> List[int]:
     try:
-        db = SessionLocal()
-       
-        subscribers = db.query(Subscriber).all()
-        result = []
-        for sub in subscribers:
-            result.append({
-                "telegram_id": sub.telegram_id,
-                "name": sub.name,
-                "lang": sub.lang
-            })
-        db.close()
-        return result
+        return list(iter_subscriber_ids())
     except Exception as e:
-        logger.exception(f"Failed to get registered users: {e}")
+        logger.exception(f"Failed to get subscriber ids: {e}")
         return []
 
-def get_approved_accounts_users() -> List[Dict[str, Any]]:
-   
+def get_approved_subscriber_ids() -> List[int]:
     try:
-        db = SessionLocal()
-        approved_accounts = db.query(TradingAccount).filter(TradingAccount.status == "active").all()
-        result = []
-        processed_users = set()
-        
-        for account in approved_accounts:
-            subscriber = account.subscriber
-            if subscriber.telegram_id and subscriber.telegram_id not in processed_users:
-                result.append({
-                    "telegram_id": subscriber.telegram_id,
-                    "name": subscriber.name,
-                    "lang": subscriber.lang,
-                    "account_number": account.account_number,
-                    "broker_name": account.broker_name
-                })
-                processed_users.add(subscriber.telegram_id)
-        
-        db.close()
-        return result
+        with SessionLocal() as db:
+            return list(db.scalars(
+                select(Subscriber.telegram_id)
+                .join(TradingAccount, TradingAccount.subscriber_id == Subscriber.id)
+                .where(TradingAccount.status == "active", Subscriber.telegram_id.isnot(None))
+                .distinct()
+            ))
     except Exception as e:
-        logger.exception(f"Failed to get approved accounts users: {e}")
+        logger.exception(f"Failed to get approved subscriber ids: {e}")
         return []
 
+# قوائم المستهدفين تتغير نادراً، لذا تُخزن مؤقتاً لكل نوع بث
+_TARGET_CACHE = TTLCache(maxsize=8, ttl=60)
+_TARGET_CACHE_LOCK = threading.Lock()
+_BROADCAST_TARGETS = {
+    "admin_broadcast_all": get_all_subscriber_ids,
+    "admin_broadcast_registered": get_all_subscriber_ids,
+    "admin_broadcast_approved": get_approved_subscriber_ids,
+}
+
+def get_broadcast_targets(broadcast_type: str) -> List[int]:
+    with _TARGET_CACHE_LOCK:
+        targets = _TARGET_CACHE.get(broadcast_type)
+    if targets is None:
+        targets = _BROADCAST_TARGETS[broadcast_type]()
+        if targets:
+            with _TARGET_CACHE_LOCK:
+                _TARGET_CACHE[broadcast_type] = targets
+    return targets
+
+async def aget_broadcast_targets(broadcast_type: str) -> List[int]:
+    return await asyncio.to_thread(get_broadcast_targets, broadcast_type)
+
+# تُستدعى أيضاً من دوال الكتابة التي تعمل داخل to_thread
+def invalidate_broadcast_targets():
+    with _TARGET_CACHE_LOCK:
+        _TARGET_CACHE.clear()
+
+# البث يرسل بالتوازي مع الالتزام بحد تيليجرام (~30 رسالة/ثانية)
+BROADCAST_CONCURRENCY = 25
+BROADCAST_LIMITER = AsyncLimiter(max_rate=25, time_period=1)
+
+# حدود تيليجرام للبوت ككل (~30 رسالة/ثانية) ولكل محادثة (رسالة/ثانية)
+BOT_SEND_LIMITER = AsyncLimiter(max_rate=30, time_period=1)
+_CHAT_LIMITERS = LRUCache(maxsize=10_000)
+
+def _chat_limiter(chat_id: int) -> AsyncLimiter:
+    limiter = _CHAT_LIMITERS.get(chat_id)
+    if limiter is None:
+        limiter = _CHAT_LIMITERS[chat_id] = AsyncLimiter(max_rate=1, time_period=1)
+    return limiter
+
+async def send_message_limited(chat_id: int, **kwargs):
+    """bot.send_message behind the per-chat and global send limits."""
+    async with _chat_limiter(chat_id), BOT_SEND_LIMITER:
+        return await application.bot.send_message(chat_id=chat_id, **kwargs)
+
+BROADCAST_MAX_RETRIES = 3
+BROADCAST_PROGRESS_INTERVAL = 2.0  # seconds between progress message edits
+
+async def send_broadcast_message(chat_id: int, text: str) -> bool:
+    """Send one broadcast message, waiting out Telegram flood limits."""
+    for _ in range(BROADCAST_MAX_RETRIES + 1):
+        try:
+            async with BROADCAST_LIMITER, BOT_SEND_LIMITER:
+                await application.bot.send_message(chat_id=chat_id, text=text)
+            return True
+        except RetryAfter as e:
+            retry_after = e.retry_after
+            if isinstance(retry_after, timedelta):
+                retry_after = retry_after.total_seconds()
+            logger.warning(f"Flood limit hit while broadcasting, retrying in {retry_after}s")
+            await asyncio.sleep(retry_after)
+        except Forbidden as e:
+            # المستخدم حظر البوت؛ لا فائدة من إعادة المحاولة
+            logger.info(f"Broadcast to {chat_id} forbidden: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Failed to send broadcast to {chat_id}: {e}")
+            return False
+    logger.error(f"Failed to send broadcast to {chat_id}: too many flood retries")
+    return False
+
+# نصوص ولوحات البث ثابتة لكل لغة، تُبنى مرة واحدة عند الاستيراد
+_BROADCAST_PROMPT: Dict[str, Tuple[str, InlineKeyboardMarkup]] = {
+    "ar": (
+        "📝 يرجى إرسال الرسالة التي تريد بثها:",
+        InlineKeyboardMarkup([[InlineKeyboardButton("❌ إلغاء", callback_data="admin_cancel_broadcast")]]),
+    ),
+    "en": (
+        "📝 Please send the message you want to broadcast:",
+        InlineKeyboardMarkup([[InlineKeyboardButton("❌ Cancel", callback_data="admin_cancel_broadcast")]]),
+    ),
+}
+
+_BROADCAST_CONFIRM_MARKUP: Dict[str, InlineKeyboardMarkup] = {
+    "ar": InlineKeyboardMarkup([[
+        InlineKeyboardButton("✅ نعم، إرسال", callback_data="admin_confirm_broadcast"),
+        InlineKeyboardButton("❌ إلغاء", callback_data="admin_cancel_broadcast"),
+    ]]),
+    "en": InlineKeyboardMarkup([[
+        InlineKeyboardButton("✅ Yes, Send", callback_data="admin_confirm_broadcast"),
+        InlineKeyboardButton("❌ Cancel", callback_data="admin_cancel_broadcast"),
+    ]]),
+}
+
+_BROADCAST_CONFIRM_TEXT = {
+    "ar": (
+        "📊 تفاصيل البث:\n"
+        "🎯 المستهدف: {target_name}\n"
+        "👥 عدد المستخدمين: {count}\n"
+        "📝 الرسالة:\n"
+        "{text}\n\n"
+        "هل تريد متابعة البث؟"
+    ),
+    "en": (
+        "📊 Broadcast Details:\n"
+        "🎯 Target: {target_name}\n"
+        "👥 Users Count: {count}\n"
+        "📝 Message:\n"
+        "{text}\n\n"
+        "Do you want to proceed with broadcasting?"
+    ),
+}
+
+_BROADCAST_START_TEXT = {
+    "ar": "⏳ جاري إرسال الرسالة لـ {total} مستخدم...",
+    "en": "⏳ Sending message to {total} users...",
+}
+
+_BROADCAST_PROGRESS_TEXT = {
+    "ar": "⏳ جاري الإرسال... {done}/{total}",
+    "en": "⏳ Sending... {done}/{total}",
+}
+
+_BROADCAST_REPORT_TEXT = {
+    "ar": (
+        "✅ تقرير البث:\n"
+        "🎯 المستهدف: {target_name}\n"
+        "✅ تم الإرسال بنجاح: {successful}\n"
+        "❌ فشل في الإرسال: {failed}\n"
+        "📊 الإجمالي: {total}"
+    ),
+    "en": (
+        "✅ Broadcast Report:\n"
+        "🎯 Target: {target_name}\n"
+        "✅ Successful: {successful}\n"
+        "❌ Failed: {failed}\n"
+        "📊 Total: {total}"
+    ),
+}
+
 async def handle_admin_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     q = update.callback_query
@@ -799,16 +1091,7 @@ async def handle_admin_broadcast(update: Update, context: ContextTypes.DEFAULT_T
     admin_lang = get_admin_language(user_id)
     context.user_data['broadcast_type'] = q.data
     
-    if admin_lang == "ar":
-        message = "📝 يرجى إرسال الرسالة التي تريد بثها:"
-        cancel_btn = "❌ إلغاء"
-    else:
-        message = "📝 Please send the message you want to broadcast:"
-        cancel_btn = "❌ Cancel"
-    
-    keyboard = [[InlineKeyboardButton(cancel_btn, callback_data="admin_cancel_broadcast")]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
+    message, reply_markup = _BROADCAST_PROMPT[admin_lang]
     await q.edit_message_text(message, reply_markup=reply_markup)
 
 async def process_admin_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -825,47 +1108,22 @@ async def process_admin_broadcast(update: Update, context: ContextTypes.DEFAULT_
     admin_lang = get_admin_language(user_id)
     
     if broadcast_type == "admin_broadcast_all":
-        target_users = get_all_subscribers()
+        target_users = await aget_broadcast_targets(broadcast_type)
         target_name = "جميع المشتركين" if admin_lang == "ar" else "All Subscribers"
     elif broadcast_type == "admin_broadcast_registered":
-        target_users = get_registered_users()
+        target_users = await aget_broadcast_targets(broadcast_type)
         target_name = "المسجلين ببيانات" if admin_lang == "ar" else "Registered Users"
     elif broadcast_type == "admin_broadcast_approved":
-        target_users = get_approved_accounts_users()
+        target_users = await aget_broadcast_targets(broadcast_type)
         target_name = "أصحاب الحسابات المقبولة" if admin_lang == "ar" else "Approved Accounts Owners"
     else:
         return
     
-    if admin_lang == "ar":
-        confirm_text = f"""
-📊 تفاصيل البث:
-🎯 المستهدف: {target_name}
-👥 عدد المستخدمين: {len(target_users)}
-📝 الرسالة:
-{message_text}
-
-هل تريد متابعة البث؟
-        """
-    else:
-        confirm_text = f"""
-📊 Broadcast Details:
-🎯 Target: {target_name}
-👥 Users Count: {len(target_users)}
-📝 Message:
-{message_text}
-
-Do you want to proceed with broadcasting?
-        """
+    confirm_text = _BROADCAST_CONFIRM_TEXT[admin_lang].format(
+        target_name=target_name, count=len(target_users), text=message_text
+    )
     
-    keyboard = [
-        [
-            InlineKeyboardButton("✅ نعم، إرسال" if admin_lang == "ar" else "✅ Yes, Send", 
-                               callback_data="admin_confirm_broadcast"),
-            InlineKeyboardButton("❌ إلغاء" if admin_lang == "ar" else "❌ Cancel", 
-                               callback_data="admin_cancel_broadcast")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = _BROADCAST_CONFIRM_MARKUP[admin_lang]
     context.user_data['broadcast_message'] = message_text
     context.user_data['target_users'] = target_users
     context.user_data['target_name'] = target_name
@@ -889,49 +1147,40 @@ async def execute_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
     target_name = context.user_data['target_name']
     admin_lang = get_admin_language(user_id)
     
-    if admin_lang == "ar":
-        progress_msg = await q.message.reply_text(f"⏳ جاري إرسال الرسالة لـ {len(target_users)} مستخدم...")
-    else:
-        progress_msg = await q.message.reply_text(f"⏳ Sending message to {len(target_users)} users...")
+    progress_msg = await q.message.reply_text(_BROADCAST_START_TEXT[admin_lang].format(total=len(target_users)))
     
     successful = 0
     failed = 0
+    semaphore = asyncio.Semaphore(BROADCAST_CONCURRENCY)
     
-    for user in target_users:
-        try:
-            await application.bot.send_message(
-                chat_id=user['telegram_id'],
-                text=message_text
-            )
+    async def _send(chat_id: int) -> bool:
+        async with semaphore:
+            return await send_broadcast_message(chat_id, message_text)
+    
+    total = len(target_users)
+    last_edit = time.monotonic()
+    for result in asyncio.as_completed([_send(chat_id) for chat_id in target_users]):
+        if await result:
             successful += 1
-        except Exception as e:
-            logger.error(f"Failed to send broadcast to {user['telegram_id']}: {e}")
+        else:
             failed += 1
         
-        if (successful + failed) % 10 == 0:
-            if admin_lang == "ar":
-                await progress_msg.edit_text(f"⏳ جاري الإرسال... {successful + failed}/{len(target_users)}")
-            else:
-                await progress_msg.edit_text(f"⏳ Sending... {successful + failed}/{len(target_users)}")
-    
-    if admin_lang == "ar":
-        report_text = f"""
-✅ تقرير البث:
-🎯 المستهدف: {target_name}
-✅ تم الإرسال بنجاح: {successful}
-❌ فشل في الإرسال: {failed}
-📊 الإجمالي: {len(target_users)}
-        """
-    else:
-        report_text = f"""
-✅ Broadcast Report:
-🎯 Target: {target_name}
-✅ Successful: {successful}
-❌ Failed: {failed}
-📊 Total: {len(target_users)}
-        """
+        # تحديث التقدم على فترات زمنية؛ آخر تحديث يحل محله التقرير النهائي
+        if successful + failed < total and time.monotonic() - last_edit >= BROADCAST_PROGRESS_INTERVAL:
+            last_edit = time.monotonic()
+            # فشل تحديث التقدم لا يوقف الحلقة؛ الإرسال مستمر في مهامه
+            try:
+                await progress_msg.edit_text(_BROADCAST_PROGRESS_TEXT[admin_lang].format(done=successful + failed, total=total))
+            except Exception as e:
+                logger.exception(f"Failed to update broadcast progress: {e}")
     
-    await progress_msg.edit_text(report_text)
+    report_text = _BROADCAST_REPORT_TEXT[admin_lang].format(
+        target_name=target_name, successful=successful, failed=failed, total=total
+    )
+    try:
+        await progress_msg.edit_text(report_text)
+    except Exception as e:
+        logger.exception(f"Failed to send broadcast report: {e}")
     
     context.user_data.pop('broadcast_type', None)
     context.user_data.pop('broadcast_message', None)
@@ -946,49 +1195,9 @@ async def admin_panel_from_callback(update: Update, context: ContextTypes.DEFAUL
     user_id = q.from_user.id
     
     admin_lang = get_admin_language(user_id)
+    text, reply_markup = _ADMIN_MENUS["admin_panel"][admin_lang]
     
-    if admin_lang == "ar":
-        title = "لوحة التحكم الإدارية"
-        buttons = [
-            "📢 ارسل رسالة",
-            "📊 التقارير",
-            "🏦 إدارة الحسابات",
-            "⚙️ الإعدادات",
-            "🚪 خروج"
-        ]
-        description = "\n\nلوحة التحكم."
-    else:
-        title = "Admin Control Panel"
-        buttons = [
-            "📢 Send Message",
-            "📊 Reports",
-            "🛠 Management",
-            "⚙️ Settings",
-            "🚪 Exit"
-        ]
-        description = "\n\nControl panel."
-    
-    header = build_header_html(title, buttons, header_emoji=HEADER_EMOJI, arabic_indent=1 if admin_lang == "ar" else 0)
-    
-    keyboard = []
-    for i in range(0, len(buttons) - 1, 2):
-        row = buttons[i:i+2]
-        keyboard_row = []
-        for btn in row:
-            if btn == "📢 ارسل رسالة" or btn == "📢 Send Message":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_broadcast_menu"))
-            elif btn == "📊 التقارير" or btn == "📊 Reports":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_stats"))
-            elif btn == "🏦 إدارة الحسابات" or btn == "🛠 Management":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_accounts_menu"))
-            elif btn == "⚙️ الإعدادات" or btn == "⚙️ Settings":
-                keyboard_row.append(InlineKeyboardButton(btn, callback_data="admin_settings"))
-        keyboard.append(keyboard_row)
-    
-    keyboard.append([InlineKeyboardButton(buttons[-1], callback_data="admin_exit")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await q.edit_message_text(header + description, reply_markup=reply_markup, parse_mode="HTML")
+    await q.edit_message_text(text, reply_markup=reply_markup, parse_mode="HTML")
 
 async def handle_admin_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
    
@@ -1026,49 +1235,45 @@ async def admin_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     else:
         await start(update, context)
 
+_EMOJI_RANGES = (
+    (0x1F300, 0x1F5FF),
+    (0x1F600, 0x1F64F),
+    (0x1F680, 0x1F6FF),
+    (0x1F900, 0x1F9FF),
+    (0x2600, 0x26FF),
+    (0x2700, 0x27BF),
+)
+_EMOJI_RE = re.compile(
+    "[" + "".join(f"{chr(lo)}-{chr(hi)}" for lo, hi in _EMOJI_RANGES + ((0x1FA70, 0x1FAFF),)) + "\uFE0F]"
+)
+_DIRECTIONALS_RE = re.compile(r'[\u200E\u200F\u202A-\u202E\u2066-\u2069\u200D\u200C]')
+_ARABIC_RE = re.compile(r'[\u0600-\u06FF]')
+
+@lru_cache(maxsize=4096)
 def remove_emoji(text: str) -> str:
-    out = []
-    for ch in text:
-        o = ord(ch)
-        if (
-            0x1F300 <= o <= 0x1F5FF or
-            0x1F600 <= o <= 0x1F64F or
-            0x1F680 <= o <= 0x1F6FF or
-            0x1F900 <= o <= 0x1F9FF or
-            0x2600 <= o <= 0x26FF or
-            0x2700 <= o <= 0x27BF or
-            0x1FA70 <= o <= 0x1FAFF or
-            o == 0xFE0F
-        ):
-            continue
-        out.append(ch)
-    return "".join(out)
+    return _EMOJI_RE.sub("", text)
+
+class _CharWidths(dict):
+    """Display width per character, computed on first sight and reused."""
 
+    def __missing__(self, ch: str) -> int:
+        if unicodedata.combining(ch):
+            width = 0
+        elif unicodedata.east_asian_width(ch) in ("F", "W"):
+            width = 2
+        else:
+            o = ord(ch)
+            width = 2 if o == 0xFE0F or any(lo <= o <= hi for lo, hi in _EMOJI_RANGES) else 1
+        self[ch] = width
+        return width
+
+_CHAR_WIDTHS = _CharWidths()
+
+@lru_cache(maxsize=4096)
 def display_width(text: str) -> int:
     if not text:
         return 0
-    width = 0
-    for ch in text:
-        if unicodedata.combining(ch):
-            continue
-        ea = unicodedata.east_asian_width(ch)
-        if ea in ("F", "W"):
-            width += 2
-            continue
-        o = ord(ch)
-        if (
-            0x1F300 <= o <= 0x1F5FF
-            or 0x1F600 <= o <= 0x1F64F
-            or 0x1F680 <= o <= 0x1F6FF
-            or 0x1F900 <= o <= 0x1F9FF
-            or 0x2600 <= o <= 0x26FF
-            or 0x2700 <= o <= 0x27BF
-            or o == 0xFE0F
-        ):
-            width += 2
-            continue
-        width += 1
-    return width
+    return sum(map(_CHAR_WIDTHS.__getitem__, text))
 
 def max_button_width(labels: List[str]) -> int:
     return max((display_width(lbl) for lbl in labels), default=0)
@@ -1084,23 +1289,23 @@ def build_webapp_header(title: str, lang: str, labels: List[str] = None) -> str:
         arabic_indent=1 if lang == "ar" else 0
     )
 
+def _load_agents() -> Dict[str, str]:
+    agents_list = [agent.strip() for agent in os.getenv("AGENTS_LIST", "").split(",") if agent.strip()]
+    agents_link = [link.strip() for link in os.getenv("AGENTS_LINK", "").split(",") if link.strip()]
+    agents: Dict[str, str] = {}
+    if len(agents_list) == len(agents_link):
+        for agent, link in zip(agents_list, agents_link):
+            agents.setdefault(agent, link)
+    return agents
+
+# اسم الوكيل → رابطه، يُقرأ من متغيرات البيئة مرة واحدة
+_AGENTS = _load_agents()
+
 def get_agent_username(agent_name: str) -> str:
     
     if not agent_name:
         return "@Omarkin9"
-    
-    agents_list = os.getenv("AGENTS_LIST", "").split(",")
-    agents_link = os.getenv("AGENTS_LINK", "").split(",")
-    
-    agents_list = [agent.strip() for agent in agents_list if agent.strip()]
-    agents_link = [link.strip() for link in agents_link if link.strip()]
-    
-    if len(agents_list) == len(agents_link):
-        for i, agent in enumerate(agents_list):
-            if agent == agent_name and i < len(agents_link):
-                return agents_link[i]
-    
-    return "@Omarkin9"
+    return _AGENTS.get(agent_name, "@Omarkin9")
 
 # -------------------------------
 # consistent header builder
@@ -1113,14 +1318,23 @@ def build_header_html(
     underline_char: str = "━",
     arabic_indent: int = 0,
 ) -> str:
+    # keyboard_labels لا تؤثر على الناتج، لذا لا تدخل في مفتاح الكاش
+    return _build_header_html(title, header_emoji, underline_enabled, underline_char, arabic_indent)
+
+@lru_cache(maxsize=512)
+def _build_header_html(
+    title: str,
+    header_emoji: str,
+    underline_enabled: bool,
+    underline_char: str,
+    arabic_indent: int,
+) -> str:
     
     NBSP = "\u00A0"
     RLE = "\u202B"
     PDF = "\u202C"
     RLM = "\u200F"
     LLM = "\u200E"
-    def _strip_directionals(s: str) -> str:
-        return re.sub(r'[\u200E\u200F\u202A-\u202E\u2066-\u2069\u200D\u200C]', '', s)
 
     MIN_TITLE_WIDTH = 29
     clean_title = remove_emoji(title)
@@ -1131,7 +1345,7 @@ def build_header_html(
         right_pad = extra_spaces - left_pad
         title = f"{' ' * left_pad}{title}{' ' * right_pad}"
 
-    is_arabic = bool(re.search(r'[\u0600-\u06FF]', title))
+    is_arabic = bool(_ARABIC_RE.search(title))
 
     if is_arabic:
         indent = NBSP * arabic_indent
@@ -1139,7 +1353,7 @@ def build_header_html(
     else:
         visible_title = f"{header_emoji} {title} {header_emoji}"
 
-    measure_title = _strip_directionals(visible_title)
+    measure_title = _DIRECTIONALS_RE.sub('', visible_title)
     title_width = display_width(measure_title)
     
    
@@ -1161,17 +1375,75 @@ def build_header_html(
             underline_line = "\n" + (underline_char * target_width)
 
     return centered_line + underline_line
+
+# قوائم الإدارة ثابتة لكل لغة، لذا تُبنى مرة واحدة عند التحميل
+_ADMIN_MENUS: Dict[str, Dict[str, Tuple[str, InlineKeyboardMarkup]]] = {
+    name: {lang: builder(lang) for lang in ("ar", "en")}
+    for name, builder in (
+        ("admin_panel", _build_admin_panel),
+        ("admin_broadcast_menu", _build_admin_broadcast_menu),
+        ("admin_accounts_menu", _build_admin_accounts_menu),
+        ("admin_settings", _build_admin_settings),
+        ("admin_change_language", _build_admin_change_language),
+    )
+}
+
 # -------------------------------
 # DB helpers
 # -------------------------------
+# حلقة الأحداث الرئيسية، تُضبط عند بدء التشغيل حتى تتمكن الدوال التي تعمل
+# في خيوط asyncio.to_thread من جدولة المهام عليها
+_MAIN_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+# مراجع المهام الخلفية حتى لا يجمعها الـ GC أثناء التنفيذ، وننتظرها عند الإيقاف
+_BG_TASKS: Set[asyncio.Task] = set()
+
+def _on_bg_task_done(task: asyncio.Task):
+    _BG_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task failed: {task.exception()!r}")
+
+def spawn(coro) -> asyncio.Task:
+    """Run coro in the background, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _BG_TASKS.add(task)
+    task.add_done_callback(_on_bg_task_done)
+    return task
+
+# أقصى مدة ننتظرها للمهام الخلفية عند الإيقاف قبل إلغاء المتبقي
+BG_TASKS_DRAIN_TIMEOUT = 10
+
+async def drain_background_tasks(timeout: float = BG_TASKS_DRAIN_TIMEOUT):
+    if not _BG_TASKS:
+        return
+    _, pending = await asyncio.wait(list(_BG_TASKS), timeout=timeout)
+    if pending:
+        logger.warning(f"Cancelling {len(pending)} background tasks still running after {timeout}s")
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+def call_soon_on_loop(coro):
+    """Schedule coro on the bot's event loop from the loop thread or a worker thread."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        return spawn(coro)
+    if _MAIN_LOOP is None:
+        coro.close()
+        raise RuntimeError("Event loop is not running")
+    return _MAIN_LOOP.call_soon_threadsafe(spawn, coro)
+
 def save_or_update_subscriber(name: str, email: str, phone: str, lang: str = "ar", telegram_id: int = None, telegram_username: str = None) -> Tuple[str, Subscriber]:
     
     try:
-        db = SessionLocal()
-        subscriber = None
-        
-        if telegram_id:
-            subscriber = db.query(Subscriber).filter(Subscriber.telegram_id == telegram_id).first()
+        with SessionLocal() as db:
+            subscriber = None
+            
+            if telegram_id:
+                subscriber = db.query(Subscriber).filter(Subscriber.telegram_id == telegram_id).first()
             if subscriber:
                 subscriber.name = name
                 subscriber.email = email
@@ -1179,7 +1451,6 @@ def save_or_update_subscriber(name: str, email: str, phone: str, lang: str = "ar
                 subscriber.telegram_username = telegram_username
                 if lang:
                     subscriber.lang = lang
-                db.commit()
                 result = "updated"
             else:
                 subscriber = Subscriber(
@@ -1191,23 +1462,15 @@ def save_or_update_subscriber(name: str, email: str, phone: str, lang: str = "ar
                     lang=lang or "ar"
                 )
                 db.add(subscriber)
-                db.commit()
                 result = "created"
-        else:
-            subscriber = Subscriber(
-                name=name,
-                email=email,
-                phone=phone,
-                telegram_username=telegram_username,
-                telegram_id=telegram_id,
-                lang=lang or "ar"
-            )
-            db.add(subscriber)
             db.commit()
-            result = "created"
         
-        db.refresh(subscriber)
-        db.close()
+        invalidate_broadcast_targets()
+        invalidate_admin_stats()
+        if telegram_id:
+            invalidate_subscriber_cache(telegram_id)
+            invalidate_lang_cache(telegram_id)
+            invalidate_accounts_cache(telegram_id)
         return result, subscriber
         
     except Exception as e:
@@ -1248,30 +1511,31 @@ def save_trading_account(
                 logger.error(f"Missing required field: {field_name}")
                 return False, None
         
-        db = SessionLocal()
-        subscriber = db.query(Subscriber).filter(Subscriber.id == subscriber_id).first()
-        if not subscriber:
-            logger.error(f"Subscriber with id {subscriber_id} not found")
-            return False, None
-        
-        trading_account = TradingAccount(
-            subscriber_id=subscriber_id,
-            broker_name=broker_name,
-            account_number=account_number,
-            password=password,
-            server=server,
-            initial_balance=initial_balance,
-            current_balance=current_balance,
-            withdrawals=withdrawals,
-            copy_start_date=copy_start_date,
-            agent=agent,
-            expected_return=expected_return,
-            status="under_review"
-        )
-        
-        db.add(trading_account)
-        db.commit()
-        db.refresh(trading_account)
+        with SessionLocal() as db:
+            subscriber = db.query(Subscriber).filter(Subscriber.id == subscriber_id).first()
+            if not subscriber:
+                logger.error(f"Subscriber with id {subscriber_id} not found")
+                return False, None
+            
+            trading_account = TradingAccount(
+                subscriber_id=subscriber_id,
+                broker_name=broker_name,
+                account_number=account_number,
+                password=password,
+                server=server,
+                initial_balance=initial_balance,
+                current_balance=current_balance,
+                withdrawals=withdrawals,
+                copy_start_date=copy_start_date,
+                agent=agent,
+                expected_return=expected_return,
+                status="under_review"
+            )
+            
+            db.add(trading_account)
+            db.commit()
+        invalidate_admin_stats()
+        invalidate_accounts_cache(subscriber.telegram_id)
         
         account_data = {
             "id": trading_account.id,
@@ -1296,11 +1560,8 @@ def save_trading_account(
             "telegram_id": subscriber.telegram_id
         }
         
-        db.close()
-        
-        import asyncio
         try:
-            asyncio.create_task(send_admin_notification("new_account", account_data, subscriber_data))
+            call_soon_on_loop(send_admin_notification("new_account", account_data, subscriber_data))
         except Exception as e:
             logger.exception(f"Failed to send admin notification: {e}")
         
@@ -1310,7 +1571,7 @@ def save_trading_account(
         logger.exception("Failed to save trading account: %s", e)
         return False, None
 
-def update_trading_account(account_id: int, **kwargs) -> Tuple[bool, TradingAccount]:
+def update_trading_account(account_id: int, owner_telegram_id: Optional[int] = None, **kwargs) -> Tuple[bool, TradingAccount]:
     
     try:
         
@@ -1325,28 +1586,35 @@ def update_trading_account(account_id: int, **kwargs) -> Tuple[bool, TradingAcco
                 logger.error(f"Missing required field in update: {field}")
                 return False, None
         
-        db = SessionLocal()
-        account = db.query(TradingAccount).filter(TradingAccount.id == account_id).first()
-        if not account:
-            db.close()
-            return False, None
-        
-        old_data = {
-            "broker_name": account.broker_name,
-            "account_number": account.account_number,
-            "server": account.server
-        }
-        
-        for key, value in kwargs.items():
-            if hasattr(account, key) and value is not None:
-                setattr(account, key, value)
-        
-        account.status = "under_review"
-        account.rejection_reason = None 
-        
-        db.commit()
-        db.refresh(account)
-        subscriber = account.subscriber
+        with SessionLocal() as db:
+            query = (
+                db.query(TradingAccount)
+                .options(joinedload(TradingAccount.subscriber))
+                .filter(TradingAccount.id == account_id)
+            )
+            # التحقق من ملكية الحساب داخل نفس الاستعلام
+            if owner_telegram_id is not None:
+                query = query.join(TradingAccount.subscriber).filter(Subscriber.telegram_id == owner_telegram_id)
+            account = query.first()
+            if not account:
+                return False, None
+            
+            old_data = {
+                "broker_name": account.broker_name,
+                "account_number": account.account_number,
+                "server": account.server
+            }
+            
+            for key, value in kwargs.items():
+                if hasattr(account, key) and value is not None:
+                    setattr(account, key, value)
+            
+            account.status = "under_review"
+            account.rejection_reason = None 
+            
+            db.commit()
+            subscriber = account.subscriber
+        invalidate_accounts_cache(subscriber.telegram_id)
         account_data = {
             "id": account.id,
             "broker_name": account.broker_name,
@@ -1371,11 +1639,11 @@ def update_trading_account(account_id: int, **kwargs) -> Tuple[bool, TradingAcco
             "telegram_id": subscriber.telegram_id
         }
         
-        db.close()
+        invalidate_broadcast_targets()
+        invalidate_admin_stats()
         
-        import asyncio
         try:
-            asyncio.create_task(send_admin_notification("updated_account", account_data, subscriber_data))
+            call_soon_on_loop(send_admin_notification("updated_account", account_data, subscriber_data))
         except Exception as e:
             logger.exception(f"Failed to send admin notification: {e}")
         
@@ -1384,91 +1652,129 @@ def update_trading_account(account_id: int, **kwargs) -> Tuple[bool, TradingAcco
         logger.exception("Failed to update trading account: %s", e)
         return False, None
 
-def delete_trading_account(account_id: int) -> bool:
+def delete_trading_account(account_id: int, owner_telegram_id: Optional[int] = None) -> bool:
     
     try:
-        db = SessionLocal()
-        account = db.query(TradingAccount).filter(TradingAccount.id == account_id).first()
-        if not account:
-            db.close()
-            return False
-        
-       
-        if account.status == "under_review":
-            db.close()
-            return False
-        
-        db.delete(account)
-        db.commit()
-        db.close()
+        with SessionLocal() as db:
+            query = (
+                db.query(TradingAccount)
+                .options(joinedload(TradingAccount.subscriber))
+                .filter(TradingAccount.id == account_id)
+            )
+            if owner_telegram_id is not None:
+                query = query.join(TradingAccount.subscriber).filter(Subscriber.telegram_id == owner_telegram_id)
+            account = query.first()
+            if not account:
+                return False
+            
+           
+            if account.status == "under_review":
+                return False
+            
+            telegram_id = account.subscriber.telegram_id
+            db.delete(account)
+            db.commit()
+        invalidate_broadcast_targets()
+        invalidate_admin_stats()
+        invalidate_accounts_cache(telegram_id)
         return True
     except Exception as e:
         logger.exception("Failed to delete trading account: %s", e)
         return False
 
+# المشتركون المعروفون يُخزنون لفترة قصيرة حتى لا تصل رسائل النص المتكررة لقاعدة البيانات؛
+# الإدخال يُحذف عند الحفظ، وتُستدعى الإزالة من خيوط to_thread لذا نحميه بقفل
+_SUBSCRIBER_CACHE = TTLCache(maxsize=10_000, ttl=60)
+_SUBSCRIBER_CACHE_LOCK = threading.Lock()
+
+def invalidate_subscriber_cache(tg_id: int):
+    with _SUBSCRIBER_CACHE_LOCK:
+        _SUBSCRIBER_CACHE.pop(tg_id, None)
+
 def get_subscriber_by_telegram_id(tg_id: int) -> Optional[Subscriber]:
     
-    try:
-        db = SessionLocal()
-        subscriber = db.query(Subscriber).filter(Subscriber.telegram_id == tg_id).first()
-        db.close()
+    with _SUBSCRIBER_CACHE_LOCK:
+        subscriber = _SUBSCRIBER_CACHE.get(tg_id)
+    if subscriber is not None:
         return subscriber
+    try:
+        with SessionLocal() as db:
+            subscriber = db.query(Subscriber).filter(Subscriber.telegram_id == tg_id).first()
     except Exception as e:
         logger.exception("DB lookup failed")
         return None
+    if subscriber is not None:
+        with _SUBSCRIBER_CACHE_LOCK:
+            _SUBSCRIBER_CACHE[tg_id] = subscriber
+    return subscriber
+
+def subscriber_to_dict(subscriber: Subscriber) -> Dict[str, Any]:
+    """Plain-dict view of a subscriber whose trading_accounts are already loaded."""
+    return {
+        "id": subscriber.id,
+        "name": subscriber.name,
+        "email": subscriber.email,
+        "phone": subscriber.phone,
+        "telegram_username": subscriber.telegram_username,
+        "telegram_id": subscriber.telegram_id,
+        "lang": subscriber.lang,
+        "trading_accounts": [
+            {
+                "id": acc.id,
+                "broker_name": acc.broker_name,
+                "account_number": acc.account_number,
+                "password": acc.password,
+                "server": acc.server,
+                "initial_balance": acc.initial_balance,
+                "current_balance": acc.current_balance,
+                "withdrawals": acc.withdrawals,
+                "copy_start_date": acc.copy_start_date,
+                "agent": acc.agent,
+                "expected_return": acc.expected_return,
+                "created_at": acc.created_at,
+                "status": acc.status,
+                "rejection_reason": acc.rejection_reason
+            }
+            for acc in subscriber.trading_accounts
+        ]
+    }
 
-def get_trading_accounts_by_telegram_id(tg_id: int) -> List[TradingAccount]:
-    
-    try:
-        db = SessionLocal()
-        subscriber = db.query(Subscriber).filter(Subscriber.telegram_id == tg_id).first()
-        if subscriber:
-            accounts = subscriber.trading_accounts
-            db.close()
-            return accounts
-        db.close()
-        return []
-    except Exception as e:
-        logger.exception("Failed to get trading accounts")
-        return []
+# بيانات المشترك مع حساباته تُقرأ عدة مرات في كل عملية تعديل (واجهة الويب ثم تحديث رسالة البوت)؛
+# تُخزن لفترة قصيرة، وكل كتابة على المشترك أو حساباته تحذف الإدخال
+_ACCOUNTS_CACHE = TTLCache(maxsize=10_000, ttl=60)
+_ACCOUNTS_CACHE_LOCK = threading.Lock()
+# رقم آخر إبطال لكل مشترك: القراءة التي بدأت قبل الكتابة لا تُخزن نتيجتها القديمة بعد الإبطال
+_ACCOUNTS_GENERATIONS = LRUCache(maxsize=10_000)
+_ACCOUNTS_GENERATION_COUNTER = itertools.count(1)
+
+def invalidate_accounts_cache(tg_id: Optional[int]):
+    if tg_id is None:
+        return
+    with _ACCOUNTS_CACHE_LOCK:
+        _ACCOUNTS_CACHE.pop(tg_id, None)
+        _ACCOUNTS_GENERATIONS[tg_id] = next(_ACCOUNTS_GENERATION_COUNTER)
 
 def get_subscriber_with_accounts(tg_id: int) -> Optional[Dict[str, Any]]:
     
+    with _ACCOUNTS_CACHE_LOCK:
+        cached = _ACCOUNTS_CACHE.get(tg_id)
+        generation = _ACCOUNTS_GENERATIONS.get(tg_id)
+    if cached is not None:
+        return cached
     try:
-        db = SessionLocal()
-        subscriber = db.query(Subscriber).filter(Subscriber.telegram_id == tg_id).first()
+        with SessionLocal() as db:
+            subscriber = (
+                db.query(Subscriber)
+                .options(selectinload(Subscriber.trading_accounts))
+                .filter(Subscriber.telegram_id == tg_id)
+                .first()
+            )
         if subscriber:
-            result = {
-                "id": subscriber.id,
-                "name": subscriber.name,
-                "email": subscriber.email,
-                "phone": subscriber.phone,
-                "telegram_username": subscriber.telegram_username,
-                "telegram_id": subscriber.telegram_id,
-                "lang": subscriber.lang,
-                "trading_accounts": [
-                    {
-                        "id": acc.id,
-                        "broker_name": acc.broker_name,
-                        "account_number": acc.account_number,
-                        "password": acc.password,
-                        "server": acc.server,
-                        "initial_balance": acc.initial_balance,
-                        "current_balance": acc.current_balance,
-                        "withdrawals": acc.withdrawals,
-                        "copy_start_date": acc.copy_start_date,
-                        "agent": acc.agent,
-                        "expected_return": acc.expected_return,
-                        "created_at": acc.created_at,
-                        "status": acc.status,
-                        "rejection_reason": acc.rejection_reason
-                    }
-                    for acc in subscriber.trading_accounts
-                ]
-            }
-            db.close()
-            return result
-        db.close()
+            data = subscriber_to_dict(subscriber)
+            with _ACCOUNTS_CACHE_LOCK:
+                if _ACCOUNTS_GENERATIONS.get(tg_id) == generation:
+                    _ACCOUNTS_CACHE[tg_id] = data
+            return data
         return None
     except Exception as e:
         logger.exception("Failed to get subscriber with accounts")
@@ -1507,22 +1813,23 @@ PHONE_RE = re.compile(r"^[+0-9\-\s]{6,20}$")
 def get_user_current_language(account_id: int) -> str:
     
     try:
-        db = SessionLocal()
-        account = db.query(TradingAccount).filter(TradingAccount.id == account_id).first()
-        if not account:
-            db.close()
+        with SessionLocal() as db:
+            row = (
+                db.query(Subscriber.telegram_id, Subscriber.lang)
+                .join(TradingAccount, TradingAccount.subscriber_id == Subscriber.id)
+                .filter(TradingAccount.id == account_id)
+                .first()
+            )
+        if not row:
             return "ar"
         
-        subscriber = account.subscriber
-        telegram_id = subscriber.telegram_id
+        telegram_id, lang = row
         
         form_ref = get_form_ref(telegram_id)
         if form_ref and form_ref.get("lang"):
-            db.close()
             return form_ref["lang"]
         
-        db.close()
-        return subscriber.lang or "ar"
+        return lang or "ar"
     except Exception as e:
         logger.exception(f"Failed to get user current language: {e}")
         return "ar"
@@ -1530,25 +1837,51 @@ def get_user_current_language(account_id: int) -> str:
 def update_account_status(account_id: int, status: str, reason: str = None) -> bool:
     
     try:
-        db = SessionLocal()
-        account = db.query(TradingAccount).filter(TradingAccount.id == account_id).first()
-        if not account:
-            db.close()
-            return False
-        
-        account.status = status
-        if status == "rejected":
-            account.rejection_reason = reason
-        else:
-            account.rejection_reason = None
-        
-        db.commit()
-        db.close()
+        with SessionLocal() as db:
+            account = (
+                db.query(TradingAccount)
+                .options(joinedload(TradingAccount.subscriber))
+                .filter(TradingAccount.id == account_id)
+                .first()
+            )
+            if not account:
+                return False
+            
+            account.status = status
+            if status == "rejected":
+                account.rejection_reason = reason
+            else:
+                account.rejection_reason = None
+            
+            db.commit()
+            telegram_id = account.subscriber.telegram_id
+        invalidate_broadcast_targets()
+        invalidate_admin_stats()
+        invalidate_accounts_cache(telegram_id)
         return True
     except Exception as e:
         logger.exception(f"Failed to update account status: {e}")
         return False
 
+# نسخ غير متزامنة تنفذ استعلامات قاعدة البيانات خارج حلقة الأحداث
+async def asave_or_update_subscriber(*args, **kwargs):
+    return await asyncio.to_thread(save_or_update_subscriber, *args, **kwargs)
+
+async def asave_trading_account(*args, **kwargs):
+    return await asyncio.to_thread(save_trading_account, *args, **kwargs)
+
+async def aupdate_trading_account(*args, **kwargs):
+    return await asyncio.to_thread(update_trading_account, *args, **kwargs)
+
+async def adelete_trading_account(*args, **kwargs):
+    return await asyncio.to_thread(delete_trading_account, *args, **kwargs)
+
+async def aupdate_account_status(*args, **kwargs):
+    return await asyncio.to_thread(update_account_status, *args, **kwargs)
+
+async def aget_user_current_language(*args, **kwargs):
+    return await asyncio.to_thread(get_user_current_language, *args, **kwargs)
+
 async def handle_admin_actions(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
     await q.answer()
@@ -1565,9 +1898,9 @@ async def handle_admin_actions(update: Update, context: ContextTypes.DEFAULT_TYP
     
     if q.data.startswith("activate_account_"):
         account_id = int(q.data.split("_")[2])
-        success = update_account_status(account_id, "active")
+        success = await aupdate_account_status(account_id, "active")
         if success:
-            user_lang = get_user_current_language(account_id)
+            user_lang = await aget_user_current_language(account_id)
             await notify_user_about_account_status(account_id, "active", user_lang=user_lang)
             
             try:
@@ -1587,7 +1920,7 @@ async def handle_admin_actions(update: Update, context: ContextTypes.DEFAULT_TYP
                 except Exception:
                     pass
             
-            asyncio.create_task(delete_success_msg())
+            spawn(delete_success_msg())
             
         else:
             try:
@@ -1609,17 +1942,18 @@ async def handle_admin_actions(update: Update, context: ContextTypes.DEFAULT_TYP
             
             
 async def delete_all_notification_messages(account_id: int, context: ContextTypes.DEFAULT_TYPE):
-    if account_id in NOTIFICATION_MESSAGES:
-        for msg_info in NOTIFICATION_MESSAGES[account_id]:
-            try:
-                await context.bot.delete_message(
-                    chat_id=msg_info['chat_id'],
-                    message_id=msg_info['message_id']
-                )
-            except Exception as e:
-                logger.exception(f"Failed to delete notification message for admin {msg_info['admin_id']}: {e}")
-        
-        del NOTIFICATION_MESSAGES[account_id]
+    messages = pop_notifications(account_id)
+    if messages:
+        results = await asyncio.gather(
+            *(
+                context.bot.delete_message(chat_id=msg_info['chat_id'], message_id=msg_info['message_id'])
+                for msg_info in messages
+            ),
+            return_exceptions=True,
+        )
+        for msg_info, result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to delete notification message for admin {msg_info['admin_id']}: {result}")
         
 async def handle_notification_confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE):
    
@@ -1632,154 +1966,195 @@ async def handle_notification_confirmation(update: Update, context: ContextTypes
     except Exception as e:
         logger.exception(f"Failed to delete notification message: {e}")
 
+# نصوص إشعار حالة الحساب للمستخدم لكل لغة
+_I18N = {
+    "ar": {
+        "active_title": "مــــــبــــــــــــارك",
+        "not_activated_title": "لم يتم تفعيل الحساب",
+        "ok_label": "✅ حسناً",
+        "reason_prefix": "📝 السبب:",
+        "arabic_indent": 1,
+        "active_msg": (
+            "{header}\n"
+            "✅ تم ربط الحساب بخدمة النسخ\n\n"
+            "🏦 الوسيط: {broker}\n"
+            "🔢 رقم الحساب: {number}\n"
+            "🖥️ السيرفر: {server}\n\n"
+            "نتمنى لك التوفيق.\n"
+            "وشكراً علي اختيارك لنظام YesFX!"
+        ),
+        "rejected_msg": (
+            "{header}\n"
+            "❌ لم يتم تفعيل حسابك{reason}\n\n"
+            "🏦 الوسيط: {broker}\n"
+            "🔢 رقم الحساب: {number}\n\n"
+            "يرجى مراجعة البيانات المقدمة\n"
+            "أو التواصل مع {agent}."
+        ),
+    },
+    "en": {
+        "active_title": "Congratulations",
+        "not_activated_title": "Account Not Activated",
+        "ok_label": "✅ OK",
+        "reason_prefix": "📝 Reason:",
+        "arabic_indent": 0,
+        "active_msg": (
+            "{header}\n"
+            "✅ Your account is linked to the copy service️\n\n"
+            "🏦 Broker: {broker}\n"
+            "🔢 Account Number: {number}\n"
+            "🖥️ Server: {server}\n\n"
+            "Wishing you success.\n"
+            "Thanks for choosing YesFX!"
+        ),
+        "rejected_msg": (
+            "{header}\n"
+            "Your account was not activated ❌{reason}\n\n"
+            "🏦 Broker: {broker}\n"
+            "🔢 Account Number: {number}\n\n"
+            "Please review the submitted data\n"
+            "or contact {agent}."
+        ),
+    },
+}
+
+# رؤوس إشعارات الحالة ثابتة: (نوع الإشعار، اللغة) → HTML
+_HEADERS = {
+    (kind, lang): build_header_html(
+        _I18N[lang][f"{kind}_title"], [_I18N[lang]["ok_label"]],
+        header_emoji=emoji, arabic_indent=_I18N[lang]["arabic_indent"]
+    )
+    for kind, emoji in (("active", "🎉"), ("not_activated", "❗️"))
+    for lang in ("ar", "en")
+}
+
+def _load_account_for_notification(account_id: int) -> Optional[Tuple[TradingAccount, Dict[str, Any]]]:
+    # جلسة واحدة تحمّل الحساب والمشترك وكل حساباته لتحديث الواجهة بعدها
+    with SessionLocal() as db:
+        account = (
+            db.query(TradingAccount)
+            .options(joinedload(TradingAccount.subscriber).selectinload(Subscriber.trading_accounts))
+            .filter(TradingAccount.id == account_id)
+            .first()
+        )
+        if not account:
+            return None
+        return account, subscriber_to_dict(account.subscriber)
+
 async def notify_user_about_account_status(account_id: int, status: str, reason: str = None, user_lang: str = None):
     
     try:
-        db = SessionLocal()
-        account = db.query(TradingAccount).filter(TradingAccount.id == account_id).first()
-        if not account:
-            db.close()
+        loaded = await asyncio.to_thread(_load_account_for_notification, account_id)
+        if not loaded:
             return
-        
+        account, subscriber_data = loaded
         subscriber = account.subscriber
+        
         telegram_id = subscriber.telegram_id
         
         lang = user_lang or subscriber.lang or "ar"
         
+        lang_key = "ar" if lang == "ar" else "en"
+        t = _I18N[lang_key]
+        # الرسالة تُرسل بـ HTML، لذا تُهرّب بيانات المستخدم قبل إدراجها
+        broker = html.escape(str(account.broker_name))
+        number = html.escape(str(account.account_number))
         if status == "active":
-            if lang == "ar":
-                title = "مــــــبــــــــــــارك"
-                labels = ["✅ حسناً"]
-                header = build_header_html(title, labels, header_emoji="🎉", arabic_indent=1)
-                message = f"""
-{header}
-✅ تم ربط الحساب بخدمة النسخ
-
-🏦 الوسيط: {account.broker_name}
-🔢 رقم الحساب: {account.account_number}
-🖥️ السيرفر: {account.server}
-
-نتمنى لك التوفيق.
-وشكراً علي اختيارك لنظام YesFX!
-                """
-            else:
-                title = "Congratulations"
-                labels = ["✅ OK"]
-                header = build_header_html(title, labels, header_emoji="🎉", arabic_indent=0)
-                message = f"""
-{header}
-✅ Your account is linked to the copy service️
-
-🏦 Broker: {account.broker_name}
-🔢 Account Number: {account.account_number}
-🖥️ Server: {account.server}
-
-Wishing you success.
-Thanks for choosing YesFX!
-                """
+            header = _HEADERS[("active", lang_key)]
+            message = t["active_msg"].format(
+                header=header, broker=broker, number=number, server=html.escape(str(account.server))
+            )
         else:
-            
-            agent_username = get_agent_username(account.agent)
-            
-            if lang == "ar":
-                title = "لم يتم تفعيل الحساب"
-                labels = ["✅ حسناً"]
-                header = build_header_html(title, labels, header_emoji="❗️",  arabic_indent=1)
-                reason_text = f"\n📝 السبب: {reason}" if reason else ""
-                message = f"""
-{header}
-❌ لم يتم تفعيل حسابك{reason_text}
-
-🏦 الوسيط: {account.broker_name}
-🔢 رقم الحساب: {account.account_number}
-
-يرجى مراجعة البيانات المقدمة
-أو التواصل مع {agent_username}.
-                """
-            else:
-                title = "Account Not Activated"
-                labels = ["✅ OK"]
-                header = build_header_html(title, labels, header_emoji="❗️", arabic_indent=0)
-                reason_text = f"\n📝 Reason: {reason}" if reason else ""
-                message = f"""
-{header}
-Your account was not activated ❌{reason_text}
-
-🏦 Broker: {account.broker_name}
-🔢 Account Number: {account.account_number}
-
-Please review the submitted data
-or contact {agent_username}.
-                """
+            header = _HEADERS[("not_activated", lang_key)]
+            reason_text = f"\n{t['reason_prefix']} {html.escape(reason)}" if reason else ""
+            message = t["rejected_msg"].format(
+                header=header, reason=reason_text, broker=broker,
+                number=number, agent=get_agent_username(account.agent)
+            )
 
-        keyboard = [
-            [InlineKeyboardButton("✅ حسناً" if lang == "ar" else "✅ OK", 
-                                callback_data=f"confirm_notification_{account_id}")]
-        ]
+        keyboard = [[InlineKeyboardButton(t["ok_label"], callback_data=f"confirm_notification_{account_id}")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        sent_message = await application.bot.send_message(
+        sent_message = await send_message_limited(
             chat_id=telegram_id,
             text=message,
             reply_markup=reply_markup,
             parse_mode="HTML"
         )
-        
-        db.close()
 
-        await update_user_interface_after_status_change(telegram_id, lang)
+        # تحديث شاشة الحسابات لا يؤخر استجابة المشرف
+        spawn(update_user_interface_after_status_change(telegram_id, lang, subscriber_data))
         
     except Exception as e:
         logger.exception(f"Failed to notify user about account status: {e}")
 
-async def update_user_interface_after_status_change(telegram_id: int, lang: str):
+async def update_user_interface_after_status_change(telegram_id: int, lang: str, subscriber_data: Optional[Dict[str, Any]] = None):
     
     ref = get_form_ref(telegram_id)
     if ref and ref.get("origin") == "my_accounts":
-        updated_data = get_subscriber_with_accounts(telegram_id)
-        if updated_data:
-            await refresh_user_accounts_interface(telegram_id, lang, ref["chat_id"], ref["message_id"])
+        await refresh_user_accounts_interface(
+            telegram_id, lang, ref["chat_id"], ref["message_id"], updated_data=subscriber_data
+        )
 
-async def admin_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    
-    if await handle_rejection_reason(update, context):
-        return
-    
-    if 'broadcast_type' in context.user_data and 'broadcast_message' not in context.user_data:
-        await process_admin_broadcast(update, context)
-        return
-    
-    user_id = update.message.from_user.id
-    admin_lang = get_admin_language(user_id)
-    
-    if admin_lang == "ar":
-        help_text = """
-🎯 **أدوات المسؤول المتاحة:**
+_ADMIN_HELP = {
+    "ar": """🎯 **أدوات المسؤول المتاحة:**
 
 • استخدام /admin للوحة التحكم
 • البث للمستخدمين عبر لوحة التحكم
 • تفعيل/رفض الحسابات من خلال الإشعارات
 
 💡 **للبث:** استخدم /admin ثم اختر نوع البث
-💡 **لإدارة الحسابات:** اضغط على أزرار التفعيل/الرفض في الإشعارات
-        """
-    else:
-        help_text = """
-🎯 **Available Admin Tools:**
+💡 **لإدارة الحسابات:** اضغط على أزرار التفعيل/الرفض في الإشعارات""",
+    "en": """🎯 **Available Admin Tools:**
 
 • Use /admin for control panel
-• Broadcast to users via control panel  
+• Broadcast to users via control panel
 • Activate/reject accounts through notifications
 
 💡 **For broadcasting:** Use /admin then choose broadcast type
-💡 **For account management:** Click activate/reject buttons in notifications
-        """
+💡 **For account management:** Click activate/reject buttons in notifications""",
+}
+
+async def admin_text_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    
+    if await handle_rejection_reason(update, context):
+        return
+    
+    if 'broadcast_type' in context.user_data and 'broadcast_message' not in context.user_data:
+        await process_admin_broadcast(update, context)
+        return
+    
+    user_id = update.message.from_user.id
+    admin_lang = get_admin_language(user_id)
     
     try:
-        await update.message.reply_text(help_text, parse_mode="HTML")
+        await update.message.reply_text(_ADMIN_HELP[admin_lang], parse_mode="HTML")
     except Exception as e:
         logger.exception(f"Failed to send admin help message: {e}")
 
+# لغة المشترك المحفوظة (أو None لغير المسجلين) حتى لا تصل الرسائل النصية لقاعدة البيانات
+_LANG_CACHE = TTLCache(maxsize=10_000, ttl=300)
+_LANG_CACHE_LOCK = threading.Lock()
+
+def get_subscriber_lang(tg_id: int) -> Optional[str]:
+    with _LANG_CACHE_LOCK:
+        if tg_id in _LANG_CACHE:
+            return _LANG_CACHE[tg_id]
+    subscriber = get_subscriber_by_telegram_id(tg_id)
+    lang = subscriber.lang if subscriber and subscriber.lang else None
+    with _LANG_CACHE_LOCK:
+        _LANG_CACHE[tg_id] = lang
+    return lang
+
+def invalidate_lang_cache(tg_id: int):
+    with _LANG_CACHE_LOCK:
+        _LANG_CACHE.pop(tg_id, None)
+
+_USE_BUTTONS_TEXT = {
+    "ar": "⚠️ استخدم الأزرار للتفاعل.",
+    "en": "⚠️ Use buttons to interact.",
+}
+
 async def handle_text_messages(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     user_id = update.message.from_user.id
@@ -1787,23 +2162,161 @@ async def handle_text_messages(update: Update, context: ContextTypes.DEFAULT_TYP
     if user_id in ADMIN_TELEGRAM_IDS:
         return
     
-    lang = "ar"
-    subscriber = get_subscriber_by_telegram_id(user_id)
-    if subscriber and subscriber.lang:
-        lang = subscriber.lang
-    else:
-        lang = context.user_data.get("lang", "ar")
-    
-    if lang == "ar":
-        response_text = "⚠️ استخدم الأزرار للتفاعل."
-    else:
-        response_text = "⚠️ Use buttons to interact."
+    lang = get_subscriber_lang(user_id) or context.user_data.get("lang", "ar")
     
     try:
-        await update.message.reply_text(response_text)
+        await update.message.reply_text(_USE_BUTTONS_TEXT["ar" if lang == "ar" else "en"])
     except Exception as e:
         logger.exception(f"Failed to send help message to user: {e}")
 
+_ADMIN_ACCOUNT_HEAD = {
+    "ar": (
+        "{header}\n"
+        "<b>👤 المستخدم:</b> {name}\n"
+        "<b>📧 البريد:</b> {email}\n"
+        "<b>📞 الهاتف:</b> {phone}\n"
+        "<b>🌐 تيليجرام:</b> @{telegram_username} ({telegram_id})\n\n"
+        "<b>🏦 الوسيط:</b> {broker_name}\n"
+        "<b>🔢 رقم الحساب:</b> {account_number}\n"
+        "<b>🔐 كلمة المرور:</b> {password}\n"
+        "<b>🖥️ السيرفر:</b> {server}\n"
+    ),
+    "en": (
+        "{header}\n"
+        "<b>👤 User:</b> {name}\n"
+        "<b>📧 Email:</b> {email}\n"
+        "<b>📞 Phone:</b> {phone}\n"
+        "<b>🌐 Telegram:</b> @{telegram_username} ({telegram_id})\n\n"
+        "<b>🏦 Broker:</b> {broker_name}\n"
+        "<b>🔢 Account Number:</b> {account_number}\n"
+        "<b>🔐 Password:</b> {password}\n"
+        "<b>🖥️ Server:</b> {server}\n"
+    ),
+}
+
+_ADMIN_ACCOUNT_DETAILS = {
+    "ar": (
+        "<b>📈 العائد المتوقع:</b> {expected_return}\n"
+        "<b>👤 الوكيل:</b> {agent}\n\n"
+        "<b>💰 رصيد البداية:</b> {initial_balance}\n"
+        "<b>💳 الرصيد الحالي:</b> {current_balance}\n"
+        "<b>💸 المسحوبات:</b> {withdrawals}\n"
+        "<b>📅 تاريخ البدء:</b> {copy_start_date}\n"
+    ),
+    "en": (
+        "<b>📈 Expected Return:</b> {expected_return}\n"
+        "<b>👤 Agent:</b> {agent}\n\n"
+        "<b>💰 Initial Balance:</b> {initial_balance}\n"
+        "<b>💳 Current Balance:</b> {current_balance}\n"
+        "<b>💸 Withdrawals:</b> {withdrawals}\n"
+        "<b>📅 Start Date:</b> {copy_start_date}\n"
+    ),
+}
+
+_ADMIN_ACCOUNT_TRIAL_DETAILS = {
+    "ar": (
+        "<b>💰 رصيد البداية:</b> {initial_balance}\n"
+        "<b>📅 تاريخ البدء:</b> {copy_start_date}\n"
+    ),
+    "en": (
+        "<b>💰 Initial Balance:</b> {initial_balance}\n"
+        "<b>📅 Start Date:</b> {copy_start_date}\n"
+    ),
+}
+
+_ADMIN_ACCOUNT_FOOTER = {
+    "ar": "<b>🌐 معرف الحساب:</b> {id}",
+    "en": "<b>🌐 Account ID:</b> {id}",
+}
+
+# قوالب إشعار المشرف: [اللغة][حساب تجريبي؟]
+_ADMIN_ACCOUNT_MSG = {
+    lang: {
+        False: _ADMIN_ACCOUNT_HEAD[lang] + "\n" + _ADMIN_ACCOUNT_DETAILS[lang] + "\n" + _ADMIN_ACCOUNT_FOOTER[lang],
+        True: _ADMIN_ACCOUNT_HEAD[lang] + "\n" + _ADMIN_ACCOUNT_TRIAL_DETAILS[lang] + "\n" + _ADMIN_ACCOUNT_FOOTER[lang],
+    }
+    for lang in ("ar", "en")
+}
+
+_ADMIN_NOTIFY_TITLES = {
+    "ar": {
+        "new_trial": "🛎 حساب تداول تجريبي جديد",
+        "new_account": "🛎 حساب تداول جديد",
+        "updated_account": "✏️ تعديل على حساب تداول",
+        "activity": "ℹ️ نشاط على حساب تداول",
+    },
+    "en": {
+        "new_trial": "🆕 New Trial Trading Account",
+        "new_account": "🆕 New Trading Account",
+        "updated_account": "✏️ Trading Account Updated",
+        "activity": "ℹ️ Trading Account Activity",
+    },
+}
+
+_ADMIN_NOTIFY_LABELS = {
+    "ar": ("👤 المستخدم", "🏦 الوسيط", "✅ تفعيل الحساب", "❌ رفض الحساب"),
+    "en": ("👤 User", "🏦 Broker", "✅ Activate Account", "❌ Reject Account"),
+}
+
+_ADMIN_ACCOUNT_BUTTONS = {
+    "ar": ("✅ تفعيل الحساب", "❌ رفض الحساب"),
+    "en": ("✅ Activate Account", "❌ Reject Account"),
+}
+
+# إشعارات المشرفين تُرسل بالتوازي بحد أقصى لعدد الرسائل المتزامنة
+ADMIN_NOTIFY_CONCURRENCY = 5
+_ADMIN_NOTIFY_SEMAPHORE = asyncio.Semaphore(ADMIN_NOTIFY_CONCURRENCY)
+
+async def _send_admin_notification_to(admin_id: int, lang_key: str, messages: Dict[str, str], markups: Dict[str, InlineKeyboardMarkup]):
+    
+    async with _ADMIN_NOTIFY_SEMAPHORE:
+        logger.info(f"📤 Sending notification to admin {admin_id}")
+        
+        sent_message = await send_message_limited(
+            chat_id=admin_id,
+            text=messages[lang_key],
+            reply_markup=markups[lang_key],
+            parse_mode="HTML"
+        )
+        
+        logger.info(f"✅ Admin notification sent successfully to {admin_id}")
+        return sent_message
+
+def _render_admin_notifications(action_type: str, account_data: dict, subscriber_data: dict, langs: Set[str]) -> Tuple[Dict[str, str], Dict[str, InlineKeyboardMarkup]]:
+    """Render the notification text and keyboard once per admin language."""
+    account_id = account_data['id']
+    
+    # التحقق مما إذا كان الحساب تجريبيًا (بناءً على agent أو expected_return)
+    is_trial = account_data.get('agent') == "Trial" or account_data.get('expected_return') == "Trial"
+    if action_type == "new_account":
+        title_key = "new_trial" if is_trial else "new_account"
+    elif action_type == "updated_account":
+        title_key = "updated_account"
+    else:
+        title_key = "activity"
+    
+    # بيانات المستخدم تُهرّب مرة واحدة لكل إشعار؛ الحقول الناقصة تظهر N/A
+    fields = defaultdict(lambda: "N/A", {
+        k: html.escape(str(v)) for k, v in {**subscriber_data, **account_data}.items() if v is not None
+    })
+    activate_cb = f"activate_account_{account_id}"
+    reject_cb = f"reject_account_{account_id}"
+    
+    messages: Dict[str, str] = {}
+    markups: Dict[str, InlineKeyboardMarkup] = {}
+    for lang in langs:
+        fields["header"] = build_header_html(
+            _ADMIN_NOTIFY_TITLES[lang][title_key], _ADMIN_NOTIFY_LABELS[lang],
+            header_emoji=HEADER_EMOJI, arabic_indent=1 if lang == "ar" else 0
+        )
+        messages[lang] = _ADMIN_ACCOUNT_MSG[lang][is_trial].format_map(fields)
+        activate_label, reject_label = _ADMIN_ACCOUNT_BUTTONS[lang]
+        markups[lang] = InlineKeyboardMarkup([[
+            InlineKeyboardButton(activate_label, callback_data=activate_cb),
+            InlineKeyboardButton(reject_label, callback_data=reject_cb)
+        ]])
+    return messages, markups
+
 async def send_admin_notification(action_type: str, account_data: dict, subscriber_data: dict):
     
     try:
@@ -1814,207 +2327,103 @@ async def send_admin_notification(action_type: str, account_data: dict, subscrib
             return
         
         account_id = account_data['id']
-        if account_id not in NOTIFICATION_MESSAGES:
-            NOTIFICATION_MESSAGES[account_id] = []
+        # لغة كل مشرف تُقرأ مرة واحدة، فلا يؤثر تغييرها أثناء الإرسال على النسخ المجهزة
+        admin_langs = {admin_id: "ar" if get_admin_language(admin_id) == "ar" else "en" for admin_id in ADMIN_TELEGRAM_IDS}
+        messages, markups = _render_admin_notifications(action_type, account_data, subscriber_data, set(admin_langs.values()))
         
-        for admin_id in ADMIN_TELEGRAM_IDS:
-            try:
-                logger.info(f"📤 Sending notification to admin {admin_id}")
-                
-                admin_lang = get_admin_language(admin_id)
-                
-                # التحقق مما إذا كان الحساب تجريبيًا (بناءً على agent أو expected_return)
-                is_trial = account_data.get('agent') == "Trial" or account_data.get('expected_return') == "Trial"
-                
-                if action_type == "new_account":
-                    if is_trial:
-                        if admin_lang == "ar":
-                            title = "🛎 حساب تداول تجريبي جديد"
-                            action_desc = "تم إضافة حساب تداول تجريبي جديد"
-                        else:
-                            title = "🆕 New Trial Trading Account"
-                            action_desc = "New trial trading account added"
-                    else:
-                        if admin_lang == "ar":
-                            title = "🛎 حساب تداول جديد"
-                            action_desc = "تم إضافة حساب تداول جديد"
-                        else:
-                            title = "🆕 New Trading Account"
-                            action_desc = "New trading account added"
-                elif action_type == "updated_account":
-                    if admin_lang == "ar":
-                        title = "✏️ تعديل على حساب تداول"
-                        action_desc = "تم تعديل حساب تداول"
-                    else:
-                        title = "✏️ Trading Account Updated"
-                        action_desc = "Trading account updated"
-                else:
-                    if admin_lang == "ar":
-                        title = "ℹ️ نشاط على حساب تداول"
-                        action_desc = "نشاط على حساب تداول"
-                    else:
-                        title = "ℹ️ Trading Account Activity"
-                        action_desc = "Trading account activity"
-                
-                labels = ["👤 المستخدم", "🏦 الوسيط", "✅ تفعيل الحساب", "❌ رفض الحساب"] if admin_lang == "ar" else ["👤 User", "🏦 Broker", "✅ Activate Account", "❌ Reject Account"]
-                header = build_header_html(title, labels, header_emoji=HEADER_EMOJI, arabic_indent=1 if admin_lang == "ar" else 0)
-                
-                if admin_lang == "ar":
-                    message = f"""
-{header}
-<b>👤 المستخدم:</b> {subscriber_data['name']}
-<b>📧 البريد:</b> {subscriber_data['email']}
-<b>📞 الهاتف:</b> {subscriber_data['phone']}
-<b>🌐 تيليجرام:</b> @{subscriber_data.get('telegram_username', 'N/A')} ({subscriber_data['telegram_id']})
-
-<b>🏦 الوسيط:</b> {account_data['broker_name']}
-<b>🔢 رقم الحساب:</b> {account_data['account_number']}
-<b>🔐 كلمة المرور:</b> {account_data.get('password', 'N/A')}
-<b>🖥️ السيرفر:</b> {account_data['server']}
-"""
-                    # إذا لم يكن تجريبيًا، أضف الحقول الإضافية
-                    if not is_trial:
-                        message += f"""
-<b>📈 العائد المتوقع:</b> {account_data.get('expected_return', 'N/A')}
-<b>👤 الوكيل:</b> {account_data.get('agent', 'N/A')}
-
-<b>💰 رصيد البداية:</b> {account_data.get('initial_balance', 'N/A')}
-<b>💳 الرصيد الحالي:</b> {account_data.get('current_balance', 'N/A')}  
-<b>💸 المسحوبات:</b> {account_data.get('withdrawals', 'N/A')}
-<b>📅 تاريخ البدء:</b> {account_data.get('copy_start_date', 'N/A')}
-"""
-                    else:
-                        message += f"""
-<b>💰 رصيد البداية:</b> {account_data.get('initial_balance', 'N/A')}
-<b>📅 تاريخ البدء:</b> {account_data.get('copy_start_date', 'N/A')}
-"""
-
-                    message += f"""
-<b>🌐 معرف الحساب:</b> {account_data['id']}
-                    """
-                    
-                    keyboard = [
-                        [
-                            InlineKeyboardButton("✅ تفعيل الحساب", callback_data=f"activate_account_{account_data['id']}"),
-                            InlineKeyboardButton("❌ رفض الحساب", callback_data=f"reject_account_{account_data['id']}")
-                        ]
-                    ]
-                else:
-                    message = f"""
-{header}
-<b>👤 User:</b> {subscriber_data['name']}
-<b>📧 Email:</b> {subscriber_data['email']}
-<b>📞 Phone:</b> {subscriber_data['phone']}
-<b>🌐 Telegram:</b> @{subscriber_data.get('telegram_username', 'N/A')} ({subscriber_data['telegram_id']})
-
-<b>🏦 Broker:</b> {account_data['broker_name']}
-<b>🔢 Account Number:</b> {account_data['account_number']}
-<b>🔐 Password:</b> {account_data.get('password', 'N/A')}
-<b>🖥️ Server:</b> {account_data['server']}
-"""
-                    # إذا لم يكن تجريبيًا، أضف الحقول الإضافية
-                    if not is_trial:
-                        message += f"""
-<b>📈 Expected Return:</b> {account_data.get('expected_return', 'N/A')}
-<b>👤 Agent:</b> {account_data.get('agent', 'N/A')}
-
-<b>💰 Initial Balance:</b> {account_data.get('initial_balance', 'N/A')}
-<b>💳 Current Balance:</b> {account_data.get('current_balance', 'N/A')}  
-<b>💸 Withdrawals:</b> {account_data.get('withdrawals', 'N/A')}
-<b>📅 Start Date:</b> {account_data.get('copy_start_date', 'N/A')}
-"""
-                    else:
-                        message += f"""
-<b>💰 Initial Balance:</b> {account_data.get('initial_balance', 'N/A')}
-<b>📅 Start Date:</b> {account_data.get('copy_start_date', 'N/A')}
-"""
-
-                    message += f"""
-<b>🌐 Account ID:</b> {account_data['id']}
-                    """
-                    
-                    keyboard = [
-                        [
-                            InlineKeyboardButton("✅ Activate Account", callback_data=f"activate_account_{account_data['id']}"),
-                            InlineKeyboardButton("❌ Reject Account", callback_data=f"reject_account_{account_data['id']}")
-                        ]
-                    ]
-                
-                reply_markup = InlineKeyboardMarkup(keyboard)
-                sent_message = await application.bot.send_message(
-                    chat_id=admin_id,
-                    text=message,
-                    reply_markup=reply_markup,
-                    parse_mode="HTML"
-                )
-                
-                NOTIFICATION_MESSAGES[account_id].append({
-                    'admin_id': admin_id,
-                    'chat_id': admin_id,
-                    'message_id': sent_message.message_id
-                })
-                
-                logger.info(f"✅ Admin notification sent successfully to {admin_id}")
-                
-            except Exception as e:
-                logger.exception(f"❌ Failed to send admin notification to {admin_id}: {e}")
-                
+        results = await asyncio.gather(
+            *(_send_admin_notification_to(admin_id, lang_key, messages, markups) for admin_id, lang_key in admin_langs.items()),
+            return_exceptions=True
+        )
+        
+        # تسجيل الرسائل بعد انتهاء الإرسال المتوازي
+        for admin_id, result in zip(admin_langs, results):
+            if isinstance(result, BaseException):
+                logger.error(f"❌ Failed to send admin notification to {admin_id}: {result!r}")
+                continue
+            register_notification(account_id, {
+                'admin_id': admin_id,
+                'chat_id': admin_id,
+                'message_id': result.message_id
+            })
         
         logger.info("✅ All admin notifications processed")
         
     except Exception as e:
         logger.exception(f"❌ Failed to send admin notifications: {e}")
 
+_STATUS_TEXTS = {
+    "ar": {
+        "under_review": "⏳ قيد المراجعة",
+        "active": "✅ مفعل",
+        "rejected": "❌ مرفوض"
+    },
+    "en": {
+        "under_review": "⏳ Under Review",
+        "active": "✅ Active",
+        "rejected": "❌ Rejected"
+    },
+}
+_STATUS_REASON_PREFIX = {"ar": " بسبب: ", "en": " due to: "}
+
 def get_account_status_text(status: str, lang: str, reason: str = None) -> str:
     
-    if lang == "ar":
-        status_texts = {
-            "under_review": "⏳ قيد المراجعة",
-            "active": "✅ مفعل",
-            "rejected": "❌ مرفوض"
-        }
-        reason_text = f" بسبب: {reason}" if reason else ""
-    else:
-        status_texts = {
-            "under_review": "⏳ Under Review", 
-            "active": "✅ Active",
-            "rejected": "❌ Rejected"
-        }
-        reason_text = f" due to: {reason}" if reason else ""
-    
-    text = status_texts.get(status, status)
+    lang = "ar" if lang == "ar" else "en"
+    text = _STATUS_TEXTS[lang].get(status, status)
     if status == "rejected" and reason:
-        text += reason_text
+        text += _STATUS_REASON_PREFIX[lang] + reason
     return text
 
 # ===============================
 # /start + menu / language flows
 # ===============================
+# شاشة اللغة والأقسام الرئيسية ثابتة، تُبنى مرة واحدة عند الاستيراد
+_LANG_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🇺🇸 English", callback_data="lang_en"),
+        InlineKeyboardButton("🇪🇬 العربية", callback_data="lang_ar")
+    ]
+])
+_LANG_TEXT = build_header_html(
+    "\u200Fاللغة | Language", ["🇺🇸 English", "🇪🇬 العربية"], header_emoji=HEADER_EMOJI
+) + "\n\nاختر اللغة."
+
+def _build_main_sections(lang: str) -> Tuple[str, InlineKeyboardMarkup]:
+    if lang == "ar":
+        sections = [("💹 تداول الفوركس", "forex_main"), ("💻 خدمات البرمجة", "dev_main")]
+        title = "الأقسام الرئيسية"
+        back_button = ("🔙 الرجوع للغة", "back_language")
+        description = "\n\nاختر القسم."
+    else:
+        sections = [("💹 Forex Trading", "forex_main"), ("💻 Programming Services", "dev_main")]
+        title = "Main Sections"
+        back_button = ("🔙 Back to language", "back_language")
+        description = "\n\nChoose section."
+
+    keyboard = [[InlineKeyboardButton(name, callback_data=cb)] for name, cb in sections]
+    keyboard.append([InlineKeyboardButton(back_button[0], callback_data=back_button[1])])
+    labels = [name for name, _ in sections] + [back_button[0]]
+    header = build_header_html(title, labels, header_emoji=HEADER_EMOJI, arabic_indent=1 if lang == "ar" else 0)
+    return header + description, InlineKeyboardMarkup(keyboard)
+
+_MAIN_SECTIONS = {lang: _build_main_sections(lang) for lang in ("ar", "en")}
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
    
     user_id = update.effective_user.id if update.effective_user else None
     
-    keyboard = [
-        [
-            InlineKeyboardButton("🇺🇸 English", callback_data="lang_en"),
-            InlineKeyboardButton("🇪🇬 العربية", callback_data="lang_ar")
-        ]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    labels = ["🇺🇸 English", "🇪🇬 العربية"]
-    header = build_header_html("\u200Fاللغة | Language", labels, header_emoji=HEADER_EMOJI)
-    description = "\n\nاختر اللغة."
+    text, reply_markup = _LANG_TEXT, _LANG_KEYBOARD
     
     if update.callback_query:
         q = update.callback_query
         await q.answer()
         try:
-            await q.edit_message_text(header + description, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
+            await q.edit_message_text(text, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
         except Exception:
-            await context.bot.send_message(chat_id=q.message.chat_id, text=header + description, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
+            await context.bot.send_message(chat_id=q.message.chat_id, text=text, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
     else:
         if update.message:
-            await update.message.reply_text(header + description, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
+            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
 
 async def show_main_sections(update: Update, context: ContextTypes.DEFAULT_TYPE, lang: str):
     if not update.callback_query:
@@ -2026,26 +2435,11 @@ async def show_main_sections(update: Update, context: ContextTypes.DEFAULT_TYPE,
     if user_id in ADMIN_TELEGRAM_IDS:
         set_admin_language(user_id, lang)
     
-    if lang == "ar":
-        sections = [("💹 تداول الفوركس", "forex_main"), ("💻 خدمات البرمجة", "dev_main")]
-        title = "الأقسام الرئيسية"
-        back_button = ("🔙 الرجوع للغة", "back_language")
-        description = "\n\nاختر القسم."
-    else:
-        sections = [("💹 Forex Trading", "forex_main"), ("💻 Programming Services", "dev_main")]
-        title = "Main Sections"
-        back_button = ("🔙 Back to language", "back_language")
-        description = "\n\nChoose section."
-
-    keyboard = [[InlineKeyboardButton(name, callback_data=cb)] for name, cb in sections]
-    keyboard.append([InlineKeyboardButton(back_button[0], callback_data=back_button[1])])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    labels = [name for name, _ in sections] + [back_button[0]]
-    header = build_header_html(title, labels, header_emoji=HEADER_EMOJI, arabic_indent=1 if lang == "ar" else 0)
+    text, reply_markup = _MAIN_SECTIONS["ar" if lang == "ar" else "en"]
     try:
-        await q.edit_message_text(header + description, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
+        await q.edit_message_text(text, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
     except Exception:
-        await context.bot.send_message(chat_id=q.message.chat_id, text=header + description, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
+        await context.bot.send_message(chat_id=q.message.chat_id, text=text, reply_markup=reply_markup, parse_mode="HTML", disable_web_page_preview=True)
 
 async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
@@ -2055,6 +2449,7 @@ async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = q.from_user.id
     if user_id in ADMIN_TELEGRAM_IDS:
         set_admin_language(user_id, lang)
+    invalidate_lang_cache(user_id)
 
     subscriber = get_subscriber_by_telegram_id(user_id)
     if subscriber:
@@ -2102,34 +2497,31 @@ async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # ===============================
 # WebApp pages
 # ===============================
-@app.get("/webapp")
-def webapp_form(request: Request):
-    lang = (request.query_params.get("lang") or "ar").lower()
-    is_ar = lang == "ar"
-    edit_mode = request.query_params.get("edit") == "1"
-    pre_name = request.query_params.get("name") or ""
-    pre_email = request.query_params.get("email") or ""
-    pre_phone = request.query_params.get("phone") or ""
-
-    page_title = "🧾 من فضلك أكمل بياناتك" if is_ar else "🧾 Please complete your data"
-    name_label = "الاسم" if is_ar else "Full name"
-    email_label = "البريد الإلكتروني" if is_ar else "Email"
-    phone_label = "رقم الهاتف (مع رمز الدولة)" if is_ar else "Phone (with country code)"
-    submit_label = "إرسال" if is_ar else "Submit"
-    close_label = "إغلاق" if is_ar else "Close"
-    invalid_conn = "فشل في الاتصال بالخادم" if is_ar else "Failed to connect to server"
-
-    dir_attr = "rtl" if is_ar else "ltr"
-    text_align = "right" if is_ar else "left"
-    input_dir = "rtl" if is_ar else "ltr"
-
-    name_value = f'value="{pre_name}"' if pre_name else ""
-    email_value = f'value="{pre_email}"' if pre_email else ""
-    phone_value = f'value="{pre_phone}"' if pre_phone else ""
-
-    html = f"""
+# قيم lang الشائعة تُحسم بقراءة واحدة من القاموس؛ أي قيمة أخرى غير "ar" تُعامل كإنجليزية
+_WEBAPP_LANGS = {None: "ar", "": "ar", "ar": "ar", "AR": "ar", "en": "en", "EN": "en"}
+
+def _webapp_lang(request: Request) -> str:
+    raw = request.query_params.get("lang")
+    lang = _WEBAPP_LANGS.get(raw)
+    if lang is None:
+        lang = "ar" if raw.lower() == "ar" else "en"
+    return lang
+
+_SCRIPT_BLOCK_RE = re.compile(r"(<script\b.*?</script>)", re.S | re.I)
+_HTML_WS_RE = re.compile(r"[ \t\r\n]+")
+
+def _minify_html(page: str) -> str:
+    # طي المسافات خارج وسوم <script> فقط؛ المسافة غير القابلة للكسر (NBSP) تبقى كما هي
+    parts = _SCRIPT_BLOCK_RE.split(page)
+    return "".join(
+        part if i % 2 else _HTML_WS_RE.sub(" ", part)
+        for i, part in enumerate(parts)
+    ).strip()
+
+# قالب صفحة التسجيل؛ يُعبّأ عبر str.format بدل بناء f-string في كل طلب
+_WEBAPP_FORM_HTML = """
     <!doctype html>
-    <html lang="{ 'ar' if is_ar else 'en' }" dir="{dir_attr}">
+    <html lang="{html_lang}" dir="{dir_attr}">
     <head>
       <meta charset="utf-8"/>
       <meta name="viewport" content="width=device-width,initial-scale=1"/>
@@ -2144,165 +2536,193 @@ def webapp_form(request: Request):
         .btn-ghost{{background:transparent;border:1px solid #ccc}}
         .small{{font-size:13px;color:#666;margin-top:6px;text-align:{text_align}}}
       </style>
+      <script src="https://telegram.org/js/telegram-web-app.js" defer></script>
     </head>
     <body>
       <div class="card">
-        <h2 style="text-align:{text_align}">{page_title}</h2>
-        <label style="text-align:{text_align}">{name_label}</label>
-        <input id="name" placeholder="{ 'مثال: أحمد علي' if is_ar else 'e.g. Ahmed Ali' }" {name_value} />
-        <label style="text-align:{text_align}">{email_label}</label>
+        <h2 style="text-align:{text_align}">{labels[page_title]}</h2>
+        <label style="text-align:{text_align}">{labels[name]}</label>
+        <input id="name" placeholder="{labels[name_placeholder]}" {name_value} />
+        <label style="text-align:{text_align}">{labels[email]}</label>
         <input id="email" type="email" placeholder="you@example.com" {email_value} />
-        <label style="text-align:{text_align}">{phone_label}</label>
+        <label style="text-align:{text_align}">{labels[phone]}</label>
         <input id="phone" placeholder="+20123 456 7890" {phone_value} />
-        <div class="small">{ 'البيانات تُرسل مباشرة للبوت بعد الضغط على إرسال.' if is_ar else 'Data will be sent to the bot.' }</div>
+        <div class="small">{labels[data_note]}</div>
         <div style="margin-top:12px;text-align:{text_align};">
-          <button class="btn btn-primary" id="submit">{submit_label}</button>
-          <button class="btn btn-ghost" id="close">{close_label}</button>
+          <button class="btn btn-primary" id="submit">{labels[submit]}</button>
+          <button class="btn btn-ghost" id="close">{labels[close]}</button>
         </div>
         <div id="status" class="small" style="margin-top:10px;color:#b00;text-align:{text_align}"></div>
       </div>
 
-      <script src="https://telegram.org/js/telegram-web-app.js"></script>
       <script>
-        const tg = window.Telegram.WebApp || {{}} ;
-        try {{ tg.expand(); }} catch(e){{ /* ignore */ }}
-        const statusEl = document.getElementById('status');
-
-        function validateEmail(email) {{
-          const re = /^[^\\s@]+@[^\\s@]+\\.[^\\s@]+$/;
-          return re.test(String(email).toLowerCase());
-        }}
-        function validatePhone(phone) {{
-          const re = /^[+0-9\\-\\s]{{6,20}}$/;
-          return re.test(String(phone));
-        }}
-
-        const urlParams = new URLSearchParams(window.location.search);
-        const pageLang = (urlParams.get('lang') || '{ "ar" if is_ar else "en" }').toLowerCase();
-
-        async function submitForm() {{
-          const name = document.getElementById('name').value.trim();
-          const email = document.getElementById('email').value.trim();
-          const phone = document.getElementById('phone').value.trim();
-
-          if (!name || name.length < 2) {{
-            statusEl.textContent = '{ "الاسم قصير جدًا / Name is too short" if is_ar else "Name is too short" }';
-            return;
-          }}
-          if (!validateEmail(email)) {{
-            statusEl.textContent = '{ "بريد إلكتروني غير صالح / Invalid email" if is_ar else "Invalid email" }';
-            return;
+        document.addEventListener('DOMContentLoaded', () => {{
+          const tg = window.Telegram.WebApp || {{}} ;
+          try {{ tg.expand(); }} catch(e){{ /* ignore */ }}
+          const statusEl = document.getElementById('status');
+
+          function validateEmail(email) {{
+            const re = /^[^\\s@]+@[^\\s@]+\\.[^\\s@]+$/;
+            return re.test(String(email).toLowerCase());
           }}
-          if (!validatePhone(phone)) {{
-            statusEl.textContent = '{ "رقم هاتف غير صالح / Invalid phone" if is_ar else "Invalid phone" }';
-            return;
+          function validatePhone(phone) {{
+            const re = /^[+0-9\\-\\s]{{6,20}}$/;
+            return re.test(String(phone));
           }}
 
-          const initUser = (tg && tg.initDataUnsafe && tg.initDataUnsafe.user) ? tg.initDataUnsafe.user : null;
-
-          const payload = {{
-            name,
-            email,
-            phone,
-            tg_user: initUser,
-            lang: pageLang
-          }};
-
-          try {{
-            const resp = await fetch(window.location.origin + '/webapp/submit', {{
-              method: 'POST',
-              headers: {{ 'Content-Type': 'application/json' }},
-              body: JSON.stringify(payload)
-            }});
-            const data = await resp.json();
-            if (resp.ok) {{
-              statusEl.style.color = 'green';
-              statusEl.textContent = data.message || '{ "تم الإرسال. سيتم إغلاق النافذة..." if is_ar else "Sent — window will close..." }';
-              try {{ setTimeout(()=>tg.close(), 700); }} catch(e){{ /* ignore */ }}
-              try {{ tg.sendData(JSON.stringify({{ status: 'sent', lang: pageLang }})); }} catch(e){{}}
-            }} else {{
-              statusEl.textContent = data.error || '{invalid_conn}';
+          const urlParams = new URLSearchParams(window.location.search);
+          const pageLang = (urlParams.get('lang') || '{html_lang}').toLowerCase();
+
+          async function submitForm() {{
+            const name = document.getElementById('name').value.trim();
+            const email = document.getElementById('email').value.trim();
+            const phone = document.getElementById('phone').value.trim();
+
+            if (!name || name.length < 2) {{
+              statusEl.textContent = '{labels[name_short]}';
+              return;
+            }}
+            if (!validateEmail(email)) {{
+              statusEl.textContent = '{labels[invalid_email]}';
+              return;
+            }}
+            if (!validatePhone(phone)) {{
+              statusEl.textContent = '{labels[invalid_phone]}';
+              return;
+            }}
+
+            const initUser = (tg && tg.initDataUnsafe && tg.initDataUnsafe.user) ? tg.initDataUnsafe.user : null;
+
+            const payload = {{
+              name,
+              email,
+              phone,
+              tg_user: initUser,
+              lang: pageLang
+            }};
+
+            try {{
+              const resp = await fetch(window.location.origin + '/webapp/submit', {{
+                method: 'POST',
+                headers: {{ 'Content-Type': 'application/json' }},
+                body: JSON.stringify(payload)
+              }});
+              const data = await resp.json();
+              if (resp.ok) {{
+                statusEl.style.color = 'green';
+                statusEl.textContent = data.message || '{labels[sent]}';
+                try {{ setTimeout(()=>tg.close(), 700); }} catch(e){{ /* ignore */ }}
+                try {{ tg.sendData(JSON.stringify({{ status: 'sent', lang: pageLang }})); }} catch(e){{}}
+              }} else {{
+                statusEl.textContent = data.error || '{labels[error]}';
+              }}
+            }} catch (e) {{
+              statusEl.textContent = '{labels[error]}: ' + e.message;
             }}
-          }} catch (e) {{
-            statusEl.textContent = '{invalid_conn}: ' + e.message;
           }}
-        }}
 
-        document.getElementById('submit').addEventListener('click', submitForm);
-        document.getElementById('close').addEventListener('click', () => {{ try{{ tg.close(); }}catch(e){{}} }});
+          document.getElementById('submit').addEventListener('click', submitForm);
+          document.getElementById('close').addEventListener('click', () => {{ try{{ tg.close(); }}catch(e){{}} }});
+        }});
       </script>
     </body>
     </html>
     """
-    return HTMLResponse(content=html, status_code=200)
 
-@app.get("/webapp/existing-account")
-def webapp_existing_account(request: Request):
-    lang = (request.query_params.get("lang") or "ar").lower()
+# علامة مؤقتة تُقسَم عندها الصفحة المخزّنة لإدراج قيم التعبئة المسبقة
+_PREFILL_MARK = "\x00prefill\x00"
+
+_WEBAPP_FORM_LABELS = {
+    "ar": {
+        "page_title": "🧾 من فضلك أكمل بياناتك",
+        "name": "الاسم",
+        "email": "البريد الإلكتروني",
+        "phone": "رقم الهاتف (مع رمز الدولة)",
+        "submit": "إرسال",
+        "close": "إغلاق",
+        "error": "فشل في الاتصال بالخادم",
+        "name_placeholder": "مثال: أحمد علي",
+        "data_note": "البيانات تُرسل مباشرة للبوت بعد الضغط على إرسال.",
+        "name_short": "الاسم قصير جدًا / Name is too short",
+        "invalid_email": "بريد إلكتروني غير صالح / Invalid email",
+        "invalid_phone": "رقم هاتف غير صالح / Invalid phone",
+        "sent": "تم الإرسال. سيتم إغلاق النافذة...",
+    },
+    "en": {
+        "page_title": "🧾 Please complete your data",
+        "name": "Full name",
+        "email": "Email",
+        "phone": "Phone (with country code)",
+        "submit": "Submit",
+        "close": "Close",
+        "error": "Failed to connect to server",
+        "name_placeholder": "e.g. Ahmed Ali",
+        "data_note": "Data will be sent to the bot.",
+        "name_short": "Name is too short",
+        "invalid_email": "Invalid email",
+        "invalid_phone": "Invalid phone",
+        "sent": "Sent — window will close...",
+    },
+}
+
+@lru_cache(maxsize=4)
+def _render_webapp_shell(lang: str) -> Tuple[bytes, ...]:
     is_ar = lang == "ar"
 
-    page_title = "🧾 تسجيل بيانات حساب التداول" if is_ar else "🧾 Register Trading Account"
-    labels = {
-        "broker": "اسم الشركة" if is_ar else "Broker Name",
-        "account": "رقم الحساب" if is_ar else "Account Number",
-        "password": "كلمة السر" if is_ar else "Password",
-        "server": "سيرفر التداول" if is_ar else "Trading Server",
-        "initial_balance": "رصيد البداية" if is_ar else "Initial Balance",
-        "current_balance": "الرصيد الحالي" if is_ar else "Current Balance",
-        "withdrawals": "المسحوبات" if is_ar else "Withdrawals",
-        "copy_start_date": "تاريخ بدء النسخ" if is_ar else "Copy Start Date",
-        "agent": "الوكيل" if is_ar else "Agent",
-        "expected_return": "العائد المتوقع" if is_ar else "Expected Return",
-        "submit": "تسجيل" if is_ar else "Submit",
-        "close": "إغلاق" if is_ar else "Close",
-        "error": "فشل في الاتصال بالخادم" if is_ar else "Failed to connect to server",
-        "required_field": "هذا الحقل مطلوب" if is_ar else "This field is required",
-        "risk_warning": "⚠️ تنبيه: كلما ارتفع العائد المتوقع زادت المخاطر" if is_ar else "⚠️ Warning: Higher expected returns come with higher risks"
-    }
+    labels = _WEBAPP_FORM_LABELS[lang]
+
     dir_attr = "rtl" if is_ar else "ltr"
     text_align = "right" if is_ar else "left"
-    agents_options = "".join([f'<option value="{agent}">{agent}</option>' for agent in AGENTS_LIST])
-    expected_return_options = ""
-    if is_ar:
-        expected_return_options = """
-            <option value="">اختر العائد المتوقع</option>
-            <option value="X1 = 10% - 15%">X1 = 10% - 15%</option>
-            <option value="X2 = 20% - 30%">X2 = 20% - 30%</option>
-            <option value="X3 = 30% - 45%">X3 = 30% - 45%</option>
-            <option value="X4 = 40% - 60%">X4 = 40% - 60%</option>
-        """
-    else:
-        expected_return_options = """
-            <option value="">Select Expected Return</option>
-            <option value="X1 = 10% - 15%">X1 = 10% - 15%</option>
-            <option value="X2 = 20% - 30%">X2 = 20% - 30%</option>
-            <option value="X3 = 30% - 45%">X3 = 30% - 45%</option>
-            <option value="X4 = 40% - 60%">X4 = 40% - 60%</option>
-        """
+    input_dir = "rtl" if is_ar else "ltr"
 
-    form_labels = [
-        labels['broker'],
-        labels['account'],
-        labels['password'], 
-        labels['server'],
-        labels['initial_balance'],
-        labels['current_balance'],
-        labels['withdrawals'],
-        labels['copy_start_date'],
-        labels['agent'],
-        labels['expected_return']
-    ]
-    header_html = build_header_html(page_title, form_labels, header_emoji=HEADER_EMOJI, underline_enabled=False,arabic_indent=1 if lang == "ar" else 0)
+    page = _WEBAPP_FORM_HTML.format(
+        html_lang="ar" if is_ar else "en",
+        dir_attr=dir_attr,
+        text_align=text_align,
+        input_dir=input_dir,
+        labels=labels,
+        name_value=_PREFILL_MARK,
+        email_value=_PREFILL_MARK,
+        phone_value=_PREFILL_MARK,
+    )
+    return tuple(part.encode("utf-8") for part in _minify_html(page).split(_PREFILL_MARK))
 
-    html = f"""
-    <!doctype html>
-    <html lang="{ 'ar' if is_ar else 'en' }" dir="{dir_attr}">
-    <head>
-      <meta charset="utf-8"/>
-      <meta name="viewport" content="width=device-width,initial-scale=1"/>
-      <title>{page_title}</title>
-      <style>
-        body{{font-family:Arial;padding:16px;background:#f7f7f7;direction:{dir_attr};}}
+def _prefill_attr(value: str) -> bytes:
+    return f'value="{html.escape(value)}"'.encode("utf-8") if value else b""
+
+@app.get("/webapp")
+def webapp_form(request: Request):
+    lang = _webapp_lang(request)
+    pre_name = request.query_params.get("name") or ""
+    pre_email = request.query_params.get("email") or ""
+    pre_phone = request.query_params.get("phone") or ""
+
+    head, after_name, after_email, tail = _render_webapp_shell(lang)
+    page = b"".join((
+        head, _prefill_attr(pre_name),
+        after_name, _prefill_attr(pre_email),
+        after_email, _prefill_attr(pre_phone),
+        tail,
+    ))
+    return HTMLResponse(content=page, status_code=200)
+
+_WEBAPP_CACHE_CONTROL = "public, max-age=3600"
+
+@lru_cache(maxsize=8)
+def _page_etag(body: bytes) -> str:
+    return '"' + hashlib.md5(body).hexdigest() + '"'
+
+def _static_page_response(request: Request, body: bytes) -> Response:
+    # الصفحات الثابتة تُرسل مع ETag، ويُعاد 304 إذا كانت نسخة المتصفح مطابقة
+    etag = _page_etag(body)
+    headers = {"ETag": etag, "Cache-Control": _WEBAPP_CACHE_CONTROL}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in if_none_match or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=body, status_code=200, headers=headers)
+
+# أنماط CSS المشتركة بين صفحتي تسجيل الحساب وتعديله
+_ACCOUNT_PAGE_CSS = """body{{font-family:Arial;padding:16px;background:#f7f7f7;direction:{dir_attr};}}
         .card{{max-width:600px;margin:24px auto;padding:16px;border-radius:10px;background:white;box-shadow:0 4px 12px rgba(0,0,0,0.1)}}
         label{{display:block;margin-top:10px;font-weight:600;text-align:{text_align}}}
         input, select{{width:100%;padding:10px;margin-top:6px;border:1px solid #ccc;border-radius:6px;font-size:16px;}}
@@ -2315,8 +2735,55 @@ def webapp_existing_account(request: Request):
         .risk-warning{{font-size:12px;color:#ff6b35;margin-top:4px;text-align:{text_align};font-weight:500;}}
         .header-container{{text-align:{text_align}; margin-bottom:20px;}}
         .required{{color:#ff4444;}}
-        .field-error{{color:#ff4444;font-size:12px;margin-top:2px;display:none;}}
+        .field-error{{color:#ff4444;font-size:12px;margin-top:2px;display:none;}}"""
+
+# دالة التحقق من الحقول مشتركة بين صفحتي تسجيل الحساب وتعديله
+_ACCOUNT_VALIDATE_JS = """const fieldDefs = [
+            {{id: 'broker', name: '{labels[broker]}'}},
+            {{id: 'account', name: '{labels[account]}'}},
+            {{id: 'password', name: '{labels[password]}'}},
+            {{id: 'server', name: '{labels[server]}'}},
+            {{id: 'initial_balance', name: '{labels[initial_balance]}'}},
+            {{id: 'current_balance', name: '{labels[current_balance]}'}},
+            {{id: 'withdrawals', name: '{labels[withdrawals]}'}},
+            {{id: 'copy_start_date', name: '{labels[copy_start_date]}'}},
+            {{id: 'agent', name: '{labels[agent]}'}},
+            {{id: 'expected_return', name: '{labels[expected_return]}'}}
+          ].map(f => ({{...f, input: document.getElementById(f.id), err: document.getElementById(f.id + '_error')}}));
+
+          function validateForm() {{
+            let isValid = true;
+
+            // مرور واحد: إخفاء رسالة الخطأ للحقل الممتلئ وإظهارها للفارغ
+            fieldDefs.forEach(f => {{
+              if (!f.input.value.trim()) {{
+                if (f.err) {{
+                  f.err.style.display = 'block';
+                  f.err.textContent = '{labels[required_field]}';
+                }}
+                isValid = false;
+                f.input.style.borderColor = '#ff4444';
+              }} else {{
+                if (f.err) f.err.style.display = 'none';
+                f.input.style.borderColor = '#ccc';
+              }}
+            }});
+
+            return isValid;
+          }}"""
+
+# قالب صفحة تسجيل حساب التداول
+_EXISTING_ACCOUNT_HTML = """
+    <!doctype html>
+    <html lang="{html_lang}" dir="{dir_attr}">
+    <head>
+      <meta charset="utf-8"/>
+      <meta name="viewport" content="width=device-width,initial-scale=1"/>
+      <title>{page_title}</title>
+      <style>
+        {shared_css}
       </style>
+      <script src="https://telegram.org/js/telegram-web-app.js" defer></script>
     </head>
     <body>
       <div class="card">
@@ -2324,304 +2791,267 @@ def webapp_existing_account(request: Request):
           {header_html}
         </div>
         
-        <label>{labels['broker']} <span class="required">*</span></label>
+        <label>{labels[broker]} <span class="required">*</span></label>
         <select id="broker" required>
-          <option value="">{ 'اختر الشركة' if is_ar else 'Select Broker' }</option>
+          <option value="">{labels[select_broker]}</option>
           <option value="Oneroyal">Oneroyal</option>
           <option value="Scope">Scope</option>
         </select>
-        <div id="broker_error" class="field-error">{labels['required_field']}</div>
+        <div id="broker_error" class="field-error">{labels[required_field]}</div>
 
         <div class="form-row">
           <div>
-            <label>{labels['account']} <span class="required">*</span></label>
+            <label>{labels[account]} <span class="required">*</span></label>
             <input id="account" placeholder="123456" required />
-            <div id="account_error" class="field-error">{labels['required_field']}</div>
+            <div id="account_error" class="field-error">{labels[required_field]}</div>
           </div>
           <div>
-            <label>{labels['password']} <span class="required">*</span></label>
+            <label>{labels[password]} <span class="required">*</span></label>
             <input id="password" type="password" placeholder="••••••••" required />
-            <div id="password_error" class="field-error">{labels['required_field']}</div>
+            <div id="password_error" class="field-error">{labels[required_field]}</div>
           </div>
         </div>
 
-        <label>{labels['server']} <span class="required">*</span></label>
+        <label>{labels[server]} <span class="required">*</span></label>
         <input id="server" placeholder="Oneroyal-Live" required />
-        <div id="server_error" class="field-error">{labels['required_field']}</div>
+        <div id="server_error" class="field-error">{labels[required_field]}</div>
 
         <div class="form-row">
           <div>
-            <label>{labels['initial_balance']} <span class="required">*</span></label>
+            <label>{labels[initial_balance]} <span class="required">*</span></label>
             <input id="initial_balance" type="number" placeholder="0.00" step="0.01" required />
-            <div id="initial_balance_error" class="field-error">{labels['required_field']}</div>
+            <div id="initial_balance_error" class="field-error">{labels[required_field]}</div>
           </div>
           <div>
-            <label>{labels['current_balance']} <span class="required">*</span></label>
+            <label>{labels[current_balance]} <span class="required">*</span></label>
             <input id="current_balance" type="number" placeholder="0.00" step="0.01" required />
-            <div id="current_balance_error" class="field-error">{labels['required_field']}</div>
+            <div id="current_balance_error" class="field-error">{labels[required_field]}</div>
           </div>
         </div>
 
         <div class="form-row">
           <div>
-            <label>{labels['withdrawals']} <span class="required">*</span></label>
+            <label>{labels[withdrawals]} <span class="required">*</span></label>
             <input id="withdrawals" type="number" placeholder="0.00" step="0.01" required />
-            <div id="withdrawals_error" class="field-error">{labels['required_field']}</div>
+            <div id="withdrawals_error" class="field-error">{labels[required_field]}</div>
           </div>
           <div>
-            <label>{labels['copy_start_date']} <span class="required">*</span></label>
+            <label>{labels[copy_start_date]} <span class="required">*</span></label>
             <input id="copy_start_date" type="date" required />
-            <div id="copy_start_date_error" class="field-error">{labels['required_field']}</div>
+            <div id="copy_start_date_error" class="field-error">{labels[required_field]}</div>
           </div>
         </div>
 
-        <label>{labels['agent']} <span class="required">*</span></label>
+        <label>{labels[agent]} <span class="required">*</span></label>
         <select id="agent" required>
-          <option value="">{ 'اختر الوكيل' if is_ar else 'Select Agent' }</option>
+          <option value="">{labels[select_agent]}</option>
           {agents_options}
         </select>
-        <div id="agent_error" class="field-error">{labels['required_field']}</div>
+        <div id="agent_error" class="field-error">{labels[required_field]}</div>
 
-        <label>{labels['expected_return']} <span class="required">*</span></label>
+        <label>{labels[expected_return]} <span class="required">*</span></label>
         <select id="expected_return" required>
           {expected_return_options}
         </select>
-        <div id="expected_return_error" class="field-error">{labels['required_field']}</div>
-        <div class="risk-warning">{labels['risk_warning']}</div>
+        <div id="expected_return_error" class="field-error">{labels[required_field]}</div>
+        <div class="risk-warning">{labels[risk_warning]}</div>
 
         <div style="margin-top:12px;text-align:{text_align}">
-          <button class="btn btn-primary" id="submit">{labels['submit']}</button>
-          <button class="btn btn-ghost" id="close">{labels['close']}</button>
+          <button class="btn btn-primary" id="submit">{labels[submit]}</button>
+          <button class="btn btn-ghost" id="close">{labels[close]}</button>
         </div>
         <div id="status" class="small" style="margin-top:10px;color:#b00;"></div>
       </div>
 
-      <script src="https://telegram.org/js/telegram-web-app.js"></script>
       <script>
-        const tg = window.Telegram.WebApp || {{}};
-        try{{tg.expand();}}catch(e){{}}
-        const statusEl = document.getElementById('status');
-
-        // دالة للتحقق من الحقول المطلوبة - تعمل فقط عند الضغط على تسجيل
-        function validateForm() {{
-          const fields = [
-            {{id: 'broker', name: '{labels['broker']}'}},
-            {{id: 'account', name: '{labels['account']}'}},
-            {{id: 'password', name: '{labels['password']}'}},
-            {{id: 'server', name: '{labels['server']}'}},
-            {{id: 'initial_balance', name: '{labels['initial_balance']}'}},
-            {{id: 'current_balance', name: '{labels['current_balance']}'}},
-            {{id: 'withdrawals', name: '{labels['withdrawals']}'}},
-            {{id: 'copy_start_date', name: '{labels['copy_start_date']}'}},
-            {{id: 'agent', name: '{labels['agent']}'}},
-            {{id: 'expected_return', name: '{labels['expected_return']}'}}
-          ];
-
-          let isValid = true;
-          
-          // إخفاء جميع رسائل الخطأ أولاً
-          fields.forEach(field => {{
-            const errorEl = document.getElementById(field.id + '_error');
-            if (errorEl) errorEl.style.display = 'none';
-          }});
-
-          // التحقق من كل حقل
-          fields.forEach(field => {{
-            const inputEl = document.getElementById(field.id);
-            const value = inputEl.value.trim();
-            
-            if (!value) {{
-              const errorEl = document.getElementById(field.id + '_error');
-              if (errorEl) {{
-                errorEl.style.display = 'block';
-                errorEl.textContent = '{labels['required_field']}';
-              }}
-              isValid = false;
-              
-              // إضافة تأثير للخطأ
-              inputEl.style.borderColor = '#ff4444';
-            }} else {{
-              inputEl.style.borderColor = '#ccc';
+        document.addEventListener('DOMContentLoaded', () => {{
+          const tg = window.Telegram.WebApp || {{}};
+          try{{tg.expand();}}catch(e){{}}
+          const statusEl = document.getElementById('status');
+
+          // دالة للتحقق من الحقول المطلوبة - تعمل فقط عند الضغط على تسجيل
+          {validate_js}
+
+          async function submitForm(){{
+            // التحقق من جميع الحقول أولاً
+            if (!validateForm()) {{
+              statusEl.textContent = '{labels[fill_required]}';
+              statusEl.style.color = '#ff4444';
+              return;
             }}
-          }});
-
-          return isValid;
-        }}
-
-        // دالة لمسح رسائل الخطأ عند الكتابة في الحقول
-        function clearFieldError(fieldId) {{
-          const inputEl = document.getElementById(fieldId);
-          const errorEl = document.getElementById(fieldId + '_error');
-          
-          if (inputEl && errorEl) {{
-            inputEl.style.borderColor = '#ccc';
-            errorEl.style.display = 'none';
-          }}
-        }}
-
-        async function submitForm(){{
-          // التحقق من جميع الحقول أولاً
-          if (!validateForm()) {{
-            statusEl.textContent = '{ "يرجى ملء جميع الحقول المطلوبة" if is_ar else "Please fill all required fields" }';
-            statusEl.style.color = '#ff4444';
-            return;
-          }}
 
-          const broker = document.getElementById('broker').value.trim();
-          const account = document.getElementById('account').value.trim();
-          const password = document.getElementById('password').value.trim();
-          const server = document.getElementById('server').value.trim();
-          const initial_balance = document.getElementById('initial_balance').value.trim();
-          const current_balance = document.getElementById('current_balance').value.trim();
-          const withdrawals = document.getElementById('withdrawals').value.trim();
-          const copy_start_date = document.getElementById('copy_start_date').value.trim();
-          const agent = document.getElementById('agent').value.trim();
-          const expected_return = document.getElementById('expected_return').value.trim();
-
-          const initUser = (tg && tg.initDataUnsafe && tg.initDataUnsafe.user) ? tg.initDataUnsafe.user : null;
-          const payload = {{
-            broker,
-            account,
-            password,
-            server,
-            initial_balance,
-            current_balance,
-            withdrawals,
-            copy_start_date,
-            agent,
-            expected_return,
-            tg_user: initUser,
-            lang:"{lang}"
-          }};
-
-          try{{
-            statusEl.textContent = '{ "جاري الحفظ..." if is_ar else "Saving..." }';
-            statusEl.style.color = '#1E90FF';
+            const broker = document.getElementById('broker').value.trim();
+            const account = document.getElementById('account').value.trim();
+            const password = document.getElementById('password').value.trim();
+            const server = document.getElementById('server').value.trim();
+            const initial_balance = document.getElementById('initial_balance').value.trim();
+            const current_balance = document.getElementById('current_balance').value.trim();
+            const withdrawals = document.getElementById('withdrawals').value.trim();
+            const copy_start_date = document.getElementById('copy_start_date').value.trim();
+            const agent = document.getElementById('agent').value.trim();
+            const expected_return = document.getElementById('expected_return').value.trim();
+
+            const initUser = (tg && tg.initDataUnsafe && tg.initDataUnsafe.user) ? tg.initDataUnsafe.user : null;
+            const payload = {{
+              broker,
+              account,
+              password,
+              server,
+              initial_balance,
+              current_balance,
+              withdrawals,
+              copy_start_date,
+              agent,
+              expected_return,
+              tg_user: initUser,
+              lang:"{lang}"
+            }};
+
+            try{{
+              statusEl.textContent = '{labels[saving]}';
+              statusEl.style.color = '#1E90FF';
             
-            const resp = await fetch(window.location.origin + '/webapp/existing-account/submit', {{
-              method:'POST',
-              headers:{{'Content-Type':'application/json'}},
-              body:JSON.stringify(payload)
-            }});
-            const data = await resp.json();
-            if(resp.ok){{
-              statusEl.style.color='green';
-              statusEl.textContent=data.message||'{ "تم الحفظ بنجاح" if is_ar else "Saved successfully" }';
-              setTimeout(()=>{{try{{tg.close();}}catch(e){{}}}},1500);
-              try{{tg.sendData(JSON.stringify({{status:'sent',type:'existing_account', lang:"{lang}" }}));}}catch(e){{}}
-            }}else{{
-              statusEl.textContent=data.error||'{labels["error"]}';
+              const resp = await fetch(window.location.origin + '/webapp/existing-account/submit', {{
+                method:'POST',
+                headers:{{'Content-Type':'application/json'}},
+                body:JSON.stringify(payload)
+              }});
+              const data = await resp.json();
+              if(resp.ok){{
+                statusEl.style.color='green';
+                statusEl.textContent=data.message||'{labels[saved]}';
+                setTimeout(()=>{{try{{tg.close();}}catch(e){{}}}},1500);
+                try{{tg.sendData(JSON.stringify({{status:'sent',type:'existing_account', lang:"{lang}" }}));}}catch(e){{}}
+              }}else{{
+                statusEl.textContent=data.error||'{labels[error]}';
+                statusEl.style.color='#ff4444';
+              }}
+            }}catch(e){{
+              statusEl.textContent='{labels[error]}: '+e.message;
               statusEl.style.color='#ff4444';
             }}
-          }}catch(e){{
-            statusEl.textContent='{labels["error"]}: '+e.message;
-            statusEl.style.color='#ff4444';
           }}
-        }}
 
-        // إضافة مستمعين للأحداث لمسح رسائل الخطأ عند الكتابة
-        document.querySelectorAll('input, select').forEach(element => {{
-          element.addEventListener('input', function() {{
-            clearFieldError(this.id);
+          // إضافة مستمعين للأحداث لمسح رسائل الخطأ عند الكتابة
+          fieldDefs.forEach(f => {{
+            if (!f.err) return;
+            f.input.addEventListener('input', () => {{
+              f.input.style.borderColor = '#ccc';
+              f.err.style.display = 'none';
+            }});
           }});
-        }});
 
-        document.getElementById('submit').addEventListener('click',submitForm);
-        document.getElementById('close').addEventListener('click',()=>{{try{{tg.close();}}catch(e){{}}}});
+          document.getElementById('submit').addEventListener('click',submitForm);
+          document.getElementById('close').addEventListener('click',()=>{{try{{tg.close();}}catch(e){{}}}});
+        }});
       </script>
     </body>
     </html>
     """
-    return HTMLResponse(content=html, status_code=200)
 
-@app.get("/webapp/edit-accounts")
-def webapp_edit_accounts(request: Request):
-    lang = (request.query_params.get("lang") or "ar").lower()
+_EXISTING_ACCOUNT_LABELS = {
+    "ar": {
+        "page_title": "🧾 تسجيل بيانات حساب التداول",
+        "broker": "اسم الشركة",
+        "account": "رقم الحساب",
+        "password": "كلمة السر",
+        "server": "سيرفر التداول",
+        "initial_balance": "رصيد البداية",
+        "current_balance": "الرصيد الحالي",
+        "withdrawals": "المسحوبات",
+        "copy_start_date": "تاريخ بدء النسخ",
+        "agent": "الوكيل",
+        "expected_return": "العائد المتوقع",
+        "submit": "تسجيل",
+        "close": "إغلاق",
+        "error": "فشل في الاتصال بالخادم",
+        "required_field": "هذا الحقل مطلوب",
+        "risk_warning": "⚠️ تنبيه: كلما ارتفع العائد المتوقع زادت المخاطر",
+        "select_broker": "اختر الشركة",
+        "select_agent": "اختر الوكيل",
+        "fill_required": "يرجى ملء جميع الحقول المطلوبة",
+        "saving": "جاري الحفظ...",
+        "saved": "تم الحفظ بنجاح",
+    },
+    "en": {
+        "page_title": "🧾 Register Trading Account",
+        "broker": "Broker Name",
+        "account": "Account Number",
+        "password": "Password",
+        "server": "Trading Server",
+        "initial_balance": "Initial Balance",
+        "current_balance": "Current Balance",
+        "withdrawals": "Withdrawals",
+        "copy_start_date": "Copy Start Date",
+        "agent": "Agent",
+        "expected_return": "Expected Return",
+        "submit": "Submit",
+        "close": "Close",
+        "error": "Failed to connect to server",
+        "required_field": "This field is required",
+        "risk_warning": "⚠️ Warning: Higher expected returns come with higher risks",
+        "select_broker": "Select Broker",
+        "select_agent": "Select Agent",
+        "fill_required": "Please fill all required fields",
+        "saving": "Saving...",
+        "saved": "Saved successfully",
+    },
+}
+
+# الصفحة لا تعتمد إلا على اللغة، فتُبنى مرة واحدة لكل لغة
+@lru_cache(maxsize=4)
+def _render_existing_account(lang: str) -> bytes:
     is_ar = lang == "ar"
 
-    page_title = "✏️ تعديل حسابات التداول" if is_ar else "✏️ Edit Trading Accounts"
-    labels = {
-        "select_account": "اختر الحساب" if is_ar else "Select Account",
-        "broker": "اسم الشركة" if is_ar else "Broker Name",
-        "account": "رقم الحساب" if is_ar else "Account Number",
-        "password": "كلمة السر" if is_ar else "Password",
-        "server": "سيرفر التداول" if is_ar else "Trading Server",
-        "initial_balance": "رصيد البداية" if is_ar else "Initial Balance",
-        "current_balance": "الرصيد الحالي" if is_ar else "Current Balance",
-        "withdrawals": "المسحوبات" if is_ar else "Withdrawals",
-        "copy_start_date": "تاريخ بدء النسخ" if is_ar else "Copy Start Date",
-        "agent": "الوكيل" if is_ar else "Agent",
-        "expected_return": "العائد المتوقع" if is_ar else "Expected Return",
-        "save": "حفظ التغييرات" if is_ar else "Save Changes",
-        "delete": "حذف الحساب" if is_ar else "Delete Account",
-        "close": "إغلاق" if is_ar else "Close",
-        "error": "فشل في الاتصال بالخادم" if is_ar else "Failed to connect to server",
-        "required_field": "هذا الحقل مطلوب" if is_ar else "This field is required",
-        "no_accounts": "لا توجد حسابات" if is_ar else "No accounts found",
-        "account_under_review": "⚠️ الحساب قيد المراجعة - لا يمكن التعديل" if is_ar else "⚠️ Account under review - cannot edit",
-        "account_under_review_delete": "⚠️ الحساب قيد المراجعة - لا يمكن الحذف" if is_ar else "⚠️ Account under review - cannot delete",
-        "risk_warning": "⚠️ تنبيه: كلما ارتفع العائد المتوقع زادت المخاطر" if is_ar else "⚠️ Warning: Higher expected returns come with higher risks"
-    }
+    labels = _EXISTING_ACCOUNT_LABELS[lang]
+    page_title = labels["page_title"]
     dir_attr = "rtl" if is_ar else "ltr"
     text_align = "right" if is_ar else "left"
-    agents_options = "".join([f'<option value="{agent}">{agent}</option>' for agent in AGENTS_LIST])
-    expected_return_options = ""
-    if is_ar:
-        expected_return_options = """
-            <option value="">اختر العائد المتوقع</option>
-            <option value="X1 = 10% - 15%">X1 = 10% - 15%</option>
-            <option value="X2 = 20% - 30%">X2 = 20% - 30%</option>
-            <option value="X3 = 30% - 45%">X3 = 30% - 45%</option>
-            <option value="X4 = 40% - 60%">X4 = 40% - 60%</option>
-        """
-    else:
-        expected_return_options = """
-            <option value="">Select Expected Return</option>
-            <option value="X1 = 10% - 15%">X1 = 10% - 15%</option>
-            <option value="X2 = 20% - 30%">X2 = 20% - 30%</option>
-            <option value="X3 = 30% - 45%">X3 = 30% - 45%</option>
-            <option value="X4 = 40% - 60%">X4 = 40% - 60%</option>
-        """
-
     form_labels = [
-        labels['select_account'],
         labels['broker'],
         labels['account'],
-        labels['password'],
+        labels['password'], 
         labels['server'],
-        labels['save'],
-        labels['delete']
+        labels['initial_balance'],
+        labels['current_balance'],
+        labels['withdrawals'],
+        labels['copy_start_date'],
+        labels['agent'],
+        labels['expected_return']
     ]
     header_html = build_header_html(page_title, form_labels, header_emoji=HEADER_EMOJI, underline_enabled=False,arabic_indent=1 if lang == "ar" else 0)
 
-    html = f"""
+    return _minify_html(_EXISTING_ACCOUNT_HTML.format(
+        html_lang="ar" if is_ar else "en",
+        lang=lang,
+        dir_attr=dir_attr,
+        text_align=text_align,
+        page_title=page_title,
+        header_html=header_html,
+        shared_css=_ACCOUNT_PAGE_CSS.format(dir_attr=dir_attr, text_align=text_align),
+        labels=labels,
+        validate_js=_ACCOUNT_VALIDATE_JS.format(labels=labels),
+        agents_options=_AGENTS_OPTIONS_HTML,
+        expected_return_options=_RETURN_OPTIONS_AR if is_ar else _RETURN_OPTIONS_EN,
+    )).encode("utf-8")
+
+# قالب صفحة تعديل الحسابات
+_EDIT_ACCOUNTS_HTML = """
     <!doctype html>
-    <html lang="{ 'ar' if is_ar else 'en' }" dir="{dir_attr}">
+    <html lang="{html_lang}" dir="{dir_attr}">
     <head>
       <meta charset="utf-8"/>
       <meta name="viewport" content="width=device-width,initial-scale=1"/>
       <title>{page_title}</title>
       <style>
-        body{{font-family:Arial;padding:16px;background:#f7f7f7;direction:{dir_attr};}}
-        .card{{max-width:600px;margin:24px auto;padding:16px;border-radius:10px;background:white;box-shadow:0 4px 12px rgba(0,0,0,0.1)}}
-        label{{display:block;margin-top:10px;font-weight:600;text-align:{text_align}}}
-        input, select{{width:100%;padding:10px;margin-top:6px;border:1px solid #ccc;border-radius:6px;font-size:16px;}}
-        .btn{{display:inline-block;margin-top:16px;padding:10px 14px;border-radius:8px;border:none;font-weight:700;cursor:pointer}}
-        .btn-primary{{background:#1E90FF;color:white}}
+        {shared_css}
         .btn-danger{{background:#FF4500;color:white}}
-        .btn-ghost{{background:transparent;border:1px solid #ccc}}
         .btn-disabled{{background:#ccc;color:#666;cursor:not-allowed}}
-        .small{{font-size:13px;color:#666;text-align:{text_align}}}
-        .form-row{{display:flex;gap:10px;margin-top:10px;}}
-        .form-row > div{{flex:1;}}
         .hidden{{display:none;}}
         .status-message{{padding:10px;margin:10px 0;border-radius:6px;text-align:{text_align}}}
         .status-warning{{background:#fff3cd;border:1px solid #ffeaa7;color:#856404}}
-        .risk-warning{{font-size:12px;color:#ff6b35;margin-top:4px;text-align:{text_align};font-weight:500;}}
-        .header-container{{text-align:{text_align}; margin-bottom:20px;}}
-        .required{{color:#ff4444;}}
-        .field-error{{color:#ff4444;font-size:12px;margin-top:2px;display:none;}}
       </style>
+      <script src="https://telegram.org/js/telegram-web-app.js" defer></script>
     </head>
     <body>
       <div class="card">
@@ -2629,9 +3059,9 @@ def webapp_edit_accounts(request: Request):
           {header_html}
         </div>
         
-        <label>{labels['select_account']}</label>
+        <label>{labels[select_account]}</label>
         <select id="account_select">
-          <option value="">{ 'جاري التحميل...' if is_ar else 'Loading...' }</option>
+          <option value="">{labels[loading]}</option>
         </select>
 
         <!-- إضافة حقل مخفي لتخزين معرف الحساب الحالي -->
@@ -2640,480 +3070,529 @@ def webapp_edit_accounts(request: Request):
 
         <div id="status_message" class="status-message hidden"></div>
 
-        <label>{labels['broker']} <span class="required">*</span></label>
+        <label>{labels[broker]} <span class="required">*</span></label>
         <select id="broker" required>
-          <option value="">{ 'اختر الشركة' if is_ar else 'Select Broker' }</option>
+          <option value="">{labels[select_broker]}</option>
           <option value="Oneroyal">Oneroyal</option>
           <option value="Scope">Scope</option>
         </select>
-        <div id="broker_error" class="field-error">{labels['required_field']}</div>
+        <div id="broker_error" class="field-error">{labels[required_field]}</div>
 
         <div class="form-row">
           <div>
-            <label>{labels['account']} <span class="required">*</span></label>
+            <label>{labels[account]} <span class="required">*</span></label>
             <input id="account" placeholder="123456" required />
-            <div id="account_error" class="field-error">{labels['required_field']}</div>
+            <div id="account_error" class="field-error">{labels[required_field]}</div>
           </div>
           <div>
-            <label>{labels['password']} <span class="required">*</span></label>
+            <label>{labels[password]} <span class="required">*</span></label>
             <input id="password" type="password" placeholder="••••••••" required />
-            <div id="password_error" class="field-error">{labels['required_field']}</div>
+            <div id="password_error" class="field-error">{labels[required_field]}</div>
           </div>
         </div>
 
-        <label>{labels['server']} <span class="required">*</span></label>
+        <label>{labels[server]} <span class="required">*</span></label>
         <input id="server" placeholder="Oneroyal-Live" required />
-        <div id="server_error" class="field-error">{labels['required_field']}</div>
+        <div id="server_error" class="field-error">{labels[required_field]}</div>
 
         <div class="form-row">
           <div>
-            <label>{labels['initial_balance']} <span class="required">*</span></label>
+            <label>{labels[initial_balance]} <span class="required">*</span></label>
             <input id="initial_balance" type="number" placeholder="0.00" step="0.01" required />
-            <div id="initial_balance_error" class="field-error">{labels['required_field']}</div>
+            <div id="initial_balance_error" class="field-error">{labels[required_field]}</div>
           </div>
           <div>
-            <label>{labels['current_balance']} <span class="required">*</span></label>
+            <label>{labels[current_balance]} <span class="required">*</span></label>
             <input id="current_balance" type="number" placeholder="0.00" step="0.01" required />
-            <div id="current_balance_error" class="field-error">{labels['required_field']}</div>
+            <div id="current_balance_error" class="field-error">{labels[required_field]}</div>
           </div>
         </div>
 
         <div class="form-row">
           <div>
-            <label>{labels['withdrawals']} <span class="required">*</span></label>
+            <label>{labels[withdrawals]} <span class="required">*</span></label>
             <input id="withdrawals" type="number" placeholder="0.00" step="0.01" required />
-            <div id="withdrawals_error" class="field-error">{labels['required_field']}</div>
+            <div id="withdrawals_error" class="field-error">{labels[required_field]}</div>
           </div>
           <div>
-            <label>{labels['copy_start_date']} <span class="required">*</span></label>
+            <label>{labels[copy_start_date]} <span class="required">*</span></label>
             <input id="copy_start_date" type="date" required />
-            <div id="copy_start_date_error" class="field-error">{labels['required_field']}</div>
+            <div id="copy_start_date_error" class="field-error">{labels[required_field]}</div>
           </div>
         </div>
 
-        <label>{labels['agent']} <span class="required">*</span></label>
+        <label>{labels[agent]} <span class="required">*</span></label>
         <select id="agent" required>
-          <option value="">{ 'اختر الوكيل' if is_ar else 'Select Agent' }</option>
+          <option value="">{labels[select_agent]}</option>
           {agents_options}
         </select>
-        <div id="agent_error" class="field-error">{labels['required_field']}</div>
+        <div id="agent_error" class="field-error">{labels[required_field]}</div>
 
-        <label>{labels['expected_return']} <span class="required">*</span></label>
+        <label>{labels[expected_return]} <span class="required">*</span></label>
         <select id="expected_return" required>
           {expected_return_options}
         </select>
-        <div id="expected_return_error" class="field-error">{labels['required_field']}</div>
-        <div class="risk-warning">{labels['risk_warning']}</div>
+        <div id="expected_return_error" class="field-error">{labels[required_field]}</div>
+        <div class="risk-warning">{labels[risk_warning]}</div>
 
         <div style="margin-top:12px;text-align:{text_align}">
-          <button class="btn btn-primary" id="save">{labels['save']}</button>
-          <button class="btn btn-danger" id="delete">{labels['delete']}</button>
-          <button class="btn btn-ghost" id="close">{labels['close']}</button>
+          <button class="btn btn-primary" id="save">{labels[save]}</button>
+          <button class="btn btn-danger" id="delete">{labels[delete]}</button>
+          <button class="btn btn-ghost" id="close">{labels[close]}</button>
         </div>
         <div id="status" class="small" style="margin-top:10px;color:#b00;"></div>
       </div>
 
-      <script src="https://telegram.org/js/telegram-web-app.js"></script>
       <script>
-        const tg = window.Telegram.WebApp || {{}};
-        try{{tg.expand();}}catch(e){{}}
-        const statusEl = document.getElementById('status');
-        const statusMessageEl = document.getElementById('status_message');
-        let currentAccountId = null;
-        let currentAccountStatus = null;
-
-        // دالة للتحقق من الحقول المطلوبة
-        function validateForm() {{
-          const fields = [
-            {{id: 'broker', name: '{labels['broker']}'}},
-            {{id: 'account', name: '{labels['account']}'}},
-            {{id: 'password', name: '{labels['password']}'}},
-            {{id: 'server', name: '{labels['server']}'}},
-            {{id: 'initial_balance', name: '{labels['initial_balance']}'}},
-            {{id: 'current_balance', name: '{labels['current_balance']}'}},
-            {{id: 'withdrawals', name: '{labels['withdrawals']}'}},
-            {{id: 'copy_start_date', name: '{labels['copy_start_date']}'}},
-            {{id: 'agent', name: '{labels['agent']}'}},
-            {{id: 'expected_return', name: '{labels['expected_return']}'}}
-          ];
-
-          let isValid = true;
-          
-          // إخفاء جميع رسائل الخطأ أولاً
-          fields.forEach(field => {{
-            const errorEl = document.getElementById(field.id + '_error');
-            if (errorEl) errorEl.style.display = 'none';
-          }});
-
-          // التحقق من كل حقل
-          fields.forEach(field => {{
-            const inputEl = document.getElementById(field.id);
-            const value = inputEl.value.trim();
-            
-            if (!value) {{
-              const errorEl = document.getElementById(field.id + '_error');
-              if (errorEl) {{
-                errorEl.style.display = 'block';
-                errorEl.textContent = '{labels['required_field']}';
-              }}
-              isValid = false;
-              
-              // إضافة تأثير للخطأ
-              inputEl.style.borderColor = '#ff4444';
-            }} else {{
-              inputEl.style.borderColor = '#ccc';
+        document.addEventListener('DOMContentLoaded', () => {{
+          const tg = window.Telegram.WebApp || {{}};
+          try{{tg.expand();}}catch(e){{}}
+          const statusEl = document.getElementById('status');
+          const statusMessageEl = document.getElementById('status_message');
+          let currentAccountId = null;
+          let currentAccountStatus = null;
+          // آخر قائمة حسابات صالحة من الخادم؛ تُستخدم عند اختيار حساب ما دامت حديثة
+          // (قرار المشرف قد يغير حالة الحساب والصفحة مفتوحة)
+          const ACCOUNTS_CACHE_MS = 5000;
+          let accountsCache = null;
+          let accountsCachedAt = 0;
+
+          // مراجع عناصر النموذج تُجلب مرة واحدة عند تحميل الصفحة
+          const FORM_FIELDS = ['broker', 'account', 'password', 'server', 'initial_balance', 'current_balance', 'withdrawals', 'copy_start_date', 'agent', 'expected_return'];
+          const els = Object.fromEntries(
+            [...FORM_FIELDS, 'save', 'delete', 'current_account_id', 'current_account_status', 'account_select']
+              .map(id => [id, document.getElementById(id)])
+          );
+          // الحقول التي يختلف اسمها في بيانات الحساب عن معرف العنصر
+          const ACCOUNT_KEYS = {{broker: 'broker_name', account: 'account_number'}};
+
+          // دالة للتحقق من الحقول المطلوبة
+          {validate_js}
+
+          // جلب الحسابات؛ لا تُخزن إلا القائمة الصالحة حتى لا يُحفظ رد خطأ مكانها
+          async function fetchAccounts() {{
+            const initUser = tg.initDataUnsafe.user;
+            const resp = await fetch(`${{window.location.origin}}/api/trading_accounts?tg_id=${{initUser.id}}`);
+            const data = await resp.json();
+            if (!resp.ok || !Array.isArray(data)) {{
+              throw new Error((data && data.detail) || resp.status);
             }}
-          }});
-
-          return isValid;
-        }}
-
-        // دالة لتحميل الحسابات
-        async function loadAccounts() {{
-          const initUser = tg.initDataUnsafe.user;
-          if (!initUser) {{
-            statusEl.textContent = 'Unable to get user info';
-            return;
+            accountsCache = data;
+            accountsCachedAt = Date.now();
+            return data;
           }}
-          try {{
-            const resp = await fetch(`${{window.location.origin}}/api/trading_accounts?tg_id=${{initUser.id}}`);
-            const accounts = await resp.json();
-            const select = document.getElementById('account_select');
-            select.innerHTML = '';
-            
-            if (accounts.length === 0) {{
-              select.innerHTML = `<option value="">{labels['no_accounts']}</option>`;
-              disableForm();
+
+          // دالة لتحميل الحسابات
+          async function loadAccounts() {{
+            const initUser = tg.initDataUnsafe.user;
+            if (!initUser) {{
+              statusEl.textContent = 'Unable to get user info';
               return;
             }}
+            try {{
+              const accounts = await fetchAccounts();
+              const select = els.account_select;
+              select.innerHTML = '';
             
-            // إضافة خيار افتراضي
-            select.innerHTML = `<option value="">{ 'اختر حساب للتعديل' if is_ar else 'Select account to edit' }</option>`;
+              if (accounts.length === 0) {{
+                select.innerHTML = `<option value="">{labels[no_accounts]}</option>`;
+                disableForm();
+                return;
+              }}
             
-            accounts.forEach(acc => {{
-              const option = document.createElement('option');
-              option.value = acc.id;
-              option.textContent = `${{acc.broker_name}} - ${{acc.account_number}} (${{acc.status}})`;
-              select.appendChild(option);
-            }});
-          }} catch (e) {{
-            statusEl.textContent = '{labels["error"]}: ' + e.message;
+              // إضافة خيار افتراضي
+              select.innerHTML = `<option value="">{labels[select_to_edit]}</option>`;
+            
+              accounts.forEach(acc => {{
+                const option = document.createElement('option');
+                option.value = acc.id;
+                option.textContent = `${{acc.broker_name}} - ${{acc.account_number}} (${{acc.status}})`;
+                select.appendChild(option);
+              }});
+            }} catch (e) {{
+              statusEl.textContent = '{labels[error]}: ' + e.message;
+            }}
+          }}
+
+          // دالة لتعطيل النموذج
+          function disableForm() {{
+            FORM_FIELDS.forEach(id => {{ els[id].disabled = true; }});
+            els.save.disabled = true;
+            els.delete.disabled = true;
+          }}
+
+          // دالة لتمكين النموذج
+          function enableForm() {{
+            FORM_FIELDS.forEach(id => {{ els[id].disabled = false; }});
+            els.save.disabled = false;
+            els.delete.disabled = false;
           }}
-        }}
-
-        // دالة لتعطيل النموذج
-        function disableForm() {{
-          document.getElementById('broker').disabled = true;
-          document.getElementById('account').disabled = true;
-          document.getElementById('password').disabled = true;
-          document.getElementById('server').disabled = true;
-          document.getElementById('initial_balance').disabled = true;
-          document.getElementById('current_balance').disabled = true;
-          document.getElementById('withdrawals').disabled = true;
-          document.getElementById('copy_start_date').disabled = true;
-          document.getElementById('agent').disabled = true;
-          document.getElementById('expected_return').disabled = true;
-          document.getElementById('save').disabled = true;
-          document.getElementById('delete').disabled = true;
-        }}
-
-        // دالة لتمكين النموذج
-        function enableForm() {{
-          document.getElementById('broker').disabled = false;
-          document.getElementById('account').disabled = false;
-          document.getElementById('password').disabled = false;
-          document.getElementById('server').disabled = false;
-          document.getElementById('initial_balance').disabled = false;
-          document.getElementById('current_balance').disabled = false;
-          document.getElementById('withdrawals').disabled = false;
-          document.getElementById('copy_start_date').disabled = false;
-          document.getElementById('agent').disabled = false;
-          document.getElementById('expected_return').disabled = false;
-          document.getElementById('save').disabled = false;
-          document.getElementById('delete').disabled = false;
-        }}
-
-        // دالة لإدارة حالة الأزرار بناءً على حالة الحساب
-        function updateButtonsBasedOnStatus() {{
-          const saveBtn = document.getElementById('save');
-          const deleteBtn = document.getElementById('delete');
+
+          // دالة لإدارة حالة الأزرار بناءً على حالة الحساب
+          function updateButtonsBasedOnStatus() {{
+            const saveBtn = els.save;
+            const deleteBtn = els.delete;
           
-          if (currentAccountStatus === 'under_review') {{
-            // إذا كان الحساب قيد المراجعة، تعطيل الأزرار وإظهار رسالة
-            saveBtn.disabled = true;
-            saveBtn.classList.add('btn-disabled');
-            deleteBtn.disabled = true;
-            deleteBtn.classList.add('btn-disabled');
+            if (currentAccountStatus === 'under_review') {{
+              // إذا كان الحساب قيد المراجعة، تعطيل الأزرار وإظهار رسالة
+              saveBtn.disabled = true;
+              saveBtn.classList.add('btn-disabled');
+              deleteBtn.disabled = true;
+              deleteBtn.classList.add('btn-disabled');
             
-            statusMessageEl.innerHTML = `<div class="status-warning">{labels['account_under_review']}</div>`;
-            statusMessageEl.classList.remove('hidden');
-          }} else {{
-            // إذا كان الحساب مفعل أو مرفوض، تمكين الأزرار
-            saveBtn.disabled = false;
-            saveBtn.classList.remove('btn-disabled');
-            deleteBtn.disabled = false;
-            deleteBtn.classList.remove('btn-disabled');
-            statusMessageEl.classList.add('hidden');
+              statusMessageEl.innerHTML = `<div class="status-warning">{labels[account_under_review]}</div>`;
+              statusMessageEl.classList.remove('hidden');
+            }} else {{
+              // إذا كان الحساب مفعل أو مرفوض، تمكين الأزرار
+              saveBtn.disabled = false;
+              saveBtn.classList.remove('btn-disabled');
+              deleteBtn.disabled = false;
+              deleteBtn.classList.remove('btn-disabled');
+              statusMessageEl.classList.add('hidden');
+            }}
           }}
-        }}
-
-        // دالة لتفريغ النموذج
-        function clearForm() {{
-          document.getElementById('broker').value = '';
-          document.getElementById('account').value = '';
-          document.getElementById('password').value = '';
-          document.getElementById('server').value = '';
-          document.getElementById('initial_balance').value = '';
-          document.getElementById('current_balance').value = '';
-          document.getElementById('withdrawals').value = '';
-          document.getElementById('copy_start_date').value = '';
-          document.getElementById('agent').value = '';
-          document.getElementById('expected_return').value = '';
-          document.getElementById('current_account_id').value = '';
-          document.getElementById('current_account_status').value = '';
-          currentAccountId = null;
-          currentAccountStatus = null;
-          statusMessageEl.classList.add('hidden');
-        }}
-
-        // دالة لتحميل تفاصيل الحساب
-        async function loadAccountDetails(accountId) {{
-          if (!accountId) {{
-            clearForm();
-            disableForm();
-            return;
+
+          // دالة لتفريغ النموذج
+          function clearForm() {{
+            FORM_FIELDS.forEach(id => {{ els[id].value = ''; }});
+            els.current_account_id.value = '';
+            els.current_account_status.value = '';
+            currentAccountId = null;
+            currentAccountStatus = null;
+            statusMessageEl.classList.add('hidden');
           }}
+
+          // دالة لتحميل تفاصيل الحساب
+          async function loadAccountDetails(accountId) {{
+            if (!accountId) {{
+              clearForm();
+              disableForm();
+              return;
+            }}
           
-          try {{
-            const initUser = tg.initDataUnsafe.user;
-            const resp = await fetch(`${{window.location.origin}}/api/trading_accounts?tg_id=${{initUser.id}}`);
-            const accounts = await resp.json();
-            const acc = accounts.find(a => a.id == accountId);
+            try {{
+              let acc = accountsCache && accountsCache.find(a => a.id == accountId);
+              if (!acc || acc.status === 'under_review' || Date.now() - accountsCachedAt > ACCOUNTS_CACHE_MS) {{
+                acc = (await fetchAccounts()).find(a => a.id == accountId);
+              }}
             
-            if (acc) {{
-              // تعيين معرف مع الحساب الحالي وحالته
-              currentAccountId = acc.id;
-              currentAccountStatus = acc.status;
-              document.getElementById('current_account_id').value = acc.id;
-              document.getElementById('current_account_status').value = acc.status;
-              document.getElementById('broker').value = acc.broker_name || '';
-              document.getElementById('account').value = acc.account_number || '';
-              document.getElementById('password').value = acc.password || '';
-              document.getElementById('server').value = acc.server || '';
-              document.getElementById('initial_balance').value = acc.initial_balance || '';
-              document.getElementById('current_balance').value = acc.current_balance || '';
-              document.getElementById('withdrawals').value = acc.withdrawals || '';
-              document.getElementById('copy_start_date').value = acc.copy_start_date || '';
-              document.getElementById('agent').value = acc.agent || '';
-              document.getElementById('expected_return').value = acc.expected_return || '';
+              if (acc) {{
+                // تعيين معرف مع الحساب الحالي وحالته
+                currentAccountId = acc.id;
+                currentAccountStatus = acc.status;
+                els.current_account_id.value = acc.id;
+                els.current_account_status.value = acc.status;
+                FORM_FIELDS.forEach(id => {{ els[id].value = acc[ACCOUNT_KEYS[id] || id] || ''; }});
               
-              enableForm();
-              updateButtonsBasedOnStatus();
+                enableForm();
+                updateButtonsBasedOnStatus();
               
-              statusEl.textContent = '';
-              statusEl.style.color = '#b00';
-              statusEl.marginTop = '10px';
-            }} else {{
-              statusEl.textContent = '{ "الحساب غير موجود" if is_ar else "Account not found" }';
+                statusEl.textContent = '';
+                statusEl.style.color = '#b00';
+                statusEl.marginTop = '10px';
+              }} else {{
+                statusEl.textContent = '{labels[account_not_found]}';
+                clearForm();
+                disableForm();
+              }}
+            }} catch (e) {{
+              statusEl.textContent = '{labels[error]}: ' + e.message;
               clearForm();
               disableForm();
             }}
-          }} catch (e) {{
-            statusEl.textContent = '{labels["error"]}: ' + e.message;
-            clearForm();
-            disableForm();
           }}
-        }}
 
-        // دالة لحفظ التغييرات
-        async function saveChanges() {{
-          const accountId = document.getElementById('current_account_id').value;
-          const accountStatus = document.getElementById('current_account_status').value;
+          // دالة لحفظ التغييرات
+          async function saveChanges() {{
+            const accountId = els.current_account_id.value;
+            const accountStatus = els.current_account_status.value;
           
-          if (!accountId) {{
-            statusEl.textContent = '{ "يرجى اختيار حساب أولاً" if is_ar else "Please select an account first" }';
-            statusEl.style.color = '#ff4444';
-            return;
-          }}
+            if (!accountId) {{
+              statusEl.textContent = '{labels[select_first]}';
+              statusEl.style.color = '#ff4444';
+              return;
+            }}
 
-          // التحقق مما إذا كان الحساب قيد المراجعة
-          if (accountStatus === 'under_review') {{
-            statusEl.textContent = '{labels["account_under_review"]}';
-            statusEl.style.color = '#ff4444';
-            return;
-          }}
+            // التحقق مما إذا كان الحساب قيد المراجعة
+            if (accountStatus === 'under_review') {{
+              statusEl.textContent = '{labels[account_under_review]}';
+              statusEl.style.color = '#ff4444';
+              return;
+            }}
 
-          // التحقق من جميع الحقول المطلوبة
-          if (!validateForm()) {{
-            statusEl.textContent = '{ "يرجى ملء جميع الحقول المطلوبة" if is_ar else "Please fill all required fields" }';
-            statusEl.style.color = '#ff4444';
-            return;
-          }}
+            // التحقق من جميع الحقول المطلوبة
+            if (!validateForm()) {{
+              statusEl.textContent = '{labels[fill_required]}';
+              statusEl.style.color = '#ff4444';
+              return;
+            }}
 
-          const payload = {{
-            id: parseInt(accountId),
-            broker_name: document.getElementById('broker').value.trim(),
-            account_number: document.getElementById('account').value.trim(),
-            password: document.getElementById('password').value.trim(),
-            server: document.getElementById('server').value.trim(),
-            initial_balance: document.getElementById('initial_balance').value.trim(),
-            current_balance: document.getElementById('current_balance').value.trim(),
-            withdrawals: document.getElementById('withdrawals').value.trim(),
-            copy_start_date: document.getElementById('copy_start_date').value.trim(),
-            agent: document.getElementById('agent').value.trim(),
-            expected_return: document.getElementById('expected_return').value.trim(),
-            tg_user: tg.initDataUnsafe.user,
-            lang: "{lang}"
-          }};
-
-          try {{
-            statusEl.textContent = '{ "جاري الحفظ..." if is_ar else "Saving..." }';
-            statusEl.style.color = '#1E90FF';
+            const payload = {{
+              id: parseInt(accountId),
+              broker_name: els.broker.value.trim(),
+              account_number: els.account.value.trim(),
+              password: els.password.value.trim(),
+              server: els.server.value.trim(),
+              initial_balance: els.initial_balance.value.trim(),
+              current_balance: els.current_balance.value.trim(),
+              withdrawals: els.withdrawals.value.trim(),
+              copy_start_date: els.copy_start_date.value.trim(),
+              agent: els.agent.value.trim(),
+              expected_return: els.expected_return.value.trim(),
+              tg_user: tg.initDataUnsafe.user,
+              lang: "{lang}"
+            }};
+
+            try {{
+              statusEl.textContent = '{labels[saving]}';
+              statusEl.style.color = '#1E90FF';
             
-            const resp = await fetch(`${{window.location.origin}}/api/update_trading_account`, {{
-              method: 'POST',
-              headers: {{'Content-Type': 'application/json'}},
-              body: JSON.stringify(payload)
-            }});
+              const resp = await fetch(`${{window.location.origin}}/api/update_trading_account`, {{
+                method: 'POST',
+                headers: {{'Content-Type': 'application/json'}},
+                body: JSON.stringify(payload)
+              }});
             
-            const data = await resp.json();
+              const data = await resp.json();
             
-            if (data.success) {{
-              statusEl.style.color = 'green';
-              statusEl.textContent = '{ "تم حفظ التغييرات بنجاح" if is_ar else "Changes saved successfully" }';
+              if (data.success) {{
+                statusEl.style.color = 'green';
+                statusEl.textContent = '{labels[changes_saved]}';
               
-              // إعادة تحميل الحسابات لتحديث القائمة
-              await loadAccounts();
+                // إعادة تحميل الحسابات لتحديث القائمة
+                await loadAccounts();
               
-              setTimeout(() => {{ 
-                try{{ 
-                  tg.close(); 
-                }}catch(e){{
-                  console.log('Telegram WebApp closed');
-                }}
-              }}, 1500);
-              try{{tg.sendData(JSON.stringify({{status:'sent',type:'edit_account', lang:"{lang}" }}));}}catch(e){{}}
-            }} else {{
+                setTimeout(() => {{ 
+                  try{{ 
+                    tg.close(); 
+                  }}catch(e){{
+                    console.log('Telegram WebApp closed');
+                  }}
+                }}, 1500);
+                try{{tg.sendData(JSON.stringify({{status:'sent',type:'edit_account', lang:"{lang}" }}));}}catch(e){{}}
+              }} else {{
+                statusEl.style.color = '#ff4444';
+                statusEl.textContent = data.detail || '{labels[error]}';
+              }}
+            }} catch (e) {{
               statusEl.style.color = '#ff4444';
-              statusEl.textContent = data.detail || '{labels["error"]}';
+              statusEl.textContent = '{labels[error]}: ' + e.message;
             }}
-          }} catch (e) {{
-            statusEl.style.color = '#ff4444';
-            statusEl.textContent = '{labels["error"]}: ' + e.message;
           }}
-        }}
 
-        // دالة لحذف الحساب
-        async function deleteAccount() {{
-          const accountId = document.getElementById('current_account_id').value;
-          const accountStatus = document.getElementById('current_account_status').value;
+          // دالة لحذف الحساب
+          async function deleteAccount() {{
+            const accountId = els.current_account_id.value;
+            const accountStatus = els.current_account_status.value;
           
-          if (!accountId) {{
-            statusEl.textContent = '{ "يرجى اختيار حساب أولاً" if is_ar else "Please select an account first" }';
-            statusEl.style.color = '#ff4444';
-            return;
-          }}
+            if (!accountId) {{
+              statusEl.textContent = '{labels[select_first]}';
+              statusEl.style.color = '#ff4444';
+              return;
+            }}
 
-          // التحقق مما إذا كان الحساب قيد المراجعة
-          if (accountStatus === 'under_review') {{
-            statusEl.textContent = '{labels["account_under_review_delete"]}';
-            statusEl.style.color = '#ff4444';
-            return;
-          }}
+            // التحقق مما إذا كان الحساب قيد المراجعة
+            if (accountStatus === 'under_review') {{
+              statusEl.textContent = '{labels[account_under_review_delete]}';
+              statusEl.style.color = '#ff4444';
+              return;
+            }}
 
-          if (!confirm('{ "هل أنت متأكد من حذف هذا الحساب؟" if is_ar else "Are you sure you want to delete this account?" }')) {{
-            return;
-          }}
+            if (!confirm('{labels[confirm_delete]}')) {{
+              return;
+            }}
 
-          const payload = {{
-            id: parseInt(accountId),
-            tg_user: tg.initDataUnsafe.user,
-            lang: "{lang}"
-          }};
+            const payload = {{
+              id: parseInt(accountId),
+              tg_user: tg.initDataUnsafe.user,
+              lang: "{lang}"
+            }};
 
-          try {{
-            statusEl.textContent = '{ "جاري الحذف..." if is_ar else "Deleting..." }';
-            statusEl.style.color = '#1E90FF';
+            try {{
+              statusEl.textContent = '{labels[deleting]}';
+              statusEl.style.color = '#1E90FF';
             
-            const resp = await fetch(`${{window.location.origin}}/api/delete_trading_account`, {{
-              method: 'POST',
-              headers: {{'Content-Type': 'application/json'}},
-              body: JSON.stringify(payload)
-            }});
+              const resp = await fetch(`${{window.location.origin}}/api/delete_trading_account`, {{
+                method: 'POST',
+                headers: {{'Content-Type': 'application/json'}},
+                body: JSON.stringify(payload)
+              }});
             
-            const data = await resp.json();
+              const data = await resp.json();
             
-            if (data.success) {{
-              statusEl.style.color = 'green';
-              statusEl.textContent = '{ "تم حذف الحساب بنجاح" if is_ar else "Account deleted successfully" }';
+              if (data.success) {{
+                statusEl.style.color = 'green';
+                statusEl.textContent = '{labels[deleted]}';
               
-              // إعادة تحميل الحسابات وتفريغ النموذج
-              await loadAccounts();
-              clearForm();
-              disableForm();
+                // إعادة تحميل الحسابات وتفريغ النموذج
+                await loadAccounts();
+                clearForm();
+                disableForm();
               
-              setTimeout(() => {{ 
-                try{{ 
-                  tg.close(); 
-                }}catch(e){{
-                  console.log('Telegram WebApp closed');
-                }}
-              }}, 1500);
-              try{{tg.sendData(JSON.stringify({{status:'sent',type:'delete_account', lang:"{lang}" }}));}}catch(e){{}}
-            }} else {{
+                setTimeout(() => {{ 
+                  try{{ 
+                    tg.close(); 
+                  }}catch(e){{
+                    console.log('Telegram WebApp closed');
+                  }}
+                }}, 1500);
+                try{{tg.sendData(JSON.stringify({{status:'sent',type:'delete_account', lang:"{lang}" }}));}}catch(e){{}}
+              }} else {{
+                statusEl.style.color = '#ff4444';
+                statusEl.textContent = data.detail || '{labels[error]}';
+              }}
+            }} catch (e) {{
               statusEl.style.color = '#ff4444';
-              statusEl.textContent = data.detail || '{labels["error"]}';
+              statusEl.textContent = '{labels[error]}: ' + e.message;
             }}
-          }} catch (e) {{
-            statusEl.style.color = '#ff4444';
-            statusEl.textContent = '{labels["error"]}: ' + e.message;
           }}
-        }}
 
-        // تهيئة الصفحة
-        document.addEventListener('DOMContentLoaded', function() {{
+          // تهيئة الصفحة
           // تحميل الحسابات أولاً
           loadAccounts();
-          
+        
           // تعطيل النموذج في البداية
           disableForm();
 
           // إضافة مستمعين للتحقق من الحقول
-          document.querySelectorAll('input, select').forEach(element => {{
-            element.addEventListener('input', function() {{
-              const value = this.value.trim();
-              if (value) {{
-                this.style.borderColor = '#ccc';
-                const errorEl = document.getElementById(this.id + '_error');
-                if (errorEl) errorEl.style.display = 'none';
+          fieldDefs.forEach(f => {{
+            f.input.addEventListener('input', () => {{
+              if (f.input.value.trim()) {{
+                f.input.style.borderColor = '#ccc';
+                if (f.err) f.err.style.display = 'none';
               }}
             }});
           }});
-        }});
 
-        // إضافة المستمعين للأحداث
-        document.getElementById('account_select').addEventListener('change', function(e) {{
-          loadAccountDetails(e.target.value);
-        }});
+          // إضافة المستمعين للأحداث
+          els.account_select.addEventListener('change', function(e) {{
+            loadAccountDetails(e.target.value);
+          }});
         
-        document.getElementById('save').addEventListener('click', saveChanges);
-        document.getElementById('delete').addEventListener('click', deleteAccount);
-        document.getElementById('close').addEventListener('click', function() {{ 
-          try{{ 
-            tg.close(); 
-          }}catch(e){{
-            console.log('Telegram WebApp closed');
-          }}
+          els.save.addEventListener('click', saveChanges);
+          els.delete.addEventListener('click', deleteAccount);
+          document.getElementById('close').addEventListener('click', function() {{ 
+            try{{ 
+              tg.close(); 
+            }}catch(e){{
+              console.log('Telegram WebApp closed');
+            }}
+          }});
         }});
       </script>
     </body>
     </html>
     """
-    return HTMLResponse(content=html, status_code=200)
 
-@app.get("/webapp/free-trial")
-def webapp_free_trial(request: Request):
-    lang = (request.query_params.get("lang") or "ar").lower()
+_EDIT_ACCOUNTS_LABELS = {
+    "ar": {
+        "page_title": "✏️ تعديل حسابات التداول",
+        "select_account": "اختر الحساب",
+        "broker": "اسم الشركة",
+        "account": "رقم الحساب",
+        "password": "كلمة السر",
+        "server": "سيرفر التداول",
+        "initial_balance": "رصيد البداية",
+        "current_balance": "الرصيد الحالي",
+        "withdrawals": "المسحوبات",
+        "copy_start_date": "تاريخ بدء النسخ",
+        "agent": "الوكيل",
+        "expected_return": "العائد المتوقع",
+        "save": "حفظ التغييرات",
+        "delete": "حذف الحساب",
+        "close": "إغلاق",
+        "error": "فشل في الاتصال بالخادم",
+        "required_field": "هذا الحقل مطلوب",
+        "no_accounts": "لا توجد حسابات",
+        "account_under_review": "⚠️ الحساب قيد المراجعة - لا يمكن التعديل",
+        "account_under_review_delete": "⚠️ الحساب قيد المراجعة - لا يمكن الحذف",
+        "risk_warning": "⚠️ تنبيه: كلما ارتفع العائد المتوقع زادت المخاطر",
+        "loading": "جاري التحميل...",
+        "select_broker": "اختر الشركة",
+        "select_agent": "اختر الوكيل",
+        "select_to_edit": "اختر حساب للتعديل",
+        "account_not_found": "الحساب غير موجود",
+        "select_first": "يرجى اختيار حساب أولاً",
+        "fill_required": "يرجى ملء جميع الحقول المطلوبة",
+        "saving": "جاري الحفظ...",
+        "changes_saved": "تم حفظ التغييرات بنجاح",
+        "confirm_delete": "هل أنت متأكد من حذف هذا الحساب؟",
+        "deleting": "جاري الحذف...",
+        "deleted": "تم حذف الحساب بنجاح",
+    },
+    "en": {
+        "page_title": "✏️ Edit Trading Accounts",
+        "select_account": "Select Account",
+        "broker": "Broker Name",
+        "account": "Account Number",
+        "password": "Password",
+        "server": "Trading Server",
+        "initial_balance": "Initial Balance",
+        "current_balance": "Current Balance",
+        "withdrawals": "Withdrawals",
+        "copy_start_date": "Copy Start Date",
+        "agent": "Agent",
+        "expected_return": "Expected Return",
+        "save": "Save Changes",
+        "delete": "Delete Account",
+        "close": "Close",
+        "error": "Failed to connect to server",
+        "required_field": "This field is required",
+        "no_accounts": "No accounts found",
+        "account_under_review": "⚠️ Account under review - cannot edit",
+        "account_under_review_delete": "⚠️ Account under review - cannot delete",
+        "risk_warning": "⚠️ Warning: Higher expected returns come with higher risks",
+        "loading": "Loading...",
+        "select_broker": "Select Broker",
+        "select_agent": "Select Agent",
+        "select_to_edit": "Select account to edit",
+        "account_not_found": "Account not found",
+        "select_first": "Please select an account first",
+        "fill_required": "Please fill all required fields",
+        "saving": "Saving...",
+        "changes_saved": "Changes saved successfully",
+        "confirm_delete": "Are you sure you want to delete this account?",
+        "deleting": "Deleting...",
+        "deleted": "Account deleted successfully",
+    },
+}
+
+# الصفحة لا تعتمد إلا على اللغة، فتُبنى مرة واحدة لكل لغة
+@lru_cache(maxsize=4)
+def _render_edit_accounts(lang: str) -> bytes:
+    is_ar = lang == "ar"
+
+    labels = _EDIT_ACCOUNTS_LABELS[lang]
+    page_title = labels["page_title"]
+    dir_attr = "rtl" if is_ar else "ltr"
+    text_align = "right" if is_ar else "left"
+    form_labels = [
+        labels['select_account'],
+        labels['broker'],
+        labels['account'],
+        labels['password'],
+        labels['server'],
+        labels['save'],
+        labels['delete']
+    ]
+    header_html = build_header_html(page_title, form_labels, header_emoji=HEADER_EMOJI, underline_enabled=False,arabic_indent=1 if lang == "ar" else 0)
+
+    return _minify_html(_EDIT_ACCOUNTS_HTML.format(
+        html_lang="ar" if is_ar else "en",
+        lang=lang,
+        dir_attr=dir_attr,
+        text_align=text_align,
+        page_title=page_title,
+        header_html=header_html,
+        shared_css=_ACCOUNT_PAGE_CSS.format(dir_attr=dir_attr, text_align=text_align),
+        labels=labels,
+        validate_js=_ACCOUNT_VALIDATE_JS.format(labels=labels),
+        agents_options=_AGENTS_OPTIONS_HTML,
+        expected_return_options=_RETURN_OPTIONS_AR if is_ar else _RETURN_OPTIONS_EN,
+    )).encode("utf-8")
+
+@lru_cache(maxsize=4)
+def _render_free_trial(lang: str) -> bytes:
     is_ar = lang == "ar"
 
     page_title = "🆓 تجربة النسخ المجاني" if is_ar else "🆓 Free Copy Trial"
@@ -3149,7 +3628,7 @@ def webapp_free_trial(request: Request):
     ]
     header_html = build_header_html(page_title, form_labels, header_emoji=HEADER_EMOJI, underline_enabled=False, arabic_indent=1 if lang == "ar" else 0)
 
-    html = f"""
+    page = f"""
     <!doctype html>
     <html lang="{ 'ar' if is_ar else 'en' }" dir="{dir_attr}">
     <head>
@@ -3172,6 +3651,7 @@ def webapp_free_trial(request: Request):
         .required{{color:#ff4444;}}
         .field-error{{color:#ff4444;font-size:12px;margin-top:2px;display:none;}}
       </style>
+      <script src="https://telegram.org/js/telegram-web-app.js" defer></script>
     </head>
     <body>
       <div class="card">
@@ -3236,118 +3716,133 @@ def webapp_free_trial(request: Request):
         <div id="status" class="small" style="margin-top:10px;color:#b00;"></div>
       </div>
 
-      <script src="https://telegram.org/js/telegram-web-app.js"></script>
       <script>
-        const tg = window.Telegram.WebApp || {{}};
-        try{{tg.expand();}}catch(e){{}}
-        const statusEl = document.getElementById('status');
-
-        // دالة للتحقق من الحقول
-        function validateForm() {{
-          const fields = [
-            'broker', 'account_type', 'platform_type', 'account_number', 'password', 
-            'server', 'currency_type', 'balance'
-          ];
-          let isValid = true;
+        document.addEventListener('DOMContentLoaded', () => {{
+          const tg = window.Telegram.WebApp || {{}};
+          try{{tg.expand();}}catch(e){{}}
+          const statusEl = document.getElementById('status');
+
+          // دالة للتحقق من الحقول
+          function validateForm() {{
+            const fields = [
+              'broker', 'account_type', 'platform_type', 'account_number', 'password', 
+              'server', 'currency_type', 'balance'
+            ];
+            let isValid = true;
           
-          fields.forEach(id => {{
-            const input = document.getElementById(id);
-            const value = input.value.trim();
-            const errorEl = document.getElementById(id + '_error');
+            fields.forEach(id => {{
+              const input = document.getElementById(id);
+              const value = input.value.trim();
+              const errorEl = document.getElementById(id + '_error');
             
-            if (errorEl) errorEl.style.display = 'none';
-            input.style.borderColor = '#ccc';
+              if (errorEl) errorEl.style.display = 'none';
+              input.style.borderColor = '#ccc';
             
-            if (!value) {{
-              if (errorEl) {{
-                errorEl.textContent = '{labels['required_field']}';
-                errorEl.style.display = 'block';
+              if (!value) {{
+                if (errorEl) {{
+                  errorEl.textContent = '{labels['required_field']}';
+                  errorEl.style.display = 'block';
+                }}
+                input.style.borderColor = '#ff4444';
+                isValid = false;
               }}
-              input.style.borderColor = '#ff4444';
+            }});
+
+            // التحقق من رصيد الحساب
+            const currencyType = document.getElementById('currency_type').value;
+            const balance = parseFloat(document.getElementById('balance').value);
+            const balanceError = document.getElementById('balance_error');
+          
+            if (currencyType === 'Cent' && balance < 50) {{
+              balanceError.textContent = '{labels['min_balance_cent']}';
+              balanceError.style.display = 'block';
+              document.getElementById('balance').style.borderColor = '#ff4444';
+              isValid = false;
+            }} else if (currencyType === 'Dollar' && balance < 5000) {{
+              balanceError.textContent = '{labels['min_balance_dollar']}';
+              balanceError.style.display = 'block';
+              document.getElementById('balance').style.borderColor = '#ff4444';
               isValid = false;
             }}
-          }});
 
-          // التحقق من رصيد الحساب
-          const currencyType = document.getElementById('currency_type').value;
-          const balance = parseFloat(document.getElementById('balance').value);
-          const balanceError = document.getElementById('balance_error');
-          
-          if (currencyType === 'Cent' && balance < 50) {{
-            balanceError.textContent = '{labels['min_balance_cent']}';
-            balanceError.style.display = 'block';
-            document.getElementById('balance').style.borderColor = '#ff4444';
-            isValid = false;
-          }} else if (currencyType === 'Dollar' && balance < 5000) {{
-            balanceError.textContent = '{labels['min_balance_dollar']}';
-            balanceError.style.display = 'block';
-            document.getElementById('balance').style.borderColor = '#ff4444';
-            isValid = false;
+            return isValid;
           }}
 
-          return isValid;
-        }}
-
-        async function submitForm(){{
-          if (!validateForm()) {{
-            statusEl.textContent = '{ "يرجى ملء جميع الحقول المطلوبة بشكل صحيح" if is_ar else "Please fill all required fields correctly" }';
-            statusEl.style.color = '#ff4444';
-            return;
-          }}
+          async function submitForm(){{
+            if (!validateForm()) {{
+              statusEl.textContent = '{ "يرجى ملء جميع الحقول المطلوبة بشكل صحيح" if is_ar else "Please fill all required fields correctly" }';
+              statusEl.style.color = '#ff4444';
+              return;
+            }}
 
-          const payload = {{
-            broker: document.getElementById('broker').value.trim(),
-            account_type: document.getElementById('account_type').value.trim(),
-            platform_type: document.getElementById('platform_type').value.trim(),
-            account_number: document.getElementById('account_number').value.trim(),
-            password: document.getElementById('password').value.trim(),
-            server: document.getElementById('server').value.trim(),
-            currency_type: document.getElementById('currency_type').value.trim(),
-            balance: document.getElementById('balance').value.trim(),
-            tg_user: tg.initDataUnsafe.user,
-            lang: "{lang}"
-          }};
-
-          try{{
-            statusEl.textContent = '{ "جاري الحفظ..." if is_ar else "Saving..." }';
-            statusEl.style.color = '#1E90FF';
+            const payload = {{
+              broker: document.getElementById('broker').value.trim(),
+              account_type: document.getElementById('account_type').value.trim(),
+              platform_type: document.getElementById('platform_type').value.trim(),
+              account_number: document.getElementById('account_number').value.trim(),
+              password: document.getElementById('password').value.trim(),
+              server: document.getElementById('server').value.trim(),
+              currency_type: document.getElementById('currency_type').value.trim(),
+              balance: document.getElementById('balance').value.trim(),
+              tg_user: tg.initDataUnsafe.user,
+              lang: "{lang}"
+            }};
+
+            try{{
+              statusEl.textContent = '{ "جاري الحفظ..." if is_ar else "Saving..." }';
+              statusEl.style.color = '#1E90FF';
             
-            const resp = await fetch(window.location.origin + '/webapp/free-trial/submit', {{
-              method:'POST',
-              headers:{{'Content-Type':'application/json'}},
-              body:JSON.stringify(payload)
-            }});
-            const data = await resp.json();
-            if(resp.ok){{
-              statusEl.style.color='green';
-              statusEl.textContent=data.message||'{ "تم التسجيل بنجاح" if is_ar else "Registered successfully" }';
-              setTimeout(()=>{{try{{tg.close();}}catch(e){{}}}},1500);
-              try{{tg.sendData(JSON.stringify({{status:'sent',type:'free_trial', lang:"{lang}" }}));}}catch(e){{}}
-            }}else{{
-              statusEl.textContent=data.error||'{labels["error"]}';
+              const resp = await fetch(window.location.origin + '/webapp/free-trial/submit', {{
+                method:'POST',
+                headers:{{'Content-Type':'application/json'}},
+                body:JSON.stringify(payload)
+              }});
+              const data = await resp.json();
+              if(resp.ok){{
+                statusEl.style.color='green';
+                statusEl.textContent=data.message||'{ "تم التسجيل بنجاح" if is_ar else "Registered successfully" }';
+                setTimeout(()=>{{try{{tg.close();}}catch(e){{}}}},1500);
+                try{{tg.sendData(JSON.stringify({{status:'sent',type:'free_trial', lang:"{lang}" }}));}}catch(e){{}}
+              }}else{{
+                statusEl.textContent=data.error||'{labels["error"]}';
+                statusEl.style.color='#ff4444';
+              }}
+            }}catch(e){{
+              statusEl.textContent='{labels["error"]}: '+e.message;
               statusEl.style.color='#ff4444';
             }}
-          }}catch(e){{
-            statusEl.textContent='{labels["error"]}: '+e.message;
-            statusEl.style.color='#ff4444';
           }}
-        }}
 
-        document.querySelectorAll('input, select').forEach(element => {{
-          element.addEventListener('input', function() {{
-            const errorEl = document.getElementById(this.id + '_error');
-            if (errorEl) errorEl.style.display = 'none';
-            this.style.borderColor = '#ccc';
+          document.querySelectorAll('input, select').forEach(element => {{
+            element.addEventListener('input', function() {{
+              const errorEl = document.getElementById(this.id + '_error');
+              if (errorEl) errorEl.style.display = 'none';
+              this.style.borderColor = '#ccc';
+            }});
           }});
-        }});
 
-        document.getElementById('submit').addEventListener('click',submitForm);
-        document.getElementById('close').addEventListener('click',()=>{{try{{tg.close();}}catch(e){{}}}});
+          document.getElementById('submit').addEventListener('click',submitForm);
+          document.getElementById('close').addEventListener('click',()=>{{try{{tg.close();}}catch(e){{}}}});
+        }});
       </script>
     </body>
     </html>
     """
-    return HTMLResponse(content=html, status_code=200)
+    return _minify_html(page).encode("utf-8")
+
+# الصفحات التي تعتمد على اللغة فقط تُخدم من مسار واحد عبر جدول توزيع
+_STATIC_WEBAPP_PAGES = {
+    "existing-account": _render_existing_account,
+    "edit-accounts": _render_edit_accounts,
+    "free-trial": _render_free_trial,
+}
+
+@app.get("/webapp/{page}")
+def webapp_static_page(page: str, request: Request):
+    render = _STATIC_WEBAPP_PAGES.get(page)
+    if render is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return _static_page_response(request, render(_webapp_lang(request)))
 
 # ===============================
 # API for trading accounts
@@ -3369,13 +3864,9 @@ async def api_update_trading_account(payload: dict = Body(...)):
         if not telegram_id or not account_id:
             raise HTTPException(status_code=400, detail="Missing required fields")
 
-        accounts = get_trading_accounts_by_telegram_id(telegram_id)
-        if not any(acc.id == account_id for acc in accounts):
-            raise HTTPException(status_code=403, detail="Account not owned by user")
-
         update_data = {k: v for k, v in payload.items() if k not in ["id", "tg_user", "lang", "created_at"]}
 
-        success, _ = update_trading_account(account_id, **update_data)
+        success, _ = await aupdate_trading_account(account_id, owner_telegram_id=telegram_id, **update_data)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update account")
 
@@ -3398,11 +3889,7 @@ async def api_delete_trading_account(payload: dict = Body(...)):
         if not telegram_id or not account_id:
             raise HTTPException(status_code=400, detail="Missing required fields")
 
-        accounts = get_trading_accounts_by_telegram_id(telegram_id)
-        if not any(acc.id == account_id for acc in accounts):
-            raise HTTPException(status_code=403, detail="Account not owned by user")
-
-        success = delete_trading_account(account_id)
+        success = await adelete_trading_account(account_id, owner_telegram_id=telegram_id)
         if not success:
             raise HTTPException(status_code=500, detail="Failed to delete account")
 
@@ -3415,9 +3902,137 @@ async def api_delete_trading_account(payload: dict = Body(...)):
         logger.exception(f"Error in api_delete_trading_account: {e}")
         raise HTTPException(status_code=500, detail="Server error")
 
-async def refresh_user_accounts_interface(telegram_id: int, lang: str, chat_id: int, message_id: int):
+# تنسيق كتلة الحساب حسب اللغة خارج حلقة الحسابات
+def _fmt_ar(i: int, acc: Dict[str, Any], today: datetime) -> str:
+    status_text = get_account_status_text(acc['status'], "ar", acc.get('rejection_reason'))
+    lines = [
+        f"\u200F{i}. <b>{acc['broker_name']}</b> - {acc['account_number']}",
+        f"   \u200F🖥️ {acc['server']}",
+        f"   📊 <b>الحالة:</b> {status_text}",
+    ]
+    if acc.get('initial_balance'):
+        lines.append(f"   💰 رصيد البداية: {acc['initial_balance']}")
+    if acc.get('current_balance'):
+        lines.append(f"   💳 الرصيد الحالي: {acc['current_balance']}")
+    if acc.get('withdrawals'):
+        lines.append(f"   💸 المسحوبات: {acc['withdrawals']}")
+    if acc.get('copy_start_date'):
+        lines.append(f"   📅 تاريخ البدء: {acc['copy_start_date']}")
+    if acc.get('agent'):
+        lines.append(f"   👤 الوكيل: {acc['agent']}")
+    if acc.get('expected_return'):
+        lines.append(f"   📈 العائد المتوقع: {acc['expected_return']}")
+
+    if acc.get('initial_balance') and acc.get('current_balance') and acc.get('withdrawals') and acc.get('copy_start_date'):
+        try:
+            initial = float(acc['initial_balance'])
+            current = float(acc['current_balance'])
+            withdrawals = float(acc['withdrawals'])
+            start_date_str = acc['copy_start_date']
+
+            if 'T' in start_date_str:
+                start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
+            else:
+                start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+
+            delta = today - start_date
+            total_days = delta.days
+
+            months = total_days // 30
+            remaining_days = total_days % 30
+
+            period_text = ""
+            if months > 0:
+                period_text += f"{months} شهر"
+                if remaining_days > 0:
+                    period_text += f" و{remaining_days} يوم"
+            else:
+                period_text += f"{total_days} يوم"
+
+            if initial > 0:
+                total_value = current + withdrawals
+                profit = total_value - initial
+                profit_percentage = (profit / initial) * 100
+
+                lines.append(f"   📈 <b>العائد المحقق:</b> {profit_percentage:.0f}% خلال {period_text}")
+
+        except (ValueError, TypeError) as e:
+            lines.append(f"   📈 <b>العائد المحقق:</b> جاري الحساب")
+    else:
+        lines.append(f"   📈 <b>العائد المحقق:</b> يتطلب بيانات كاملة")
+    return "\n" + "\n".join(lines) + "\n"
+
+
+def _fmt_en(i: int, acc: Dict[str, Any], today: datetime) -> str:
+    status_text = get_account_status_text(acc['status'], "en", acc.get('rejection_reason'))
+    lines = [
+        f"\u200E{i}. <b>{acc['broker_name']}</b> - {acc['account_number']}",
+        f"   🖥️ {acc['server']}",
+        f"   📊 <b>Status:</b> {status_text}",
+    ]
+    if acc.get('initial_balance'):
+        lines.append(f"   💰 Initial Balance: {acc['initial_balance']}")
+    if acc.get('current_balance'):
+        lines.append(f"   💳 Current Balance: {acc['current_balance']}")
+    if acc.get('withdrawals'):
+        lines.append(f"   💸 Withdrawals: {acc['withdrawals']}")
+    if acc.get('copy_start_date'):
+        lines.append(f"   📅 Start Date: {acc['copy_start_date']}")
+    if acc.get('agent'):
+        lines.append(f"   👤 Agent: {acc['agent']}")
+    if acc.get('expected_return'):
+        lines.append(f"   📈 Expected Return: {acc['expected_return']}")
+
+    if acc.get('initial_balance') and acc.get('current_balance') and acc.get('withdrawals') and acc.get('copy_start_date'):
+        try:
+            initial = float(acc['initial_balance'])
+            current = float(acc['current_balance'])
+            withdrawals = float(acc['withdrawals'])
+            start_date_str = acc['copy_start_date']
+
+            if 'T' in start_date_str:
+                start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
+            else:
+                start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
+
+            delta = today - start_date
+            total_days = delta.days
+
+            months = total_days // 30
+            remaining_days = total_days % 30
+
+            period_text = ""
+            if months > 0:
+                period_text += f"{months} month"
+                if months > 1:
+                    period_text += "s"
+                if remaining_days > 0:
+                    period_text += f" and {remaining_days} day"
+                    if remaining_days > 1:
+                        period_text += "s"
+            else:
+                period_text += f"{total_days} day"
+                if total_days > 1:
+                    period_text += "s"
+
+            if initial > 0:
+                total_value = current + withdrawals
+                profit = total_value - initial
+                profit_percentage = (profit / initial) * 100
+
+                lines.append(f"   📈 <b>Achieved Return:</b> {profit_percentage:.0f}% over {period_text}")
+
+        except (ValueError, TypeError) as e:
+            lines.append(f"   📈 <b>Achieved Return:</b> Calculating...")
+    else:
+        lines.append(f"   📈 <b>Achieved Return:</b> Requires complete data")
+    return "\n" + "\n".join(lines) + "\n"
+
+
+async def refresh_user_accounts_interface(telegram_id: int, lang: str, chat_id: int, message_id: int, updated_data: Optional[Dict[str, Any]] = None):
     
-    updated_data = get_subscriber_with_accounts(telegram_id)
+    if updated_data is None:
+        updated_data = get_subscriber_with_accounts(telegram_id)
     if not updated_data:
         return
 
@@ -3452,129 +4067,17 @@ async def refresh_user_accounts_interface(telegram_id: int, lang: str, chat_id:
         no_accounts = "\nNo trading accounts registered yet."
         description = "\n\nYour data and accounts."
 
-    updated_message = f"{header}{description}\n\n{user_info}{accounts_header}\n"
+    parts = [header, description, "\n\n", user_info, accounts_header, "\n"]
     
     today = datetime.now()
     
     if updated_data['trading_accounts']:
+        fmt = _fmt_ar if lang == "ar" else _fmt_en
         for i, acc in enumerate(updated_data['trading_accounts'], 1):
-            status_text = get_account_status_text(acc['status'], lang, acc.get('rejection_reason'))
-            if lang == "ar":
-                account_text = f"\n\u200F{i}. <b>{acc['broker_name']}</b> - {acc['account_number']}\n   \u200F🖥️ {acc['server']}\n   📊 <b>الحالة:</b> {status_text}\n"
-                if acc.get('initial_balance'):
-                    account_text += f"   💰 رصيد البداية: {acc['initial_balance']}\n"
-                if acc.get('current_balance'):
-                    account_text += f"   💳 الرصيد الحالي: {acc['current_balance']}\n"
-                if acc.get('withdrawals'):
-                    account_text += f"   💸 المسحوبات: {acc['withdrawals']}\n"
-                if acc.get('copy_start_date'):
-                    account_text += f"   📅 تاريخ البدء: {acc['copy_start_date']}\n"
-                if acc.get('agent'):
-                    account_text += f"   👤 الوكيل: {acc['agent']}\n"
-                if acc.get('expected_return'):
-                    account_text += f"   📈 العائد المتوقع: {acc['expected_return']}\n"
-                
-                if acc.get('initial_balance') and acc.get('current_balance') and acc.get('withdrawals') and acc.get('copy_start_date'):
-                    try:
-                        initial = float(acc['initial_balance'])
-                        current = float(acc['current_balance'])
-                        withdrawals = float(acc['withdrawals'])
-                        start_date_str = acc['copy_start_date']
-                        
-                        if 'T' in start_date_str:
-                            start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-                        else:
-                            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-                        
-                        delta = today - start_date
-                        total_days = delta.days
-                        
-                        months = total_days // 30
-                        remaining_days = total_days % 30
-                        
-                        period_text = ""
-                        if months > 0:
-                            period_text += f"{months} شهر"
-                            if remaining_days > 0:
-                                period_text += f" و{remaining_days} يوم"
-                        else:
-                            period_text += f"{total_days} يوم"
-                        
-                        if initial > 0:
-                            total_value = current + withdrawals
-                            profit = total_value - initial
-                            profit_percentage = (profit / initial) * 100
-                            
-                            account_text += f"   📈 <b>العائد المحقق:</b> {profit_percentage:.0f}% خلال {period_text}\n"
-                            
-                    except (ValueError, TypeError) as e:
-                        account_text += f"   📈 <b>العائد المحقق:</b> جاري الحساب\n"
-                else:
-                    account_text += f"   📈 <b>العائد المحقق:</b> يتطلب بيانات كاملة\n"
-                    
-            else:
-                account_text = f"\n\u200E{i}. <b>{acc['broker_name']}</b> - {acc['account_number']}\n   🖥️ {acc['server']}\n   📊 <b>Status:</b> {status_text}\n"
-                if acc.get('initial_balance'):
-                    account_text += f"   💰 Initial Balance: {acc['initial_balance']}\n"
-                if acc.get('current_balance'):
-                    account_text += f"   💳 Current Balance: {acc['current_balance']}\n"
-                if acc.get('withdrawals'):
-                    account_text += f"   💸 Withdrawals: {acc['withdrawals']}\n"
-                if acc.get('copy_start_date'):
-                    account_text += f"   📅 Start Date: {acc['copy_start_date']}\n"
-                if acc.get('agent'):
-                    account_text += f"   👤 Agent: {acc['agent']}\n"
-                if acc.get('expected_return'):
-                    account_text += f"   📈 Expected Return: {acc['expected_return']}\n"
-                
-                
-                if acc.get('initial_balance') and acc.get('current_balance') and acc.get('withdrawals') and acc.get('copy_start_date'):
-                    try:
-                        initial = float(acc['initial_balance'])
-                        current = float(acc['current_balance'])
-                        withdrawals = float(acc['withdrawals'])
-                        start_date_str = acc['copy_start_date']
-                        
-                        if 'T' in start_date_str:
-                            start_date = datetime.fromisoformat(start_date_str.replace('Z', '+00:00'))
-                        else:
-                            start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-                        
-                        delta = today - start_date
-                        total_days = delta.days
-                        
-                        months = total_days // 30
-                        remaining_days = total_days % 30
-                        
-                        period_text = ""
-                        if months > 0:
-                            period_text += f"{months} month"
-                            if months > 1:
-                                period_text += "s"
-                            if remaining_days > 0:
-                                period_text += f" and {remaining_days} day"
-                                if remaining_days > 1:
-                                    period_text += "s"
-                        else:
-                            period_text += f"{total_days} day"
-                            if total_days > 1:
-                                period_text += "s"
-                        
-                        if initial > 0:
-                            total_value = current + withdrawals
-                            profit = total_value - initial
-                            profit_percentage = (profit / initial) * 100
-                            
-                            account_text += f"   📈 <b>Achieved Return:</b> {profit_percentage:.0f}% over {period_text}\n"
-                            
-                    except (ValueError, TypeError) as e:
-                        account_text += f"   📈 <b>Achieved Return:</b> Calculating...\n"
-                else:
-                    account_text += f"   📈 <b>Achieved Return:</b> Requires complete data\n"
-                    
-            updated_message += account_text
+            parts.append(fmt(i, acc, today))
     else:
-        updated_message += f"\n{no_accounts}"
+        parts.append(f"\n{no_accounts}")
+    updated_message = "".join(parts)
 
     keyboard = []
     if WEBAPP_URL:
@@ -3620,7 +4123,7 @@ async def refresh_user_accounts_interface(telegram_id: int, lang: str, chat_id:
                 pass
         
         # إذا فشل كل شيء، أرسل رسالة جديدة وأعد حفظ المرجع
-        sent = await application.bot.send_message(
+        sent = await send_message_limited(
             chat_id=telegram_id,
             text=updated_message,
             reply_markup=reply_markup,
@@ -3665,7 +4168,7 @@ async def webapp_submit(payload: dict = Body(...)):
         telegram_username = tg_user.get("username") if isinstance(tg_user, dict) else None
 
         # حفظ أو تحديث بيانات المشترك
-        result, subscriber = save_or_update_subscriber(
+        result, subscriber = await asave_or_update_subscriber(
             name=name,
             email=email,
             phone=phone,
@@ -3756,7 +4259,7 @@ async def webapp_submit(payload: dict = Body(...)):
                         clear_form_ref(telegram_id)
                     except Exception:
                         try:
-                            sent = await application.bot.send_message(
+                            sent = await send_message_limited(
                                 chat_id=telegram_id,
                                 text=header + description,
                                 reply_markup=reply_markup,
@@ -3813,7 +4316,7 @@ async def webapp_submit(payload: dict = Body(...)):
 
             if not edited and telegram_id:
                 try:
-                    sent = await application.bot.send_message(
+                    sent = await send_message_limited(
                         chat_id=telegram_id,
                         text=build_header_html(header_title, ["🏦 Oneroyall", "🏦 Scope", back_label, accounts_label],
                                                header_emoji=HEADER_EMOJI, arabic_indent=1 if display_lang == "ar" else 0) + f"\n\n{brokers_title}",
@@ -4106,6 +4609,21 @@ async def show_user_accounts(update: Update, context: ContextTypes.DEFAULT_TYPE,
 # ===============================
 # menu_handler
 # ===============================
+_DEMO_ACCOUNT_DETAILS = "\n".join((
+    "Account Number : 555013",
+    "Password : yesfx2025",
+    "Server : oneroyal-real",
+    "Platform : MT4",
+))
+
+# أزرار الأقسام التي لا تستخدم اسمها كـ callback_data
+_SECTION_BTN_KWARGS: Dict[str, Dict[str, str]] = {
+    "🤖 طلب اختبار أنظمة YesFX (الوكلاء فقط)": {"url": "https://t.me/Nagyfx"},
+    "🤖 Request to Test YesFX Systems (Agents Only)": {"url": "https://t.me/Nagyfx"},
+    "🛡️ طلب حساب مشاهدة": {"callback_data": "request_demo_account"},
+    "🛡️ Request an account to watch": {"callback_data": "request_demo_account"},
+}
+
 async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not update.callback_query:
         return
@@ -4228,12 +4746,7 @@ async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         box = build_header_html(title, labels, header_emoji=header_emoji_for_lang, arabic_indent=1 if lang=="ar" else 0)
         keyboard = []
         for name in options:
-            if name in ("🤖 طلب اختبار أنظمة YesFX (الوكلاء فقط)", "🤖 Request to Test YesFX Systems (Agents Only)"):
-                keyboard.append([InlineKeyboardButton(name, url="https://t.me/Nagyfx")])
-            elif name in ("🛡️ طلب حساب مشاهدة", "🛡️ Request an account to watch"):
-                keyboard.append([InlineKeyboardButton(name, callback_data="request_demo_account")])
-            else:
-                keyboard.append([InlineKeyboardButton(name, callback_data=name)])
+            keyboard.append([InlineKeyboardButton(name, **_SECTION_BTN_KWARGS.get(name, {"callback_data": name}))])
         keyboard.append([InlineKeyboardButton(back_label, callback_data="back_main")])
         reply_markup = InlineKeyboardMarkup(keyboard)
         try:
@@ -4247,26 +4760,14 @@ async def menu_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # أولاً: إرسال تفاصيل الحساب إلى المستخدم (كما في الكود الأصلي)
         if lang == "ar":
             title = "حساب حقيقي"
-            details = """
-Account Number : 555013
-Password : yesfx2025
-Server : oneroyal-real
-Platform : MT4
-            """
             ok_button = "✅ حسناً"
         else:
             title = "Real Account"
-            details = """
-Account Number : 555013
-Password : yesfx2025
-Server : oneroyal-real
-Platform : MT4
-            """
             ok_button = "✅ OK"
 
         labels = [ok_button]
         header = build_header_html(title, labels, header_emoji="🛡️", arabic_indent=1 if lang == "ar" else 0)
-        message = f"{header}\n\n{details}"
+        message = f"{header}\n\n{_DEMO_ACCOUNT_DETAILS}"
 
         keyboard = [[InlineKeyboardButton(ok_button, callback_data="delete_demo_message")]]
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -4289,23 +4790,23 @@ Platform : MT4
                 admin_lang = get_admin_language(admin_id)
                 if admin_lang == "ar":
                     admin_title = "طلب حساب مشاهدة جديد"
-                    admin_details = f"""
-👤 المستخدم: {subscriber.name}
-📧 البريد: {subscriber.email}
-📞 الهاتف: {subscriber.phone}
-\u200F🆔: {subscriber.telegram_id}
-\u200F@{subscriber.telegram_username or 'N/A'}
-                    """
+                    admin_details = "\n".join((
+                        f"👤 المستخدم: {subscriber.name}",
+                        f"📧 البريد: {subscriber.email}",
+                        f"📞 الهاتف: {subscriber.phone}",
+                        f"\u200F🆔: {subscriber.telegram_id}",
+                        f"\u200F@{subscriber.telegram_username or 'N/A'}",
+                    ))
                     admin_ok_button = "✅ حسناً"
                 else:
                     admin_title = "New Watch Account Request"
-                    admin_details = f"""
-👤 User: {subscriber.name}
-📧 Email: {subscriber.email}
-📞 Phone: {subscriber.phone}
-🆔 Telegram ID: {subscriber.telegram_id}
-@{subscriber.telegram_username or 'N/A'}
-                    """
+                    admin_details = "\n".join((
+                        f"👤 User: {subscriber.name}",
+                        f"📧 Email: {subscriber.email}",
+                        f"📞 Phone: {subscriber.phone}",
+                        f"🆔 Telegram ID: {subscriber.telegram_id}",
+                        f"@{subscriber.telegram_username or 'N/A'}",
+                    ))
                     admin_ok_button = "✅ OK"
 
                 admin_labels = [admin_ok_button]
@@ -4610,7 +5111,7 @@ async def submit_existing_account(payload: dict = Body(...)):
         if not subscriber:
             return JSONResponse(status_code=404, content={"error": "User not found. Please complete registration first."})
 
-        success, _ = save_trading_account(
+        success, _ = await asave_trading_account(
             subscriber_id=subscriber.id,
             broker_name=broker,
             account_number=account,
@@ -4638,7 +5139,7 @@ async def submit_existing_account(payload: dict = Body(...)):
                 msg_text = "✅ Trading account registered successfully!"
             
             try:
-                await application.bot.send_message(
+                await send_message_limited(
                     chat_id=telegram_id, 
                     text=msg_text, 
                     parse_mode="HTML", 
@@ -4700,7 +5201,7 @@ async def submit_free_trial(payload: dict = Body(...)):
             return JSONResponse(status_code=404, content={"error": "User not found. Please complete registration first."})
 
         # Save as regular trading account, perhaps with a note or flag if needed
-        success, trading_account = save_trading_account(
+        success, trading_account = await asave_trading_account(
             subscriber_id=subscriber.id,
             broker_name=broker,
             account_number=account_number,
@@ -4728,7 +5229,7 @@ async def submit_free_trial(payload: dict = Body(...)):
                 msg_text = "✅ Free trial request registered successfully! Under review."
             
             try:
-                await application.bot.send_message(
+                await send_message_limited(
                     chat_id=telegram_id, 
                     text=msg_text, 
                     parse_mode="HTML", 
@@ -4801,7 +5302,9 @@ async def webhook(request: Request):
 
 @app.on_event("startup")
 async def on_startup():
+    global _MAIN_LOOP
     logger.info("🚀 Starting bot...")
+    _MAIN_LOOP = asyncio.get_running_loop()
     await application.initialize()
     if WEBHOOK_URL and WEBHOOK_PATH:
         full_url = f"{WEBHOOK_URL}{WEBHOOK_PATH}"
@@ -4816,4 +5319,5 @@ async def on_startup():
 @app.on_event("shutdown")
 async def on_shutdown():
     logger.info("🛑 Bot shutting down...")
+    await drain_background_tasks()
     await application.shutdown()
@@ -0,0 +1,69 @@
+import os
+import importlib
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def main(tmp_path_factory):
+    # قاعدة SQLite مؤقتة تُضبط قبل استيراد التطبيق حتى لا تُمس dev.db أو قاعدة حقيقية
+    db_path = tmp_path_factory.mktemp("db") / "test.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("TELEGRAM_TOKEN", "123:test")
+    main = importlib.import_module("app.main")
+    assert main.engine.url.database == str(db_path), "app.db was imported before the test database was configured"
+    main.Base.metadata.create_all(bind=main.engine)
+    return main
+
+
+def _make_account(main, telegram_id, status="under_review"):
+    with main.SessionLocal() as db:
+        subscriber = main.Subscriber(
+            name="Owner",
+            email=f"{telegram_id}@example.com",
+            phone="0100",
+            telegram_id=telegram_id,
+            lang="en",
+        )
+        db.add(subscriber)
+        db.flush()
+        account = main.TradingAccount(
+            subscriber_id=subscriber.id,
+            broker_name="Broker",
+            account_number="1001",
+            password="secret",
+            server="Server-1",
+            status=status,
+        )
+        db.add(account)
+        db.commit()
+        return account.id
+
+
+def test_update_trading_account_checks_owner(main):
+    owner = 1001
+    account_id = _make_account(main, owner)
+
+    success, _ = main.update_trading_account(account_id, owner_telegram_id=owner + 1, server="Other")
+    assert success is False
+    with main.SessionLocal() as db:
+        assert db.get(main.TradingAccount, account_id).server == "Server-1"
+
+    success, _ = main.update_trading_account(account_id, owner_telegram_id=owner, server="Other")
+    assert success is True
+    with main.SessionLocal() as db:
+        assert db.get(main.TradingAccount, account_id).server == "Other"
+
+
+def test_delete_trading_account_checks_owner(main):
+    owner = 2001
+    # الحسابات قيد المراجعة لا تُحذف، لذا نستخدم حساباً نشطاً
+    account_id = _make_account(main, owner, status="active")
+
+    assert main.delete_trading_account(account_id, owner_telegram_id=owner + 1) is False
+    with main.SessionLocal() as db:
+        assert db.get(main.TradingAccount, account_id) is not None
+
+    assert main.delete_trading_account(account_id, owner_telegram_id=owner) is True
+    with main.SessionLocal() as db:
+        assert db.get(main.TradingAccount, account_id) is None
@@ -0,0 +1,9 @@
+from app.i18n import t
+
+def test_t_returns_language_specific_text():
+    assert t("saved", "en") == "Saved your input 👍"
+    assert t("saved", "ar") == "تم حفظ مدخلك 👍"
+
+def test_t_falls_back_to_english():
+    assert t("start", "fr") == t("start", "en")
+    assert t("missing", "ar") == ""